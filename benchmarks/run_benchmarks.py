@@ -0,0 +1,321 @@
+# benchmarks/run_benchmarks.py
+
+"""
+Benchmarks for terralab's hot paths, run against a local fake Teaspoons API and signed URL server
+(terralab.fake_server), so that no credentials or network access are needed.
+
+    python benchmarks/run_benchmarks.py                    # compare against benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --update-baseline  # record new baseline results
+    python benchmarks/run_benchmarks.py --only upload_throughput --output results.json
+
+The script imports terralab from this checkout, so it doesn't need to be installed, but its dependencies do
+(e.g. with `poetry install`). Record baselines with a supported Python version (see pyproject.toml).
+
+Each benchmark reports the median of several runs. The run fails (exits 1) if any result is worse than
+its baseline by more than the tolerance.
+"""
+
+import argparse
+import collections
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# keep progress bars out of the benchmark output
+os.environ.setdefault("TQDM_DISABLE", "1")
+# import terralab from this checkout, whether or not it's installed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from teaspoons_client import ApiClient, Configuration  # type: ignore[attr-defined]
+
+from terralab.agent import AGENT_SOCKET_ENV_VAR
+from terralab.client import use_api_client
+from terralab.commands.pipeline_runs_commands import JOBS_LIST_COLUMN_WIDTH_HINTS
+from terralab.fake_server import FakeTeaspoonsServer
+from terralab.log import format_table, iter_table_lines_with_status
+from terralab.logic.pipeline_runs_logic import get_pipeline_runs
+from terralab.utils import (
+    SignedUrlDownload,
+    _upload_file_with_signed_url,
+    download_with_pbar,
+    process_inputs_to_dict,
+)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_REPEATS = 5
+MIB = 1024 * 1024
+TRANSFER_SIZE_BYTES = 64 * MIB
+N_PIPELINE_RUNS = 500
+N_TABLE_ROWS = 2_000
+N_INPUT_KEYS = 10_000
+N_ARRAY_VALUES = 200_000
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = False
+
+    def regression_from(self, baseline: "BenchmarkResult", tolerance: float) -> bool:
+        """Return whether this result is worse than the baseline by more than the tolerance (a fraction)."""
+        if self.higher_is_better:
+            return self.value < baseline.value * (1 - tolerance)
+        return self.value > baseline.value * (1 + tolerance)
+
+
+@dataclass
+class Benchmark:
+    name: str
+    unit: str
+    higher_is_better: bool
+    # runs the benchmark once and returns the measured value
+    run: Callable[["BenchmarkContext"], float]
+
+
+@dataclass
+class BenchmarkContext:
+    server: FakeTeaspoonsServer
+    work_dir: str
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(
+    name: str, unit: str, higher_is_better: bool = False
+) -> Callable[
+    [Callable[[BenchmarkContext], float]], Callable[[BenchmarkContext], float]
+]:
+    def register(
+        run: Callable[[BenchmarkContext], float],
+    ) -> Callable[[BenchmarkContext], float]:
+        BENCHMARKS.append(Benchmark(name, unit, higher_is_better, run))
+        return run
+
+    return register
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+@benchmark("upload_throughput", "MiB/s", higher_is_better=True)
+def upload_throughput(context: BenchmarkContext) -> float:
+    local_file_path = os.path.join(context.work_dir, "upload.bin")
+    if not os.path.exists(local_file_path):
+        with open(local_file_path, "wb") as upload_file:
+            upload_file.write(os.urandom(TRANSFER_SIZE_BYTES))
+    signed_url = context.server.get_signed_url("upload.bin")
+    seconds = timed(lambda: _upload_file_with_signed_url(local_file_path, signed_url))
+    return TRANSFER_SIZE_BYTES / MIB / seconds
+
+
+@benchmark("download_throughput", "MiB/s", higher_is_better=True)
+def download_throughput(context: BenchmarkContext) -> float:
+    if "download.bin" not in context.server.blobs:
+        context.server.add_blob("download.bin", os.urandom(TRANSFER_SIZE_BYTES))
+    signed_url = context.server.get_signed_url("download.bin")
+    seconds = timed(
+        lambda: download_with_pbar(SignedUrlDownload(signed_url, context.work_dir))
+    )
+    return TRANSFER_SIZE_BYTES / MIB / seconds
+
+
+@benchmark("get_pipeline_runs_latency", "s")
+def get_pipeline_runs_latency(context: BenchmarkContext) -> float:
+    if not context.server.pipeline_runs:
+        context.server.add_pipeline_runs(N_PIPELINE_RUNS)
+    api_config = Configuration()
+    api_config.host = context.server.url
+    with use_api_client(ApiClient(configuration=api_config)):
+        return timed(lambda: get_pipeline_runs(N_PIPELINE_RUNS))
+
+
+@benchmark("jobs_list_table", "s")
+def jobs_list_table_rendering(context: BenchmarkContext) -> float:
+    # the table is rendered as `jobs list` renders it: line by line, as rows arrive
+    statuses = ["SUCCEEDED", "FAILED", "RUNNING", "PREPARING"]
+    rows = [
+        ["Job ID", "Pipeline", "Status", "Submitted", "Output Expires", "Description"]
+    ] + [
+        [
+            f"{i:08d}-0000-0000-0000-000000000000",
+            "array_imputation v1",
+            statuses[i % len(statuses)],
+            "2025-01-01 00:00",
+            "2025-01-15 00:00",
+            f"a description of job {i} " * (i % 5),
+        ]
+        for i in range(N_TABLE_ROWS)
+    ]
+    return timed(
+        lambda: collections.deque(
+            iter_table_lines_with_status(
+                iter(rows), width_hints=JOBS_LIST_COLUMN_WIDTH_HINTS
+            ),
+            maxlen=0,
+        )
+    )
+
+
+@benchmark("process_inputs_to_dict", "s")
+def process_inputs_to_dict_huge_inputs(context: BenchmarkContext) -> float:
+    inputs: list[str] = []
+    for i in range(N_INPUT_KEYS):
+        inputs.extend([f"--input_{i}", f"value_{i}"])
+    inputs.append(
+        "--array_input="
+        + ",".join(f"gs://bucket/file_{i}.vcf.gz" for i in range(N_ARRAY_VALUES))
+    )
+    return timed(lambda: process_inputs_to_dict(tuple(inputs)))
+
+
+@benchmark("cli_cold_start", "s")
+def cli_cold_start(context: BenchmarkContext) -> float:
+    # run the terralab command's entrypoint, including its check for an agent, with no agent listening
+    return timed(
+        lambda: subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from terralab.entrypoint import main; sys.argv[0] = 'terralab'; main()",
+                "--help",
+            ],
+            cwd=REPO_ROOT,  # python -c imports from the working directory
+            env=os.environ
+            | {AGENT_SOCKET_ENV_VAR: os.path.join(context.work_dir, "no-agent.sock")},
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    )
+
+
+def run_benchmarks(names: list[str] | None, repeats: int) -> list[BenchmarkResult]:
+    results = []
+    with FakeTeaspoonsServer() as server, tempfile.TemporaryDirectory() as work_dir:
+        context = BenchmarkContext(server, work_dir)
+        for bench in BENCHMARKS:
+            if names and bench.name not in names:
+                continue
+            bench.run(context)  # warm up
+            values = [bench.run(context) for _ in range(repeats)]
+            results.append(
+                BenchmarkResult(
+                    bench.name,
+                    statistics.median(values),
+                    bench.unit,
+                    bench.higher_is_better,
+                )
+            )
+    return results
+
+
+def load_results(path: Path) -> dict[str, BenchmarkResult]:
+    with open(path) as results_file:
+        return {
+            result["name"]: BenchmarkResult(**result)
+            for result in json.load(results_file)["results"]
+        }
+
+
+def write_results(path: Path, results: list[BenchmarkResult]) -> None:
+    with open(path, "w") as results_file:
+        json.dump(
+            {
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+                "results": [asdict(result) for result in results],
+            },
+            results_file,
+            indent=2,
+        )
+        results_file.write("\n")
+
+
+def compare_to_baseline(
+    results: list[BenchmarkResult],
+    baseline: dict[str, BenchmarkResult],
+    tolerance: float,
+) -> list[str]:
+    """Print a comparison table and return the names of benchmarks that regressed."""
+    rows = [["Benchmark", "Result", "Baseline", "Change", "Status"]]
+    regressions = []
+    for result in results:
+        if (baseline_result := baseline.get(result.name)) is None:
+            rows.append(
+                [result.name, f"{result.value:.4g} {result.unit}", "", "", "new"]
+            )
+            continue
+        change = (result.value - baseline_result.value) / baseline_result.value
+        regressed = result.regression_from(baseline_result, tolerance)
+        if regressed:
+            regressions.append(result.name)
+        rows.append(
+            [
+                result.name,
+                f"{result.value:.4g} {result.unit}",
+                f"{baseline_result.value:.4g} {baseline_result.unit}",
+                f"{change:+.0%}",
+                "REGRESSED" if regressed else "ok",
+            ]
+        )
+    print(format_table(rows))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--only", nargs="+", metavar="BENCHMARK", help="benchmarks to run"
+    )
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="fraction by which a result may be worse than the baseline before failing",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--output", type=Path, help="also write results to this file")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results to the baseline file instead of comparing against it",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run_benchmarks(args.only, args.repeats)
+    if args.output:
+        write_results(args.output, results)
+    if args.update_baseline:
+        # keep baseline results for benchmarks that weren't run
+        baseline = load_results(args.baseline) if args.baseline.exists() else {}
+        baseline.update({result.name: result for result in results})
+        write_results(args.baseline, list(baseline.values()))
+        print(f"Updated baseline {args.baseline}")
+        return
+
+    if regressions := compare_to_baseline(
+        results, load_results(args.baseline), args.tolerance
+    ):
+        print(f"Performance regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ This package provides a command-line interface to interact with the Teaspoons se
 built on top of an autogenerated thin client.
 """
 
+import importlib
 import importlib.metadata
 
 try:
@@ -14,3 +15,21 @@ except importlib.metadata.PackageNotFoundError:
 
 __author__ = "Terra Scientific Services"
 __email__ = "teaspoons-developers@broadinstitute.org"
+
+# the Python API is loaded on first use, so that running the CLI doesn't import it
+_LAZY_EXPORTS = {
+    "Session": "terralab.session",
+    "TerralabError": "terralab.exceptions",
+    "ApiError": "terralab.exceptions",
+    "AuthenticationError": "terralab.exceptions",
+    "ConfigError": "terralab.exceptions",
+    "ServiceUnavailableError": "terralab.exceptions",
+    "InputValidationError": "terralab.exceptions",
+    "TransferError": "terralab.exceptions",
+}
+
+
+def __getattr__(name: str) -> object:
+    if module_name := _LAZY_EXPORTS.get(name):
+        return getattr(importlib.import_module(module_name), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
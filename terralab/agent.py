@@ -0,0 +1,166 @@
+# agent.py
+
+"""
+The terralab agent is an optional background process that keeps the CLI's dependencies imported and its
+config (including OIDC discovery) loaded. When the agent is running, the `terralab` entrypoint forwards
+each command to it over a Unix socket, along with the caller's stdin/stdout/stderr file descriptors and any
+other file descriptors the command's arguments refer to (e.g. `/dev/fd/63` from a shell's `<(cmd)`), and the
+agent runs the command in a forked copy of itself.
+
+This module is imported on every invocation, so it must only import lightweight modules at the top level.
+The agent process itself is implemented in agent_server.py.
+"""
+
+import json
+import logging
+import os
+import re
+import signal
+import socket
+from importlib import resources as impresources
+from pathlib import Path
+from typing import Any
+
+from dotenv import dotenv_values
+
+from terralab import __version__
+
+LOGGER = logging.getLogger(__name__)
+
+AGENT_SOCKET_FILE_NAME = "agent.sock"
+# environment variables to override the agent socket location or to bypass the agent
+AGENT_SOCKET_ENV_VAR = "TERRALAB_AGENT_SOCKET"
+NO_AGENT_ENV_VAR = "TERRALAB_NO_AGENT"
+# commands that must always run in the calling process
+LOCAL_ONLY_COMMANDS = {"agent"}
+
+STDIO_FDS = [0, 1, 2]
+# other file descriptors that can be forwarded with a command; commands referring to more run locally
+MAX_FORWARDED_FDS = 16
+# an argument naming one of the caller's open file descriptors, e.g. from process substitution
+FD_PATH_PATTERN = re.compile(r"/(?:dev|proc/self)/fd/(\d+)")
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+PING_REQUEST = "ping"
+STOP_REQUEST = "stop"
+RUN_REQUEST = "run"
+
+
+def get_agent_socket_path(
+    config_file: str = ".terralab-cli-config", package: str = "terralab"
+) -> str:
+    """Return the path of the agent's Unix socket, in the CLI's local storage directory by default.
+    Only the local storage path is read from the config, so that no network calls are needed.
+    """
+    if socket_path := os.environ.get(AGENT_SOCKET_ENV_VAR):
+        return socket_path
+    config = dotenv_values(str(impresources.files(package) / config_file))
+    return f'{Path.home()}/{config["LOCAL_STORAGE_PATH"]}/{AGENT_SOCKET_FILE_NAME}'
+
+
+def forward_to_agent(argv: list[str]) -> int | None:
+    """Run the command given by argv in the agent, if one is running, and return its exit code.
+    Returns None if the command should run in this process instead."""
+    if (
+        os.environ.get(NO_AGENT_ENV_VAR)
+        or not hasattr(socket, "send_fds")
+        or any(arg in LOCAL_ONLY_COMMANDS for arg in argv)
+    ):
+        return None
+
+    socket_path = get_agent_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    forwarded_fds = get_referenced_fds(argv)
+    if len(forwarded_fds) > MAX_FORWARDED_FDS or not all(
+        _is_open(fd) for fd in forwarded_fds
+    ):
+        # in the agent, these paths would refer to the agent's own file descriptors
+        return None
+
+    request = {
+        "request": RUN_REQUEST,
+        "version": __version__,
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "fds": forwarded_fds,
+    }
+    try:
+        agent_socket = _connect(socket_path)
+        socket.send_fds(
+            agent_socket, [encode_message(request)], STDIO_FDS + forwarded_fds
+        )
+    except OSError:
+        LOGGER.debug("Could not connect to terralab agent; running command locally")
+        return None
+
+    with agent_socket, agent_socket.makefile("rb") as agent_responses:
+        started = decode_message(agent_responses.readline())
+        if "pid" not in started:
+            LOGGER.debug(f"terralab agent declined command: {started.get('error')}")
+            return None
+        try:
+            finished = decode_message(agent_responses.readline())
+        except KeyboardInterrupt:
+            # the command's process isn't attached to this terminal, so pass the interrupt along
+            os.kill(started["pid"], signal.SIGINT)
+            finished = decode_message(agent_responses.readline())
+
+    return int(finished.get("exit_code", 1))
+
+
+def get_referenced_fds(argv: list[str]) -> list[int]:
+    """Return the file descriptors, other than stdin/stdout/stderr, that argv refers to by /dev/fd/N paths."""
+    referenced_fds = {
+        int(match.group(1)) for arg in argv for match in FD_PATH_PATTERN.finditer(arg)
+    }
+    return sorted(referenced_fds - set(STDIO_FDS))
+
+
+def replace_referenced_fds(argv: list[str], fd_map: dict[int, int]) -> list[str]:
+    """Return argv with each /dev/fd/N path for a file descriptor in fd_map replaced by one for fd_map[N]."""
+
+    def replace(match: re.Match[str]) -> str:
+        fd = int(match.group(1))
+        return f"/dev/fd/{fd_map[fd]}" if fd in fd_map else match.group(0)
+
+    return [FD_PATH_PATTERN.sub(replace, arg) for arg in argv]
+
+
+def _is_open(fd: int) -> bool:
+    try:
+        os.fstat(fd)
+        return True
+    except OSError:
+        return False
+
+
+def send_agent_request(request_type: str, socket_path: str) -> dict[str, Any]:
+    """Send a control request (ping or stop) to the agent and return its response.
+    Raises an OSError if the agent is not running."""
+    with _connect(socket_path) as agent_socket:
+        agent_socket.sendall(encode_message({"request": request_type}))
+        with agent_socket.makefile("rb") as agent_responses:
+            return decode_message(agent_responses.readline())
+
+
+def _connect(socket_path: str) -> socket.socket:
+    agent_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        agent_socket.connect(socket_path)
+    except OSError:
+        agent_socket.close()
+        raise
+    return agent_socket
+
+
+def encode_message(message: dict[str, Any]) -> bytes:
+    return json.dumps(message).encode("utf-8") + b"\n"
+
+
+def decode_message(line: bytes) -> dict[str, Any]:
+    # an empty line means the other side closed the connection
+    message: dict[str, Any] = json.loads(line) if line.strip() else {}
+    return message
@@ -0,0 +1,192 @@
+# agent_server.py
+
+import importlib
+import logging
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import time
+from typing import Any
+
+from terralab import __version__
+from terralab.agent import (
+    MAX_FORWARDED_FDS,
+    MAX_MESSAGE_BYTES,
+    PING_REQUEST,
+    STDIO_FDS,
+    STOP_REQUEST,
+    decode_message,
+    encode_message,
+    get_agent_socket_path,
+    replace_referenced_fds,
+    send_agent_request,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+AGENT_START_TIMEOUT_SECONDS = 10
+
+
+class AgentRequestHandler(socketserver.BaseRequestHandler):
+    """Handles a single request; with ForkingMixIn, this runs in a forked copy of the warm agent."""
+
+    def handle(self) -> None:
+        message, fds, _, _ = socket.recv_fds(
+            self.request, MAX_MESSAGE_BYTES, len(STDIO_FDS) + MAX_FORWARDED_FDS
+        )
+        while not message.endswith(b"\n"):
+            if not (chunk := self.request.recv(MAX_MESSAGE_BYTES)):
+                return
+            message += chunk
+        request = decode_message(message)
+
+        if request.get("request") == PING_REQUEST:
+            self._respond({"pid": os.getppid(), "version": __version__})
+        elif request.get("request") == STOP_REQUEST:
+            self._respond({"pid": os.getppid()})
+            os.kill(os.getppid(), signal.SIGTERM)
+        elif request.get("version") != __version__:
+            self._respond({"error": f"agent is running version {__version__}"})
+        elif len(fds) != len(STDIO_FDS) + len(request.get("fds", [])):
+            self._respond(
+                {"error": "expected stdin, stdout, stderr, and the forwarded fds"}
+            )
+        else:
+            self._respond({"pid": os.getpid()})
+            exit_code = run_command(
+                request["argv"],
+                request["cwd"],
+                request["env"],
+                fds,
+                request.get("fds", []),
+            )
+            self._respond({"exit_code": exit_code})
+            return
+        # the caller's file descriptors weren't used
+        for fd in fds:
+            os.close(fd)
+
+    def _respond(self, response: dict[str, Any]) -> None:
+        self.request.sendall(encode_message(response))
+
+
+class AgentServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that forks a child per request, so every command starts from the warm agent state
+    and commands can't interfere with each other."""
+
+    # don't wait for running commands when the agent is stopped
+    block_on_close = False
+
+
+def run_command(
+    argv: list[str],
+    cwd: str,
+    env: dict[str, str],
+    fds: list[int],
+    forwarded_fds: list[int] | None = None,
+) -> int:
+    """Run a terralab command in this process, attached to the caller's stdio file descriptors.
+    fds holds the received copies of the caller's stdio file descriptors, followed by those of forwarded_fds,
+    which argv refers to by the caller's numbers."""
+    for target_fd, fd in zip(STDIO_FDS, fds):
+        os.dup2(fd, target_fd)
+        os.close(fd)
+    # the received copies are open under different numbers in this process
+    argv = replace_referenced_fds(
+        argv, dict(zip(forwarded_fds or [], fds[len(STDIO_FDS) :]))
+    )
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    # the caller's interrupts are forwarded as SIGINT; restore the default handling the agent disabled
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    from terralab.cli import cli
+
+    try:
+        cli.main(args=argv, prog_name="terralab")
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        sys.stderr.write(f"{e.code}\n")
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return 0
+
+
+def warm_up() -> None:
+    """Import the CLI and load its config, so forked commands start with both ready."""
+    from terralab.config import load_config
+
+    importlib.import_module("terralab.cli")
+
+    try:
+        load_config()
+    except Exception as e:
+        # commands will retry loading the config and report the error themselves
+        LOGGER.debug(f"Failed to load config while starting agent: {e}")
+
+
+def serve(socket_path: str) -> None:
+    """Run the agent in the foreground until it is sent SIGTERM or a stop request."""
+    if os.path.exists(socket_path):
+        try:
+            send_agent_request(PING_REQUEST, socket_path)
+            raise RuntimeError(f"terralab agent is already running at {socket_path}")
+        except OSError:
+            os.remove(
+                socket_path
+            )  # left over from an agent that didn't shut down cleanly
+
+    warm_up()
+
+    def stop(signum: int, frame: Any) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    # interrupts are meant for commands, which restore the default handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    old_umask = os.umask(0o077)  # only the current user may connect
+    try:
+        server = AgentServer(socket_path, AgentRequestHandler)
+    finally:
+        os.umask(old_umask)
+    try:
+        with server:
+            server.serve_forever()
+    finally:
+        os.remove(socket_path)
+
+
+def start_agent_process(socket_path: str) -> int:
+    """Start the agent as a detached background process, wait for it to accept connections, and return its pid.
+    Raises a RuntimeError if the agent doesn't start in time."""
+    agent_process = subprocess.Popen(
+        [sys.executable, "-m", "terralab.agent_server", socket_path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,  # detach from the terminal, so the agent outlives it
+    )
+    deadline = time.monotonic() + AGENT_START_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if agent_process.poll() is not None:
+            break
+        try:
+            pid: int = send_agent_request(PING_REQUEST, socket_path)["pid"]
+            return pid
+        except (OSError, KeyError):
+            time.sleep(0.1)
+    raise RuntimeError("terralab agent did not start")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else get_agent_socket_path())
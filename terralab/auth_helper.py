@@ -18,17 +18,23 @@ from oauth2_cli_auth._urllib_util import _load_json
 from urllib import parse as urllibparse, request as urllibrequest, error as urlliberror
 
 from terralab.config import CliConfig
+from terralab.exceptions import AuthenticationError
+from terralab.tracing import traced
 
 LOGGER = logging.getLogger(__name__)
 
 
-def get_or_refresh_access_token(cli_config: CliConfig) -> str:
+@traced()
+def get_or_refresh_access_token(
+    cli_config: CliConfig, interactive_login: bool = True
+) -> str:
     """
     Check for a valid access token; if one exists, return it.
 
     Otherwise, check for a refresh token; if one exists, attempt to get and save new tokens, and return the access token.
 
     If refresh attempt fails or if no refresh token is found, prompt user to login via browser, get and save access and refresh tokens, and return the access token.
+    If interactive_login is False, raise an AuthenticationError instead of prompting the user to login.
 
     Returns a valid access token"""
     """Get a valid access token, refreshing or obtaining a new one if necessary."""
@@ -61,6 +67,11 @@ def get_or_refresh_access_token(cli_config: CliConfig) -> str:
             LOGGER.debug(f"Token refresh failed: {e}")
 
     if not new_refresh_token:
+        if not interactive_login:
+            raise AuthenticationError(
+                None,
+                "Not logged in, or the login has expired. Run 'terralab login' first.",
+            )
         LOGGER.debug("Getting new tokens via browser login")
         new_access_token, new_refresh_token = get_tokens_with_browser_open(cli_config)
 
@@ -69,6 +80,7 @@ def get_or_refresh_access_token(cli_config: CliConfig) -> str:
     return new_access_token
 
 
+@traced()
 def get_tokens_with_custom_redirect(cli_config: CliConfig) -> tuple[str, str]:
     """
     Provides a simplified API to:
@@ -102,6 +114,7 @@ def get_tokens_with_custom_redirect(cli_config: CliConfig) -> tuple[str, str]:
     return response_dict["access_token"], response_dict["refresh_token"]
 
 
+@traced()
 def get_tokens_with_browser_open(cli_config: CliConfig) -> tuple[str, str]:
     """
     Note: this is overridden from the oauth2-cli-auth library to use a custom auth url
@@ -157,6 +170,7 @@ def _open_browser(
     webbrowser.open(url)
 
 
+@traced()
 def refresh_tokens(cli_config: CliConfig, refresh_token: str) -> tuple[str, str]:
     client_info = cli_config.client_info
 
@@ -184,8 +198,7 @@ def _exchange_code_for_response(
     """
     # validate grant_type input. note this is not determined by user input.
     if grant_type not in ["authorization_code", "refresh_token"]:
-        LOGGER.error(f"Authentication error: Unexpected grant_type {grant_type}")
-        exit(1)
+        raise ValueError(f"Authentication error: Unexpected grant_type {grant_type}")
 
     headers = {
         "Content-Type": "application/x-www-form-urlencoded",
@@ -234,6 +247,19 @@ def _validate_token(token: str) -> bool:
         return False
 
 
+def get_token_expiry(token: str) -> float | None:
+    """Return the expiration time of a token as a unix timestamp, or None if it can't be determined
+    (e.g. for oauth tokens, which aren't JWTs)."""
+    try:
+        # as in _validate_token, the signature is verified by the backend services
+        claims = jwt.decode(
+            token, options={"verify_signature": False, "verify_exp": False}
+        )
+        return float(claims["exp"])
+    except Exception:
+        return None
+
+
 def _clear_local_token(token_file: str) -> None:
     try:
         os.remove(token_file)
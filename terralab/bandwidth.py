@@ -0,0 +1,145 @@
+# bandwidth.py
+
+"""
+Bandwidth limits for signed URL uploads and downloads, shared by all transfers in the process.
+
+A limit applies at all times (--max-bandwidth), or only during windows of the day given by a schedule
+(--bandwidth-schedule), e.g. `08:00-18:00=10M,18:00-08:00=100M`. Outside of all schedule windows,
+the --max-bandwidth limit applies, if any.
+"""
+
+import datetime
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from terralab.rate_limit import TokenBucket
+
+UNLIMITED = "unlimited"
+BYTE_UNIT_MULTIPLIERS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+BANDWIDTH_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?(?:/s)?$", re.I)
+# how often to check whether a different schedule window applies
+SCHEDULE_CHECK_INTERVAL_SECONDS = 1.0
+
+
+def parse_bandwidth(bandwidth: str) -> float | None:
+    """Parse a bandwidth like `500K`, `10M`, or `1.5G` (bytes per second, in binary units) to bytes per second.
+    Returns None for `unlimited`."""
+    if bandwidth.strip().lower() == UNLIMITED:
+        return None
+    if not (match := BANDWIDTH_PATTERN.match(bandwidth.strip())):
+        raise ValueError(
+            f"Invalid bandwidth '{bandwidth}'; expected a number of bytes per second like 500K, 10M, or 1G"
+        )
+    bytes_per_second = float(match[1]) * BYTE_UNIT_MULTIPLIERS[match[2].upper()]
+    if bytes_per_second <= 0:
+        raise ValueError(f"Invalid bandwidth '{bandwidth}'; must be greater than 0")
+    return bytes_per_second
+
+
+@dataclass(frozen=True)
+class ScheduleWindow:
+    """A time-of-day window during which a bandwidth limit applies; windows may wrap past midnight"""
+
+    start: datetime.time
+    end: datetime.time
+    bytes_per_second: float | None
+
+    def contains(self, time_of_day: datetime.time) -> bool:
+        if self.start <= self.end:
+            return self.start <= time_of_day < self.end
+        return time_of_day >= self.start or time_of_day < self.end
+
+
+def parse_schedule(schedule: str) -> list[ScheduleWindow]:
+    """Parse a schedule like `08:00-18:00=10M,18:00-08:00=unlimited` to a list of ScheduleWindows."""
+    windows = []
+    for window in filter(None, (part.strip() for part in schedule.split(","))):
+        times, separator, bandwidth = window.partition("=")
+        start, _, end = times.partition("-")
+        try:
+            if not separator:
+                raise ValueError("missing bandwidth")
+            windows.append(
+                ScheduleWindow(
+                    start=datetime.time.fromisoformat(start.strip()),
+                    end=datetime.time.fromisoformat(end.strip()),
+                    bytes_per_second=parse_bandwidth(bandwidth),
+                )
+            )
+        except ValueError as e:
+            raise ValueError(
+                f"Invalid bandwidth schedule window '{window}'; expected HH:MM-HH:MM=BANDWIDTH ({e})"
+            ) from e
+    return windows
+
+
+class BandwidthLimiter:
+    """Limits the combined throughput of all transfers that call throttle()"""
+
+    def __init__(
+        self,
+        max_bytes_per_second: float | None,
+        schedule: list[ScheduleWindow] | None = None,
+    ) -> None:
+        self.max_bytes_per_second = max_bytes_per_second
+        self.schedule = schedule or []
+        self._bucket: TokenBucket | None = None
+        self._checked_schedule_at: float | None = None
+        self._lock = threading.Lock()
+
+    def get_bytes_per_second(
+        self, now: datetime.datetime | None = None
+    ) -> float | None:
+        """Return the bandwidth limit that applies at the given (by default, the current) local time."""
+        time_of_day = (now or datetime.datetime.now()).time()
+        for window in self.schedule:
+            if window.contains(time_of_day):
+                return window.bytes_per_second
+        return self.max_bytes_per_second
+
+    def throttle(self, n_bytes: int) -> None:
+        """Wait until n_bytes more may be transferred under the current limit."""
+        if (bucket := self._get_bucket()) is not None:
+            bucket.acquire(n_bytes)
+
+    def _get_bucket(self) -> TokenBucket | None:
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_schedule_at is None or (
+                self.schedule
+                and now - self._checked_schedule_at >= SCHEDULE_CHECK_INTERVAL_SECONDS
+            ):
+                self._checked_schedule_at = now
+                bytes_per_second = self.get_bytes_per_second()
+                if bytes_per_second is None:
+                    self._bucket = None
+                elif (
+                    self._bucket is None
+                    or self._bucket.rate_per_second != bytes_per_second
+                ):
+                    # allows bursts of up to a second's worth of data
+                    self._bucket = TokenBucket(bytes_per_second)
+            return self._bucket
+
+
+_bandwidth_limiter: BandwidthLimiter | None = None
+
+
+def configure_bandwidth_limit(
+    max_bytes_per_second: float | None, schedule: list[ScheduleWindow] | None = None
+) -> None:
+    """Set the bandwidth limit for all transfers in this process."""
+    global _bandwidth_limiter
+    _bandwidth_limiter = (
+        BandwidthLimiter(max_bytes_per_second, schedule)
+        if max_bytes_per_second is not None or schedule
+        else None
+    )
+
+
+def throttle(n_bytes: int) -> None:
+    """Wait until n_bytes more may be transferred under the configured bandwidth limit, if any."""
+    if _bandwidth_limiter is not None:
+        _bandwidth_limiter.throttle(n_bytes)
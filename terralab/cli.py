@@ -2,13 +2,21 @@
 
 import collections
 import logging
+from collections.abc import Callable
 from typing import Optional, MutableMapping, Any
 
 import click
 
-from terralab import __version__, log
+from terralab import __version__, bandwidth, log, output, profiling, retry, tracing
+from terralab.transfer_stats import get_transfer_stats
 from terralab.version_utils import check_version
 from terralab.commands.account_commands import account
+from terralab.commands.agent_commands import (
+    agent,
+    start as start_agent,
+    stop as stop_agent,
+    status as status_agent,
+)
 from terralab.commands.auth_commands import logout, login_with_oauth, login
 from terralab.commands.pipeline_runs_commands import (
     submit,
@@ -38,7 +46,7 @@ class OrderedGroup(click.Group):
         self,
         name: Optional[str] = None,
         commands: Optional[MutableMapping[str, click.Command]] = None,
-        **kwargs: Any
+        **kwargs: Any,
     ) -> None:
         super(OrderedGroup, self).__init__(name, commands, **kwargs)
         #: the registered subcommands by their exported names.
@@ -47,6 +55,20 @@ class OrderedGroup(click.Group):
     def list_commands(self, ctx: click.Context) -> list[str]:
         return list(self.commands)
 
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        # allow --profile without a value (before the subcommand name only)
+        return super().parse_args(ctx, profiling.normalize_profile_args(args))
+
+
+def _parse_option(parse: Callable[[str], Any], value: str | None) -> Any:
+    """Parse an option value with the given function, reporting a ValueError as a usage error"""
+    if value is None:
+        return None
+    try:
+        return parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
 
 @click.group(context_settings=CONTEXT_SETTINGS, cls=OrderedGroup)
 @click.version_option(__version__)
@@ -56,13 +78,100 @@ class OrderedGroup(click.Group):
     hidden=True,  # doesn't show up in terralab --help menu
     help="DEBUG-level logging",
 )
-def cli(debug: bool) -> None:
+@click.option(
+    "output_format",
+    "--output",
+    type=click.Choice(output.OUTPUT_FORMATS),
+    default=output.TEXT_FORMAT,
+    help="Format for command results. Machine-readable formats (json, ndjson, csv) are written to stdout.",
+)
+@click.option(
+    "--max-retries",
+    type=click.IntRange(min=0),
+    default=retry.RetryPolicy().max_attempts - 1,
+    show_default=True,
+    help="Maximum number of times to retry a failed server request or file transfer.",
+)
+@click.option(
+    "--max-bandwidth",
+    type=str,
+    callback=lambda ctx, param, value: _parse_option(bandwidth.parse_bandwidth, value),
+    help="Maximum combined upload and download speed, in bytes per second (e.g. 500K, 10M, 1G).",
+)
+@click.option(
+    "--bandwidth-schedule",
+    type=str,
+    callback=lambda ctx, param, value: _parse_option(bandwidth.parse_schedule, value),
+    help="Maximum transfer speeds by local time of day, e.g. '08:00-18:00=10M,18:00-08:00=unlimited'. "
+    "Outside the scheduled times, --max-bandwidth applies.",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    help="Print a summary of file upload and download performance when the command finishes.",
+)
+@click.option(
+    "--stats-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write per-file and aggregate file transfer metrics as JSON to this file when the command finishes.",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Record how long each step of the command takes (authentication, server requests, file transfers) "
+    "and write the trace to this file.",
+)
+@click.option(
+    "--trace-format",
+    type=click.Choice(tracing.TRACE_FORMATS),
+    default=tracing.CHROME_FORMAT,
+    show_default=True,
+    help="Format for --trace-file: Chrome trace events (viewable at https://ui.perfetto.dev) or OTLP JSON.",
+)
+@click.option(
+    "--profile",
+    type=click.Choice(profiling.PROFILERS),
+    hidden=True,
+    help="Profile the command with cProfile (the default) or by sampling stacks.",
+)
+@click.option(
+    "--profile-file",
+    type=click.Path(dir_okay=False, writable=True),
+    hidden=True,
+    help="File to write the --profile output to.",
+)
+def cli(
+    debug: bool,
+    output_format: str,
+    max_retries: int,
+    max_bandwidth: float | None,
+    bandwidth_schedule: list[bandwidth.ScheduleWindow] | None,
+    stats: bool,
+    stats_file: str | None,
+    trace_file: str | None,
+    trace_format: str,
+    profile: str | None,
+    profile_file: str | None,
+) -> None:
     """To submit a job, run `terralab submit PIPELINE_NAME [INPUTS] --description DESCRIPTION`
 
     For more information about the required inputs for a pipeline, run `terralab pipelines details PIPELINE_NAME`
 
     To list available pipelines, run `terralab pipelines list`"""
+    # the terralab entrypoint starts profiling before importing the CLI; otherwise start now
+    if profile and profiling.start_profiling(profile, profile_file):
+        click.get_current_context().call_on_close(profiling.stop_profiling)
     log.configure_logging(debug)
+    output.configure_output(output_format)
+    retry.configure_retries(retry.RetryPolicy(max_attempts=max_retries + 1))
+    bandwidth.configure_bandwidth_limit(max_bandwidth, bandwidth_schedule)
+    if stats or stats_file:
+        # report once the command finishes, including if it fails
+        click.get_current_context().call_on_close(
+            lambda: _report_transfer_stats(stats, stats_file)
+        )
+    if trace_file:
+        _trace_command(trace_file, trace_format)
     LOGGER.debug(
         "Log level set to: %s", logging.getLevelName(logging.getLogger().level)
     )
@@ -71,6 +180,37 @@ def cli(debug: bool) -> None:
     check_version()
 
 
+def _report_transfer_stats(stats: bool, stats_file: str | None) -> None:
+    transfer_stats = get_transfer_stats()
+    if stats:
+        LOGGER.info(
+            log.add_blankline_before(
+                log.join_lines(transfer_stats.format_summary_lines())
+            )
+        )
+    if stats_file:
+        try:
+            transfer_stats.write_json(stats_file)
+        except OSError as e:
+            LOGGER.error(f"Unable to write transfer stats to '{stats_file}': {e}")
+
+
+def _trace_command(trace_file: str, trace_format: str) -> None:
+    """Trace the rest of the command, writing the trace to trace_file when the command finishes."""
+    tracer = tracing.enable_tracing()
+    ctx = click.get_current_context()
+
+    def write_trace() -> None:
+        try:
+            tracer.write(trace_file, trace_format)
+        except OSError as e:
+            LOGGER.error(f"Unable to write trace to '{trace_file}': {e}")
+
+    # the command span is closed (and recorded) before the trace is written, since these run in reverse order
+    ctx.call_on_close(write_trace)
+    ctx.with_resource(tracing.span(f"terralab {ctx.invoked_subcommand}"))
+
+
 # the order in which these are added determines the order in which they show up in the --help output
 cli.add_command(submit)
 cli.add_command(download)
@@ -94,6 +234,12 @@ cli.add_command(account)
 cli.add_command(login)
 cli.add_command(logout)
 
+# agent
+cli.add_command(agent)
+cli.add_command(start_agent, name="  agent start")
+cli.add_command(stop_agent, name="  agent stop")
+cli.add_command(status_agent, name="  agent status")
+
 cli.add_command(login_with_oauth)  # this is hidden from the help menu
 
 
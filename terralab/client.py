@@ -1,21 +1,65 @@
 # client.py
 
+import contextlib
+import functools
 import logging
+from collections.abc import Iterator
+from contextvars import ContextVar
 from typing import Any
+from urllib.parse import urlsplit
 
 from teaspoons_client import ApiClient, Configuration  # type: ignore[attr-defined]
 
 from terralab.auth_helper import get_or_refresh_access_token
 from terralab.config import load_config
+from terralab.rate_limit import get_api_rate_limiter
+from terralab.retry import get_api_retries
+from terralab import tracing
 
 LOGGER = logging.getLogger(__name__)
 
 
+class RateLimitedApiClient(ApiClient):
+    """ApiClient that waits for the configured client-side rate limits before each request"""
+
+    def call_api(self, method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+        path = urlsplit(url).path
+        with tracing.span(
+            f"{method} {path}", http_method=method, http_path=path
+        ) as span:
+            if (rate_limiter := get_api_rate_limiter()) is not None:
+                rate_limiter.acquire(method, path)
+            response = super().call_api(method, url, *args, **kwargs)
+            if span is not None:
+                span.set_attribute("http_status_code", response.status)
+            return response
+
+
+@functools.lru_cache(maxsize=1)
 def _get_api_client(token: str, api_url: str) -> ApiClient:
+    # reuse the client (and its connection pool) across API calls made with the same token
     api_config = Configuration()
     api_config.host = api_url
     api_config.access_token = token
-    return ApiClient(configuration=api_config)
+    api_config.retries = get_api_retries()
+    return RateLimitedApiClient(configuration=api_config)
+
+
+# api client provided by a terralab.Session, used instead of building one from the local config
+_session_api_client: ContextVar[ApiClient | None] = ContextVar(
+    "session_api_client", default=None
+)
+
+
+@contextlib.contextmanager
+def use_api_client(api_client: ApiClient) -> Iterator[None]:
+    """Make ClientWrapper provide the given api client within this context (including in threads and
+    tasks started from it), instead of loading the config and access token itself."""
+    reset_token = _session_api_client.set(api_client)
+    try:
+        yield
+    finally:
+        _session_api_client.reset(reset_token)
 
 
 class ClientWrapper:
@@ -24,7 +68,11 @@ class ClientWrapper:
     by subsequent commands
     """
 
+    @tracing.traced("client.ClientWrapper")
     def __enter__(self) -> ApiClient:
+        if (session_api_client := _session_api_client.get()) is not None:
+            return session_api_client
+
         cli_config = load_config()  # initialize the config from environment variables
 
         access_token = get_or_refresh_access_token(cli_config)
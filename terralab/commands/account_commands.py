@@ -5,6 +5,7 @@ import logging
 import click
 
 from terralab.log import format_table_no_header, indented, add_blankline_before
+from terralab import output
 from terralab.logic import account_logic
 
 LOGGER = logging.getLogger(__name__)
@@ -14,6 +15,16 @@ LOGGER = logging.getLogger(__name__)
 def account() -> None:
     """Get information about your account"""
     account_info = account_logic.get_account_info()
+    if output.is_machine_readable():
+        cloud_info = account_logic.get_cloud_info()
+        output.emit(
+            {
+                "account": {row[0]: row[1] for row in account_info},
+                "cloudResourceSharing": {row[0]: row[1] for row in cloud_info},
+            }
+        )
+        return
+
     LOGGER.info("Your Account")
     LOGGER.info(add_blankline_before(format_table_no_header(account_info)))
 
@@ -0,0 +1,43 @@
+# commands/agent_commands.py
+
+import logging
+
+import click
+
+from terralab.logic import agent_logic
+
+LOGGER = logging.getLogger(__name__)
+
+
+@click.group()
+def agent() -> None:
+    """Manage the terralab agent, a background process that makes commands start faster"""
+
+
+@agent.command(short_help="Start the terralab agent")
+def start() -> None:
+    """Start the terralab agent in the background. While it is running, terralab commands run in the agent,
+    which keeps terralab's dependencies and configuration loaded between commands."""
+    if pid := agent_logic.get_agent_pid():
+        LOGGER.info(f"terralab agent is already running (pid {pid})")
+        return
+    pid = agent_logic.start_agent()
+    LOGGER.info(f"Started terralab agent (pid {pid})")
+
+
+@agent.command(short_help="Stop the terralab agent")
+def stop() -> None:
+    """Stop the terralab agent. Commands will run in their own processes again."""
+    if agent_logic.stop_agent():
+        LOGGER.info("Stopped terralab agent")
+    else:
+        LOGGER.info("terralab agent is not running")
+
+
+@agent.command(short_help="Check whether the terralab agent is running")
+def status() -> None:
+    """Check whether the terralab agent is running"""
+    if pid := agent_logic.get_agent_pid():
+        LOGGER.info(f"terralab agent is running (pid {pid})")
+    else:
+        LOGGER.info("terralab agent is not running")
@@ -1,11 +1,12 @@
 # commands/pipeline_runs_commands.py
 
+import itertools
 import logging
 from typing import Any
 import uuid
 
 import click
-from teaspoons_client import AsyncPipelineRunResponseV2, DataDeliveryReport, PipelineRun  # type: ignore[attr-defined]
+from teaspoons_client import AsyncPipelineRunResponseV2, DataDeliveryReport  # type: ignore[attr-defined]
 
 from terralab.constants import (
     FAILED_KEY,
@@ -13,13 +14,18 @@ from terralab.constants import (
     SUCCEEDED_KEY,
     TERMS_OF_SERVICE_URL,
 )
+from terralab.download_layout import DEFAULT_LAYOUT
+from terralab.gcs_helper import GcsObjectChecker, get_gcloud_access_token
 from terralab.log import (
     indented,
     add_blankline_before,
-    format_table_with_status,
     format_status,
+    format_table,
+    iter_table_lines_with_status,
 )
+from terralab import output
 from terralab.logic import pipeline_runs_logic, pipelines_logic
+from terralab.stream_download import open_named_pipe, open_stdout
 from terralab.utils import (
     convert_file_size_to_human_readable,
     handle_api_exceptions,
@@ -50,6 +56,24 @@ LOGGER = logging.getLogger(__name__)
     help=f"Agree to the terms of service ({TERMS_OF_SERVICE_URL}). This is required to run a pipeline.",
     prompt=f"Please agree to the terms of service ({TERMS_OF_SERVICE_URL}) to run a pipeline. Do you agree?",
 )
+@click.option(
+    "prevalidate_cloud",
+    "--prevalidate-cloud",
+    is_flag=True,
+    help="Check that all cloud (gs://) file inputs exist before submitting. Requires the gcloud CLI.",
+)
+@click.option(
+    "compress_inputs",
+    "--compress-inputs",
+    is_flag=True,
+    help="Compress (with bgzip) uncompressed local files for inputs that take compressed files, e.g. a .vcf file for a .vcf.gz input, while uploading them.",
+)
+@click.option(
+    "reuse_uploads",
+    "--reuse-uploads",
+    is_flag=True,
+    help="Instead of uploading local files again that were uploaded for an earlier job and haven't changed since, use the earlier uploads.",
+)
 @click.argument("inputs", nargs=-1, type=click.UNPROCESSED)
 @handle_api_exceptions
 def submit(
@@ -58,17 +82,40 @@ def submit(
     inputs: tuple[str, ...],
     description: str,
     agree_to_terms: bool,
+    prevalidate_cloud: bool,
+    compress_inputs: bool,
+    reuse_uploads: bool,
 ) -> None:
     """Submit a job for a PIPELINE_NAME pipeline
 
     To see the required inputs for a given pipeline, use the `terralab pipelines details` command.
+
+    Array inputs can be passed comma-separated (`--INPUT_NAME value1,value2`), or read one value
+    per line from a file (`--INPUT_NAME=@values.txt`) or from stdin (`--INPUT_NAME=@-`).
+    To pass a value that starts with `@`, double the `@` (`--INPUT_NAME=@@value`).
     """
     LOGGER.debug(f"inputs: {inputs}")
     inputs_dict = process_inputs_to_dict(inputs)
     LOGGER.debug(f"inputs processed to dict: {inputs_dict}")
 
     # validate inputs
-    pipelines_logic.validate_pipeline_inputs(pipeline_name, version, inputs_dict)
+    cloud_object_checker: GcsObjectChecker | None = None
+    if prevalidate_cloud:
+        cloud_object_checker = GcsObjectChecker(get_gcloud_access_token())
+        pipeline_info = pipelines_logic.validate_pipeline_inputs(
+            pipeline_name, version, inputs_dict, cloud_object_checker
+        )
+    else:
+        pipeline_info = pipelines_logic.validate_pipeline_inputs(
+            pipeline_name, version, inputs_dict
+        )
+
+    if reuse_uploads and cloud_object_checker is None:
+        # earlier uploads are checked before they're reused; without gcloud, files are uploaded again
+        try:
+            cloud_object_checker = GcsObjectChecker(get_gcloud_access_token())
+        except RuntimeError as e:
+            LOGGER.debug(f"Can't check earlier uploads: {e}")
 
     if not agree_to_terms:
         LOGGER.error(
@@ -79,13 +126,25 @@ def submit(
         exit(1)
 
     submitted_job_id = pipeline_runs_logic.prepare_upload_start_pipeline_run(
-        pipeline_name, version, inputs_dict, description, agree_to_terms
+        pipeline_name,
+        version,
+        inputs_dict,
+        description,
+        agree_to_terms,
+        compress_inputs,
+        reuse_uploads,
+        cloud_object_checker,
+        pipeline_info,
     )
 
+    if output.is_machine_readable():
+        output.emit({"jobId": submitted_job_id})
+        return
+
     LOGGER.info(f"Successfully started {pipeline_name} job {submitted_job_id}")
 
 
-@click.command(short_help="Download all output files from a job")
+@click.command(short_help="Download output files from a job")
 @click.argument("job_id", type=str)
 @click.option(
     "--local_destination",
@@ -93,15 +152,131 @@ def submit(
     default=".",
     help="optional location to download results to. defaults to the current directory.",
 )
+@click.option(
+    "output_names",
+    "--output-name",
+    multiple=True,
+    help="Download only the output with this name. Can be given more than once.",
+)
+@click.option(
+    "include_patterns",
+    "--include",
+    multiple=True,
+    help="Download only outputs whose names match this glob pattern (e.g. '*Metrics*'). Can be given more than once.",
+)
+@click.option(
+    "exclude_patterns",
+    "--exclude",
+    multiple=True,
+    help="Don't download outputs whose names match this glob pattern. Can be given more than once.",
+)
+@click.option(
+    "list_outputs",
+    "--list",
+    is_flag=True,
+    help="List the selected outputs and their sizes instead of downloading them.",
+)
+@click.option(
+    "--layout",
+    type=str,
+    default=DEFAULT_LAYOUT,
+    show_default=True,
+    help="Where to save each output under the destination, as a template with the fields {job_id}, {output_name}, "
+    "{file_name}, {object_path} (the file's full cloud path within its bucket), and {bucket}, "
+    "e.g. '{job_id}/{output_name}/{file_name}'.",
+)
+@click.option(
+    "to_stdout",
+    "--to-stdout",
+    is_flag=True,
+    help="Stream the selected output to stdout instead of saving it, e.g. to pipe it into another tool. Only one output can be streamed.",
+)
+@click.option(
+    "to_pipe",
+    "--to-pipe",
+    type=click.Path(dir_okay=False),
+    help="Stream the selected output to this named pipe (created if it doesn't exist) instead of saving it. Only one output can be streamed.",
+)
 @handle_api_exceptions
-def download(job_id: str, local_destination: str) -> None:
-    """Download all output files from a job with JOB_ID identifier"""
+def download(
+    job_id: str,
+    local_destination: str,
+    output_names: tuple[str, ...],
+    include_patterns: tuple[str, ...],
+    exclude_patterns: tuple[str, ...],
+    list_outputs: bool,
+    layout: str,
+    to_stdout: bool,
+    to_pipe: str | None,
+) -> None:
+    """Download output files from a job with JOB_ID identifier.
+    Downloads all outputs unless outputs are selected with --output-name, --include, or --exclude.
+    """
     job_id_uuid: uuid.UUID = validate_job_id(job_id)
+    if sum([list_outputs, to_stdout, to_pipe is not None]) > 1:
+        LOGGER.error(
+            "Error: --list, --to-stdout, and --to-pipe can't be used together."
+        )
+        exit(1)
+
+    if to_stdout or to_pipe is not None:
+        stream_destination = (
+            open_stdout() if to_pipe is None else open_named_pipe(to_pipe)
+        )
+        with stream_destination as out_file:
+            pipeline_runs_logic.stream_pipeline_run_output(
+                job_id_uuid,
+                out_file,
+                output_names,
+                include_patterns,
+                exclude_patterns,
+            )
+        return
+
+    if list_outputs:
+        output_sizes = pipeline_runs_logic.list_pipeline_run_outputs(
+            job_id_uuid, output_names, include_patterns, exclude_patterns
+        )
+        if output.is_machine_readable():
+            output.emit_rows(
+                {"outputName": output_name, "sizeInBytes": size_bytes}
+                for output_name, size_bytes in output_sizes.items()
+            )
+            return
+        LOGGER.info(
+            format_table(
+                [["Output Name", "Size"]]
+                + [
+                    [
+                        output_name,
+                        (
+                            "unknown"
+                            if size_bytes is None
+                            else convert_file_size_to_human_readable(size_bytes)
+                        ),
+                    ]
+                    for output_name, size_bytes in output_sizes.items()
+                ]
+            )
+        )
+        return
 
-    pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
-        job_id_uuid, local_destination
+    downloaded_files = (
+        pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
+            job_id_uuid,
+            local_destination,
+            output_names,
+            include_patterns,
+            exclude_patterns,
+            layout,
+        )
     )
 
+    if output.is_machine_readable():
+        output.emit_rows(
+            {"localFilePath": local_file_path} for local_file_path in downloaded_files
+        )
+
 
 # JOBS group
 
@@ -123,6 +298,10 @@ def details(job_id: str) -> None:
         job_id_uuid
     )
 
+    if output.is_machine_readable():
+        output.emit(response)
+        return
+
     LOGGER.info(f"Status: {format_status(response.job_report.status)}")
 
     if response.error_report:
@@ -213,6 +392,15 @@ def display_data_delivery(data_delivery_report: DataDeliveryReport | None) -> No
     LOGGER.info(indented(f"Destination: {data_delivery_report.destination}"))
 
 
+# widths of the jobs list columns whose values have a known length: uuid, longest status, formatted timestamps
+JOBS_LIST_COLUMN_WIDTH_HINTS = {
+    "Job ID": 36,
+    "Status": len("Succeeded"),
+    "Submitted": 16,
+    "Output Expires": 16,
+}
+
+
 @jobs.command(name="list", short_help="List your jobs")
 @click.option(
     "--num_results",
@@ -222,10 +410,15 @@ def display_data_delivery(data_delivery_report: DataDeliveryReport | None) -> No
 )
 @handle_api_exceptions
 def list_command(num_results: int) -> None:
-    results: list[PipelineRun] = pipeline_runs_logic.get_pipeline_runs(num_results)
-    if results:
-        # create list of list of strings; first list is headers
-        row_list = [
+    if output.is_machine_readable():
+        # stream results as each page arrives rather than collecting them for a table
+        output.emit_rows(pipeline_runs_logic.iter_pipeline_runs(num_results))
+        return
+
+    pipeline_runs = pipeline_runs_logic.iter_pipeline_runs(num_results)
+    # create rows of strings as results arrive; first row is headers
+    row_iterator = itertools.chain(
+        [
             [
                 "Job ID",
                 "Pipeline",
@@ -234,20 +427,25 @@ def list_command(num_results: int) -> None:
                 "Output Expires",
                 "Description",
             ]
-        ]
-        for pipeline_run in results:
-            row_list.append(
-                [
-                    pipeline_run.job_id,
-                    f"{pipeline_run.pipeline_name} v{pipeline_run.pipeline_version}",
-                    pipeline_run.status,
-                    format_timestamp(pipeline_run.time_submitted),
-                    format_timestamp(pipeline_run.output_expiration_date),
-                    pipeline_run.description or "",
-                ]
-            )
+        ],
+        (
+            [
+                pipeline_run.job_id,
+                f"{pipeline_run.pipeline_name} v{pipeline_run.pipeline_version}",
+                pipeline_run.status,
+                format_timestamp(pipeline_run.time_submitted),
+                format_timestamp(pipeline_run.output_expiration_date),
+                pipeline_run.description or "",
+            ]
+            for pipeline_run in pipeline_runs
+        ),
+    )
 
-        LOGGER.info(format_table_with_status(row_list))
+    # print each page of results as it arrives; widths of fixed-width columns are known up front
+    for line in iter_table_lines_with_status(
+        row_iterator, width_hints=JOBS_LIST_COLUMN_WIDTH_HINTS
+    ):
+        LOGGER.info(line)
 
 
 # DELIVER group
@@ -265,10 +463,14 @@ def deliver(job_id: str, destination: str) -> None:
     job_id_uuid: uuid.UUID = validate_job_id(job_id)
     validated_destination: str = validate_gcs_path(destination)
 
-    pipeline_runs_logic.deliver_pipeline_run_to_cloud(
+    job_report = pipeline_runs_logic.deliver_pipeline_run_to_cloud(
         job_id_uuid, validated_destination
     )
 
+    if output.is_machine_readable():
+        output.emit(job_report)
+        return
+
     LOGGER.info(
         f"Successfully initiated data delivery for job {job_id} to {validated_destination}. Delivery may take a few minutes to complete."
     )
@@ -10,6 +10,7 @@ from terralab.log import (
     format_table,
     add_blankline_before,
 )
+from terralab import output
 from terralab.logic import pipelines_logic
 from terralab.utils import handle_api_exceptions
 
@@ -26,6 +27,10 @@ def pipelines() -> None:
 def list_command() -> None:
     """List all available pipelines"""
     pipelines_list = pipelines_logic.list_pipelines()
+    if output.is_machine_readable():
+        output.emit_rows(pipelines_list)
+        return
+
     LOGGER.info(
         f"Found {len(pipelines_list)} available pipeline{'' if len(pipelines_list) == 1 else 's'}:"
     )
@@ -50,6 +55,9 @@ def list_command() -> None:
 def details(pipeline_name: str, version: int) -> None:
     """Get information about the PIPELINE_NAME pipeline"""
     pipeline_info = pipelines_logic.get_pipeline_info(pipeline_name, version)
+    if output.is_machine_readable():
+        output.emit(pipeline_info)
+        return
 
     # Pipeline information table
     pipeline_info_rows = [
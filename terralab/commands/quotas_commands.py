@@ -5,6 +5,7 @@ import logging
 import click
 
 from terralab.log import indented, add_blankline_before
+from terralab import output
 from terralab.logic import quotas_logic
 from terralab.constants import QUOTAS_SUPPORT_ARTICLE_URL
 from terralab.utils import handle_api_exceptions
@@ -18,6 +19,10 @@ LOGGER = logging.getLogger(__name__)
 def quota(pipeline_name: str) -> None:
     """Get quota information for a specific PIPELINE_NAME pipeline"""
     quota_info = quotas_logic.get_user_quota(pipeline_name)
+    if output.is_machine_readable():
+        output.emit(quota_info)
+        return
+
     quota_limit = quota_info.quota_limit
     quota_consumed = quota_info.quota_consumed
     quota_pipeline = quota_info.pipeline_name
@@ -0,0 +1,120 @@
+# compression.py
+
+"""
+BGZF compression of input files while they're uploaded, for pipelines that take compressed (.gz) inputs.
+
+BGZF (the blocked gzip format used by bgzip, htslib, and samtools) is a series of gzip members, each compressing
+at most 64 KiB, so any gzip reader can read it and blocks can be compressed independently. Batches of blocks are
+compressed in parallel in a process pool and yielded in order, so a file can be streamed to a signed URL without
+writing a compressed copy to disk.
+"""
+
+import concurrent.futures
+import os
+import stat
+import struct
+import zlib
+from collections import deque
+from collections.abc import Callable, Iterator
+from typing import BinaryIO
+
+GZIP_SUFFIX = ".gz"
+GZIP_MAGIC = b"\x1f\x8b"
+# the most uncompressed data per block that's sure to compress to less than the 64 KiB block size limit
+BGZF_BLOCK_INPUT_SIZE = 0xFF00
+# blocks per batch sent to a worker process, to amortize the cost of sending data between processes
+BGZF_BLOCKS_PER_BATCH = 16
+BGZF_BATCH_SIZE = BGZF_BLOCK_INPUT_SIZE * BGZF_BLOCKS_PER_BATCH
+DEFAULT_COMPRESSION_LEVEL = 6
+# gzip header with the FEXTRA flag and a BC extra subfield, which holds the block size minus 1
+_BGZF_HEADER = struct.Struct("<4BI2BH2B2H")
+_BGZF_FOOTER = struct.Struct("<2I")
+# an empty block, which marks the end of a BGZF file
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+def compress_bgzf_block(data: bytes, level: int = DEFAULT_COMPRESSION_LEVEL) -> bytes:
+    """Compress up to BGZF_BLOCK_INPUT_SIZE bytes as a single BGZF block."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed_data = compressor.compress(data) + compressor.flush()
+    block_size = _BGZF_HEADER.size + len(compressed_data) + _BGZF_FOOTER.size
+    header = _BGZF_HEADER.pack(
+        0x1F, 0x8B, 8, 4, 0, 0, 0xFF, 6, ord("B"), ord("C"), 2, block_size - 1
+    )
+    footer = _BGZF_FOOTER.pack(zlib.crc32(data), len(data))
+    return header + compressed_data + footer
+
+
+def compress_bgzf_batch(data: bytes, level: int = DEFAULT_COMPRESSION_LEVEL) -> bytes:
+    """Compress data as consecutive BGZF blocks (without the end of file marker)."""
+    return b"".join(
+        compress_bgzf_block(data[offset : offset + BGZF_BLOCK_INPUT_SIZE], level)
+        for offset in range(0, len(data), BGZF_BLOCK_INPUT_SIZE)
+    )
+
+
+def iter_bgzf_compressed(
+    file: BinaryIO,
+    on_progress: Callable[[int], None] | None = None,
+    max_workers: int | None = None,
+    level: int = DEFAULT_COMPRESSION_LEVEL,
+) -> Iterator[bytes]:
+    """Compress a file to BGZF, yielding the compressed data in order as it's ready.
+    on_progress, if given, is called with the number of bytes of the file compressed so far.
+
+    Files larger than a batch are compressed in a pool of max_workers processes (by default, one per CPU),
+    with at most two batches per worker read ahead, so memory use doesn't grow with the size of the file.
+    """
+    bytes_read = 0
+    first_batch = file.read(BGZF_BATCH_SIZE)
+    if len(first_batch) < BGZF_BATCH_SIZE:
+        # not worth starting worker processes for
+        if first_batch:
+            yield compress_bgzf_batch(first_batch, level)
+        if on_progress is not None:
+            on_progress(len(first_batch))
+        yield BGZF_EOF
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        # (future, uncompressed size) for each batch being compressed, in file order
+        pending: deque[tuple[concurrent.futures.Future[bytes], int]] = deque()
+        batch = first_batch
+        try:
+            while batch or pending:
+                while batch and len(pending) < 2 * max_workers:
+                    pending.append(
+                        (executor.submit(compress_bgzf_batch, batch, level), len(batch))
+                    )
+                    batch = file.read(BGZF_BATCH_SIZE)
+                future, batch_size = pending.popleft()
+                compressed_batch = future.result()
+                bytes_read += batch_size
+                if on_progress is not None:
+                    on_progress(bytes_read)
+                yield compressed_batch
+        finally:
+            for future, _ in pending:
+                future.cancel()
+    yield BGZF_EOF
+
+
+def is_gzipped(local_file_path: str) -> bool:
+    """Return whether a file starts with the gzip magic number. Pipes are assumed not to be compressed,
+    since their data can only be read once."""
+    if not stat.S_ISREG(os.stat(local_file_path).st_mode):
+        return False
+    with open(local_file_path, "rb") as local_file:
+        return local_file.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def should_compress_input(local_file_path: str, file_suffix: str | None) -> bool:
+    """Return whether a local file should be compressed to upload it for an input with the given file suffix:
+    that is, if the input takes a compressed file (e.g. `.vcf.gz`) and the file is the uncompressed
+    equivalent (e.g. `.vcf`)."""
+    if not file_suffix or not file_suffix.endswith(GZIP_SUFFIX):
+        return False
+    return local_file_path.endswith(
+        file_suffix.removesuffix(GZIP_SUFFIX)
+    ) and not is_gzipped(local_file_path)
@@ -1,5 +1,6 @@
 # config.py
 
+import functools
 import logging
 from dataclasses import dataclass
 from importlib import resources as impresources
@@ -8,6 +9,8 @@ from pathlib import Path
 from dotenv import dotenv_values
 from oauth2_cli_auth import OAuth2ClientInfo
 
+from terralab.tracing import traced
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -19,6 +22,7 @@ class CliConfig:
     teaspoons_api_url: str
     server_port: int
     version_info_file: str
+    upload_index_file: str
     access_token_file: str
     refresh_token_file: str
     oauth_access_token_file: str
@@ -27,16 +31,21 @@ class CliConfig:
     sam_api_url: str
 
 
+@functools.cache
+@traced()
 def load_config(
     config_file: str = ".terralab-cli-config", package: str = "terralab"
 ) -> CliConfig:
+    # cached, since the config file doesn't change during a process and loading it involves
+    # an OIDC discovery request. this also lets the terralab agent keep a warm copy.
     # read values from the specified config file
     try:
         importable_config_file = str(impresources.files(package) / config_file)
         config = dotenv_values(importable_config_file)
     except ModuleNotFoundError as e:
-        LOGGER.error(f"Failed to load config from {package}/{config_file}: {e}")
-        exit(1)
+        raise RuntimeError(
+            f"Failed to load config from {package}/{config_file}: {e}"
+        ) from e
     LOGGER.debug(f"Imported config with values: {config}")
 
     if (server_port := config.get("SERVER_PORT")) is None:
@@ -64,6 +73,7 @@ def load_config(
         teaspoons_api_url=teaspoons_api_url,
         server_port=int(server_port),
         version_info_file=f'{Path.home()}/{config["LOCAL_STORAGE_PATH"]}/version_info.json',
+        upload_index_file=f'{Path.home()}/{config["LOCAL_STORAGE_PATH"]}/upload_index.json',
         access_token_file=f'{Path.home()}/{config["LOCAL_STORAGE_PATH"]}/access_token',
         refresh_token_file=f'{Path.home()}/{config["LOCAL_STORAGE_PATH"]}/refresh_token',
         oauth_access_token_file=f'{Path.home()}/{config["LOCAL_STORAGE_PATH"]}/oauth_access_token',
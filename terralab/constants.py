@@ -13,6 +13,8 @@ FILE_ARRAY_TYPE_KEY = "FILE_ARRAY"
 
 # supported cloud file input prefixes
 GCS_PREFIX = "gs://"
+# host of the GCS XML API, which GCS signed URLs point to
+GCS_API_HOST = "storage.googleapis.com"
 
 # file upload size limit
 MAX_FILE_UPLOAD_SIZE_BYTES = 50 * 1025 * 1024 * 1024  # 50GB
@@ -0,0 +1,146 @@
+# download_layout.py
+
+"""
+Where downloaded output files are saved, relative to the download destination.
+
+A layout is a template for each output file's local path, e.g. `{job_id}/{output_name}/{file_name}`, with fields:
+    job_id       the job's id
+    output_name  the name of the pipeline output
+    file_name    the last part of the file's cloud path (the default layout is just this)
+    object_path  the file's full path within its bucket, e.g. `outputs/chunk1/imputed.vcf.gz`
+    bucket       the file's bucket
+
+Every output's local path is planned before any download starts, and outputs that would be saved to the same
+path (or where one output's path is another's folder) are reported as errors, so that parallel downloads never
+write to the same file.
+"""
+
+import os
+import string
+import uuid
+from collections.abc import Iterable
+from urllib.parse import unquote, urlsplit
+
+from terralab.constants import GCS_PREFIX
+from terralab.gcs_urls import get_cloud_path_from_signed_url
+
+DEFAULT_LAYOUT = "{file_name}"
+LAYOUT_FIELDS = ["job_id", "output_name", "file_name", "object_path", "bucket"]
+
+
+def get_file_name_from_signed_url(signed_url: str) -> str:
+    """Return the name of the file a signed URL points to. Signed URLs look like
+    https://storage.googleapis.com/fc-secure-6970c3a9-dc92-436d-af3d-917bcb4cf05a/test_signed_urls/helloworld.txt?x-goog-signature...
+    """
+    return signed_url.split("?")[0].split("/")[-1]
+
+
+def get_bucket_and_object_path(signed_url: str) -> tuple[str, str]:
+    """Return the bucket and the path within the bucket of the file a signed URL points to.
+    For URLs that aren't GCS signed URLs, the bucket is empty and the object path is the URL's path.
+    """
+    if cloud_path := get_cloud_path_from_signed_url(signed_url):
+        bucket, _, object_path = cloud_path.removeprefix(GCS_PREFIX).partition("/")
+        return bucket, object_path
+    return "", unquote(urlsplit(signed_url).path).strip("/")
+
+
+def validate_layout(layout: str) -> str:
+    """Check that a layout only uses known fields, returning it. Raises ValueError if not."""
+    try:
+        field_names = {
+            field_name
+            for _, field_name, _, _ in string.Formatter().parse(layout)
+            if field_name is not None
+        }
+    except ValueError as e:
+        raise ValueError(f"Invalid download layout '{layout}': {e}") from e
+    if unknown_field_names := field_names - set(LAYOUT_FIELDS):
+        raise ValueError(
+            f"Invalid download layout '{layout}': unknown field(s) {', '.join(sorted(unknown_field_names))}. "
+            f"Available fields: {', '.join(LAYOUT_FIELDS)}"
+        )
+    if not field_names & {"file_name", "object_path"}:
+        raise ValueError(
+            f"Invalid download layout '{layout}': must include {{file_name}} or {{object_path}}"
+        )
+    return layout
+
+
+def get_download_path(
+    local_destination_dir: str,
+    signed_url: str,
+    layout: str = DEFAULT_LAYOUT,
+    job_id: uuid.UUID | str = "",
+    output_name: str = "",
+) -> str:
+    """Return the local path to download the file at signed_url to, following the layout.
+    Raises ValueError if the layout is invalid or the path would be outside local_destination_dir.
+    """
+    bucket, object_path = get_bucket_and_object_path(signed_url)
+    relative_path = os.path.normpath(
+        validate_layout(layout).format(
+            job_id=job_id,
+            output_name=output_name,
+            file_name=get_file_name_from_signed_url(signed_url),
+            object_path=object_path,
+            bucket=bucket,
+        )
+    )
+    if os.path.isabs(relative_path) or relative_path.split(os.sep)[0] in (
+        os.pardir,
+        os.curdir,
+    ):
+        raise ValueError(
+            f"Download layout '{layout}' gives '{relative_path}' for output {output_name or signed_url}, "
+            f"which isn't a file inside the download destination"
+        )
+    return os.path.join(local_destination_dir, relative_path)
+
+
+def plan_download_paths(
+    local_destination_dir: str,
+    signed_urls: dict[str, str],
+    layout: str = DEFAULT_LAYOUT,
+    job_id: uuid.UUID | str = "",
+) -> dict[str, str]:
+    """Return {output_name: local path} for downloading each {output_name: signed_url} following the layout.
+    Raises ValueError if the layout is invalid, or if any outputs would be saved to the same path.
+    """
+    download_paths = {
+        output_name: get_download_path(
+            local_destination_dir, signed_url, layout, job_id, output_name
+        )
+        for output_name, signed_url in signed_urls.items()
+    }
+    if collisions := find_path_collisions(download_paths.items()):
+        raise ValueError(
+            "Some outputs would be downloaded to the same place:\n"
+            + "\n".join(collisions)
+            + f"\nUse a download layout that keeps them apart, e.g. '{{output_name}}/{DEFAULT_LAYOUT}'"
+        )
+    return download_paths
+
+
+def find_path_collisions(named_paths: Iterable[tuple[str, str]]) -> list[str]:
+    """Return a description of each collision between the (name, local path) paths: two files with the same path,
+    or a file whose path is a folder that another file would be saved in. Returns an empty list if there are none.
+    """
+    names_by_path: dict[str, tuple[str, str]] = {}
+    collisions = []
+    for name, local_file_path in named_paths:
+        path = os.path.normcase(os.path.abspath(local_file_path))
+        if (other := names_by_path.get(path)) is not None:
+            collisions.append(f"  {other[0]} and {name}: {local_file_path}")
+        else:
+            names_by_path[path] = (name, local_file_path)
+    for path, (name, local_file_path) in names_by_path.items():
+        parent = os.path.dirname(path)
+        while parent != os.path.dirname(parent):
+            if (other := names_by_path.get(parent)) is not None:
+                collisions.append(
+                    f"  {name} would be saved inside {other[0]}: {local_file_path}"
+                )
+                break
+            parent = os.path.dirname(parent)
+    return collisions
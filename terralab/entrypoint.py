@@ -0,0 +1,29 @@
+# entrypoint.py
+
+import sys
+
+from terralab.agent import forward_to_agent
+from terralab.profiling import (
+    PROFILERS,
+    get_profile_options,
+    start_profiling,
+    stop_profiling,
+)
+
+
+def main() -> None:
+    """Entrypoint for the terralab command. Runs the command in the terralab agent if one is running,
+    otherwise imports and runs the CLI in this process."""
+    profiler, profile_file = get_profile_options(sys.argv[1:])
+    if profiler in PROFILERS:
+        # start before importing the CLI, so that the profile includes import time
+        start_profiling(profiler, profile_file)
+    elif (exit_code := forward_to_agent(sys.argv[1:])) is not None:
+        sys.exit(exit_code)
+
+    try:
+        from terralab.cli import cli
+
+        cli()
+    finally:
+        stop_profiling()
@@ -0,0 +1,37 @@
+# exceptions.py
+
+
+class TerralabError(Exception):
+    """Base class for errors raised by the terralab Python API (terralab.Session)"""
+
+
+class ApiError(TerralabError):
+    """A Teaspoons API call failed"""
+
+    def __init__(self, status: int | None, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class AuthenticationError(ApiError):
+    """The user is not registered in Terra or their credentials were rejected"""
+
+
+class ConfigError(TerralabError):
+    """The terralab config could not be loaded"""
+
+
+class ServiceUnavailableError(TerralabError):
+    """The service could not be reached after multiple retries"""
+
+
+class InputValidationError(TerralabError):
+    """One or more arguments or pipeline inputs are invalid"""
+
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
+
+class TransferError(TerralabError):
+    """Uploading or downloading a file with a signed URL failed"""
@@ -0,0 +1,789 @@
+# fake_server.py
+
+"""
+A local stand-in for the Teaspoons API and for GCS signed URLs, for benchmarks, load tests, and offline testing.
+
+The server keeps everything in memory and implements the Teaspoons endpoints the CLI uses: pipelines and their
+details, preparing, starting, listing, and checking jobs, output signed URLs, delivery, and quotas. Prepared jobs
+get signed URLs for their local file inputs, and started jobs succeed after job_duration_seconds with an output
+for each of the pipeline's file outputs. Signed URLs accept PUT, and GET with Range requests. FaultInjection
+adds latency, limits bandwidth, and injects failed requests and dropped downloads. Requests aren't authenticated.
+
+Point a Teaspoons ApiClient at FakeTeaspoonsServer.url to use it from Python, or run it on its own:
+
+    python -m terralab.fake_server --port 8080 --latency 0.05 --bandwidth 10M --failure-rate 0.1
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from terralab.bandwidth import parse_bandwidth
+from terralab.constants import (
+    FILE_ARRAY_TYPE_KEY,
+    FILE_TYPE_KEY,
+    GCS_PREFIX,
+    PREPARING_KEY,
+    RUNNING_KEY,
+    STRING_TYPE_KEY,
+    SUCCEEDED_KEY,
+)
+from terralab.rate_limit import TokenBucket
+
+LOGGER = logging.getLogger(__name__)
+
+BLOB_PATH_PREFIX = "/blobs/"
+PIPELINE_RUNS_PATH = "/api/pipelineruns/v2/pipelineruns"
+DEFAULT_PAGE_SIZE = 10
+STREAM_BLOCK_SIZE = 1024 * 1024
+FAKE_SIGNATURE = "X-Goog-Signature=fake"
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+OUTPUT_EXPIRATION_DAYS = 14
+DEFAULT_PORT = 8080
+SHUTDOWN_POLL_SECONDS = 0.05
+
+
+@dataclass
+class FaultInjection:
+    """Network conditions and failures to simulate. Rates are the probability, from 0 to 1, per request."""
+
+    # added to every request
+    latency_seconds: float = 0.0
+    # shared by all signed URL uploads and downloads; None for unlimited
+    bandwidth_bytes_per_second: float | None = None
+    # respond with failure_status instead of handling the request
+    failure_rate: float = 0.0
+    failure_status: int = HTTPStatus.SERVICE_UNAVAILABLE
+    # close the connection halfway through a signed URL download
+    disconnect_rate: float = 0.0
+    # close the connection halfway through the first disconnect_first downloads of each blob byte range,
+    # for tests that need the same faults however concurrent requests are ordered
+    disconnect_first: int = 0
+    seed: int | None = None
+    _random: random.Random = field(init=False, repr=False)
+    _bucket: TokenBucket | None = field(init=False, repr=False)
+    _disconnects: dict[tuple[str, int], int] = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+        self._bucket = (
+            TokenBucket(self.bandwidth_bytes_per_second)
+            if self.bandwidth_bytes_per_second
+            else None
+        )
+        self._disconnects = {}
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        return self.failure_rate > 0 and self._random.random() < self.failure_rate
+
+    def should_disconnect(self, blob_name: str, start_byte: int) -> bool:
+        if self.disconnect_first > 0:
+            with self._lock:
+                n_disconnects = self._disconnects.get((blob_name, start_byte), 0)
+                if n_disconnects < self.disconnect_first:
+                    self._disconnects[(blob_name, start_byte)] = n_disconnects + 1
+                    return True
+        return self.disconnect_rate > 0 and self._random.random() < self.disconnect_rate
+
+    def throttle(self, n_bytes: int) -> None:
+        if self._bucket is not None:
+            self._bucket.acquire(n_bytes)
+
+
+def default_pipeline() -> dict[str, Any]:
+    """Return a PipelineWithDetails like Teaspoons' array_imputation pipeline."""
+    return {
+        "pipelineName": "array_imputation",
+        "displayName": "Array Imputation",
+        "pipelineVersion": 1,
+        "description": "Phase and impute genotypes using Beagle",
+        "type": "imputation",
+        "inputs": [
+            {
+                "name": "multiSampleVcf",
+                "displayName": "Multi-sample VCF",
+                "description": "A multi-sample VCF file",
+                "type": FILE_TYPE_KEY,
+                "isRequired": True,
+                "fileSuffix": ".vcf.gz",
+            },
+            {
+                "name": "outputBasename",
+                "displayName": "Output basename",
+                "description": "The basename for output files",
+                "type": STRING_TYPE_KEY,
+                "isRequired": True,
+            },
+        ],
+        "outputs": [
+            {
+                "name": "imputedMultiSampleVcf",
+                "displayName": "Imputed VCF",
+                "type": FILE_TYPE_KEY,
+            },
+            {"name": "chunksInfo", "displayName": "Chunks info", "type": FILE_TYPE_KEY},
+        ],
+        "pipelineQuota": {
+            "pipelineName": "array_imputation",
+            "defaultQuota": 10000,
+            "minQuotaConsumed": 500,
+            "maxQuotaConsumed": 10000,
+            "quotaUnits": "SAMPLES",
+        },
+    }
+
+
+class FakeTeaspoonsServer:
+    """An in-memory fake Teaspoons API and signed URL blob server, run in a background thread"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        faults: FaultInjection | None = None,
+        job_duration_seconds: float = 0.0,
+        output_size_bytes: int = 1024,
+    ) -> None:
+        self.faults = faults or FaultInjection()
+        self.job_duration_seconds = job_duration_seconds
+        self.output_size_bytes = output_size_bytes
+        self.blobs: dict[str, bytes] = {}
+        self.pipelines: dict[str, dict[str, Any]] = {
+            "array_imputation": default_pipeline()
+        }
+        # jobs as listed by getAllPipelineRunsV2, most recent first
+        self.pipeline_runs: list[dict[str, Any]] = []
+        # jobs prepared through the API, by job id
+        self.jobs: dict[str, dict[str, Any]] = {}
+        self.quota_consumed: dict[str, int] = {}
+        self.request_count = 0
+        self.connection_count = 0
+        self._lock = threading.RLock()
+        self._http_server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._http_server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._http_server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def __enter__(self) -> "FakeTeaspoonsServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._http_server.serve_forever,
+            # check for shutdown often, so that stopping the server is quick
+            kwargs={"poll_interval": SHUTDOWN_POLL_SECONDS},
+            name="fake-teaspoons",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        """Serve requests in this thread until interrupted."""
+        try:
+            self._http_server.serve_forever()
+        finally:
+            self._http_server.server_close()
+
+    def stop(self) -> None:
+        self._http_server.shutdown()
+        self._http_server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_signed_url(self, blob_name: str) -> str:
+        """Return a signed URL that can be used to upload or download the named blob."""
+        return f"{self.url}{BLOB_PATH_PREFIX}{blob_name}?{FAKE_SIGNATURE}"
+
+    def add_blob(self, blob_name: str, data: bytes) -> str:
+        """Store a blob, returning a signed URL to download it."""
+        with self._lock:
+            self.blobs[blob_name] = data
+        return self.get_signed_url(blob_name)
+
+    def add_pipeline_runs(
+        self, n_runs: int, pipeline_name: str = "array_imputation"
+    ) -> None:
+        """Add n_runs succeeded jobs, each submitted a minute before the last."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            for _ in range(n_runs):
+                submitted = now - datetime.timedelta(minutes=len(self.pipeline_runs))
+                self.pipeline_runs.append(
+                    {
+                        "jobId": str(uuid.uuid4()),
+                        "pipelineName": pipeline_name,
+                        "pipelineVersion": 1,
+                        "status": SUCCEEDED_KEY,
+                        "description": f"job {len(self.pipeline_runs)}",
+                        "timeSubmitted": submitted.isoformat(),
+                        "timeCompleted": (
+                            submitted + datetime.timedelta(seconds=30)
+                        ).isoformat(),
+                        "quotaConsumed": 1,
+                    }
+                )
+
+    # Teaspoons API endpoints. Each takes the request's JSON body, its query parameters, and the groups
+    # matched from its path, and returns the response status and JSON body.
+
+    def get_pipelines(self, body: Any, query: dict[str, list[str]]) -> tuple[int, Any]:
+        summary_keys = ["pipelineName", "displayName", "pipelineVersion", "description"]
+        return HTTPStatus.OK, {
+            "results": [
+                {key: pipeline[key] for key in summary_keys}
+                for pipeline in self.pipelines.values()
+            ]
+        }
+
+    def get_pipeline_details(
+        self, body: Any, query: dict[str, list[str]], pipeline_name: str
+    ) -> tuple[int, Any]:
+        if (pipeline := self.pipelines.get(pipeline_name)) is None:
+            return _not_found(f"Pipeline {pipeline_name} not found")
+        return HTTPStatus.OK, pipeline
+
+    def get_quota(
+        self, body: Any, query: dict[str, list[str]], pipeline_name: str
+    ) -> tuple[int, Any]:
+        if (pipeline := self.pipelines.get(pipeline_name)) is None:
+            return _not_found(f"Pipeline {pipeline_name} not found")
+        return HTTPStatus.OK, {
+            "pipelineName": pipeline_name,
+            "quotaLimit": pipeline["pipelineQuota"]["defaultQuota"],
+            "quotaConsumed": self.quota_consumed.get(pipeline_name, 0),
+            "quotaUnits": pipeline["pipelineQuota"]["quotaUnits"],
+        }
+
+    def prepare_pipeline_run(
+        self, body: Any, query: dict[str, list[str]]
+    ) -> tuple[int, Any]:
+        pipeline_name = body["pipelineName"]
+        if (pipeline := self.pipelines.get(pipeline_name)) is None:
+            return _not_found(f"Pipeline {pipeline_name} not found")
+        if not body.get("agreeToTerms"):
+            return _error(
+                HTTPStatus.BAD_REQUEST, "You must agree to the terms of service"
+            )
+        job_id = body["jobId"]
+        inputs = body["pipelineInputs"]
+        # Teaspoons gives upload URLs for file inputs that aren't already in the cloud
+        file_input_upload_urls = {
+            input_definition["name"]: {
+                "signedUrl": self.get_signed_url(
+                    f"{job_id}/inputs/{inputs[input_definition['name']].rsplit('/', 1)[-1]}"
+                )
+            }
+            for input_definition in pipeline["inputs"]
+            if input_definition["type"] == FILE_TYPE_KEY
+            and isinstance(inputs.get(input_definition["name"]), str)
+            and not inputs[input_definition["name"]].startswith(GCS_PREFIX)
+        }
+        with self._lock:
+            if job_id in self.jobs:
+                return _error(HTTPStatus.CONFLICT, f"Job {job_id} already exists")
+            self.jobs[job_id] = {
+                "pipeline": pipeline,
+                "inputs": inputs,
+                "description": body.get("description") or "",
+                "status": PREPARING_KEY,
+                "submitted": None,
+                "started_at": None,
+                "delivery": None,
+            }
+            self.pipeline_runs.insert(0, {"jobId": job_id})
+        return HTTPStatus.OK, {
+            "jobId": job_id,
+            "fileInputUploadUrls": file_input_upload_urls,
+        }
+
+    def start_pipeline_run(
+        self, body: Any, query: dict[str, list[str]]
+    ) -> tuple[int, Any]:
+        job_id = body["jobControl"]["id"]
+        with self._lock:
+            if (job := self.jobs.get(job_id)) is None:
+                return _not_found(f"Job {job_id} not found")
+            job["status"] = RUNNING_KEY
+            job["submitted"] = _now()
+            job["started_at"] = time.monotonic()
+        return HTTPStatus.ACCEPTED, self._get_run_result(job_id)
+
+    def get_pipeline_run_result(
+        self, body: Any, query: dict[str, list[str]], job_id: str
+    ) -> tuple[int, Any]:
+        if job_id not in self.jobs:
+            return _not_found(f"Job {job_id} not found")
+        result = self._get_run_result(job_id)
+        done = result["jobReport"]["status"] == SUCCEEDED_KEY
+        return HTTPStatus.OK if done else HTTPStatus.ACCEPTED, result
+
+    def get_pipeline_runs(
+        self, body: Any, query: dict[str, list[str]]
+    ) -> tuple[int, Any]:
+        page_number = int(query.get("pageNumber", ["1"])[0])
+        page_size = int(query.get("pageSize", [str(DEFAULT_PAGE_SIZE)])[0])
+        start = (page_number - 1) * page_size
+        with self._lock:
+            n_runs = len(self.pipeline_runs)
+            page = [
+                (
+                    self._get_pipeline_run(run["jobId"])
+                    if run["jobId"] in self.jobs
+                    else run
+                )
+                for run in self.pipeline_runs[start : start + page_size]
+            ]
+        return HTTPStatus.OK, {
+            "totalResults": n_runs,
+            "totalFilteredResults": n_runs,
+            "results": page,
+        }
+
+    def get_output_signed_urls(
+        self, body: Any, query: dict[str, list[str]], job_id: str
+    ) -> tuple[int, Any]:
+        if job_id not in self.jobs:
+            return _not_found(f"Job {job_id} not found")
+        report = self._get_run_result(job_id)["pipelineRunReport"]
+        if not report["outputs"]:
+            return _error(HTTPStatus.BAD_REQUEST, f"Job {job_id} has no outputs")
+        return HTTPStatus.OK, {
+            "jobId": job_id,
+            "outputSignedUrls": self.jobs[job_id]["outputSignedUrls"],
+            "outputExpirationDate": report["outputExpirationDate"],
+        }
+
+    def deliver_pipeline_run_outputs(
+        self, body: Any, query: dict[str, list[str]], job_id: str
+    ) -> tuple[int, Any]:
+        with self._lock:
+            if (job := self.jobs.get(job_id)) is None:
+                return _not_found(f"Job {job_id} not found")
+            job["delivery"] = {
+                "destination": body["destinationGcsPath"],
+                "status": SUCCEEDED_KEY,
+            }
+        return HTTPStatus.ACCEPTED, self._get_run_result(job_id)["jobReport"]
+
+    def _get_run_result(self, job_id: str) -> dict[str, Any]:
+        """Return an AsyncPipelineRunResponseV2 for a job, completing the job if its time is up."""
+        with self._lock:
+            job = self.jobs[job_id]
+            if (
+                job["status"] == RUNNING_KEY
+                and time.monotonic() - job["started_at"] >= self.job_duration_seconds
+            ):
+                self._complete_job(job_id, job)
+            pipeline = job["pipeline"]
+            succeeded = job["status"] == SUCCEEDED_KEY
+            return {
+                "jobReport": {
+                    "id": job_id,
+                    "description": job["description"],
+                    "status": job["status"],
+                    "statusCode": HTTPStatus.OK if succeeded else HTTPStatus.ACCEPTED,
+                    "submitted": job["submitted"],
+                    "completed": job.get("completed"),
+                    "resultURL": f"{self.url}/api/pipelineruns/v3/result/{job_id}",
+                },
+                "pipelineRunReport": {
+                    "pipelineName": pipeline["pipelineName"],
+                    "pipelineVersion": pipeline["pipelineVersion"],
+                    "toolVersion": "fake",
+                    "userInputs": job["inputs"],
+                    "outputs": job.get("outputs"),
+                    "outputExpirationDate": job.get("outputExpirationDate"),
+                    "quotaConsumed": job.get("quotaConsumed"),
+                    "dataDeliveryReport": job["delivery"],
+                },
+            }
+
+    def _complete_job(self, job_id: str, job: dict[str, Any]) -> None:
+        """Mark a job as succeeded and create its outputs. Must be called with the lock held."""
+        pipeline = job["pipeline"]
+        outputs = {}
+        output_signed_urls = {}
+        for output_definition in pipeline["outputs"]:
+            if output_definition["type"] in (FILE_TYPE_KEY, FILE_ARRAY_TYPE_KEY):
+                output_name = output_definition["name"]
+                blob_name = f"{job_id}/outputs/{output_name}.vcf.gz"
+                self.blobs[blob_name] = random.randbytes(self.output_size_bytes)
+                outputs[output_name] = {
+                    "value": f"{GCS_PREFIX}fake-bucket/{blob_name}",
+                    "metadata": {"sizeInBytes": self.output_size_bytes},
+                }
+                output_signed_urls[output_name] = self.get_signed_url(blob_name)
+        quota_consumed = pipeline["pipelineQuota"]["minQuotaConsumed"]
+        pipeline_name = pipeline["pipelineName"]
+        self.quota_consumed[pipeline_name] = (
+            self.quota_consumed.get(pipeline_name, 0) + quota_consumed
+        )
+        job.update(
+            status=SUCCEEDED_KEY,
+            completed=_now(),
+            outputs=outputs,
+            outputSignedUrls=output_signed_urls,
+            outputExpirationDate=(
+                datetime.datetime.now(datetime.timezone.utc)
+                + datetime.timedelta(days=OUTPUT_EXPIRATION_DAYS)
+            ).isoformat(),
+            quotaConsumed=quota_consumed,
+        )
+
+    def _get_pipeline_run(self, job_id: str) -> dict[str, Any]:
+        """Return a PipelineRun, as listed by getAllPipelineRunsV2, for a job prepared through the API."""
+        result = self._get_run_result(job_id)
+        job_report, report = result["jobReport"], result["pipelineRunReport"]
+        return {
+            "jobId": job_id,
+            "pipelineName": report["pipelineName"],
+            "pipelineVersion": report["pipelineVersion"],
+            "status": job_report["status"],
+            "description": job_report["description"],
+            "timeSubmitted": job_report["submitted"] or _now(),
+            "timeCompleted": job_report["completed"],
+            "quotaConsumed": report["quotaConsumed"],
+            "outputExpirationDate": report["outputExpirationDate"],
+        }
+
+
+# (method, path pattern, endpoint) for each Teaspoons API endpoint
+API_ROUTES: list[tuple[str, re.Pattern[str], Callable[..., tuple[int, Any]]]] = [
+    ("GET", re.compile(r"/api/pipelines/v1"), FakeTeaspoonsServer.get_pipelines),
+    (
+        "POST",
+        re.compile(r"/api/pipelines/v1/([^/]+)"),
+        FakeTeaspoonsServer.get_pipeline_details,
+    ),
+    ("GET", re.compile(r"/api/quotas/v1/([^/]+)"), FakeTeaspoonsServer.get_quota),
+    (
+        "POST",
+        re.compile(r"/api/pipelineruns/v3/prepare"),
+        FakeTeaspoonsServer.prepare_pipeline_run,
+    ),
+    (
+        "POST",
+        re.compile(r"/api/pipelineruns/v1/start"),
+        FakeTeaspoonsServer.start_pipeline_run,
+    ),
+    (
+        "GET",
+        re.compile(r"/api/pipelineruns/v3/result/([^/]+)"),
+        FakeTeaspoonsServer.get_pipeline_run_result,
+    ),
+    ("GET", re.compile(PIPELINE_RUNS_PATH), FakeTeaspoonsServer.get_pipeline_runs),
+    (
+        "GET",
+        re.compile(r"/api/pipelineruns/v2/result/([^/]+)/output/signed-urls"),
+        FakeTeaspoonsServer.get_output_signed_urls,
+    ),
+    (
+        "POST",
+        re.compile(r"/api/pipelineruns/v1/result/([^/]+)/output/deliver-to-cloud"),
+        FakeTeaspoonsServer.deliver_pipeline_run_outputs,
+    ),
+]
+
+
+class _FakeTeaspoonsHandler(BaseHTTPRequestHandler):
+    # keep connections open between requests, as GCS and Teaspoons do
+    protocol_version = "HTTP/1.1"
+    # headers and bodies are written separately; don't let Nagle's algorithm delay the body
+    disable_nagle_algorithm = True
+    server_state: FakeTeaspoonsServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        LOGGER.debug(format, *args)
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server_state._lock:
+            self.server_state.connection_count += 1
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_HEAD(self) -> None:
+        # used to open connections ahead of transfers (see transfer_session); no body, so the connection stays usable
+        with self.server_state._lock:
+            self.server_state.request_count += 1
+            blob = self.server_state.blobs.get(
+                urlsplit(self.path).path.removeprefix(BLOB_PATH_PREFIX)
+            )
+        if self.server_state.faults.latency_seconds:
+            time.sleep(self.server_state.faults.latency_seconds)
+        self.send_response(HTTPStatus.OK if blob is not None else HTTPStatus.NOT_FOUND)
+        self.send_header("Content-Length", str(len(blob) if blob is not None else 0))
+        self.end_headers()
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        faults = self.server_state.faults
+        with self.server_state._lock:
+            self.server_state.request_count += 1
+        # read the whole request before responding, so that the connection can be reused
+        body = self._read_body()
+        if body is None:
+            # the client stopped sending partway through; like GCS, don't store a truncated object
+            self.close_connection = True
+            return
+        if faults.latency_seconds:
+            time.sleep(faults.latency_seconds)
+        if faults.should_fail():
+            self._send_json(
+                faults.failure_status,
+                _error_report("Injected failure", faults.failure_status),
+            )
+            return
+
+        if url.path.startswith(BLOB_PATH_PREFIX):
+            blob_name = url.path.removeprefix(BLOB_PATH_PREFIX)
+            if method == "PUT":
+                with self.server_state._lock:
+                    self.server_state.blobs[blob_name] = body
+                self._send_json(HTTPStatus.OK, {})
+            elif method == "GET":
+                self._get_blob(blob_name)
+            else:
+                self._send_json(
+                    *_error(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+                )
+            return
+
+        for route_method, pattern, endpoint in API_ROUTES:
+            if method == route_method and (match := pattern.fullmatch(url.path)):
+                try:
+                    status, response_body = endpoint(
+                        self.server_state,
+                        json.loads(body) if body else None,
+                        parse_qs(url.query),
+                        *match.groups(),
+                    )
+                except (KeyError, TypeError, ValueError) as e:
+                    status, response_body = _error(
+                        HTTPStatus.BAD_REQUEST, f"Invalid request: {e!r}"
+                    )
+                self._send_json(status, response_body)
+                return
+        self._send_json(*_not_found("Not found"))
+
+    def _read_body(self) -> bytes | None:
+        """Read the request body, or return None if the connection closed before all of it was sent."""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size_line = self.rfile.readline().split(b";")[0].strip()
+                if not size_line:
+                    return None
+                chunk_size = int(size_line, 16)
+                if not chunk_size:
+                    break
+                chunk = self._read(chunk_size)
+                if len(chunk) < chunk_size:
+                    return None
+                chunks.append(chunk)
+                self.rfile.readline()  # the CRLF after each chunk
+            self.rfile.readline()  # the CRLF after the last chunk
+            return b"".join(chunks)
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = self._read(content_length)
+        return body if len(body) == content_length else None
+
+    def _read(self, n_bytes: int) -> bytes:
+        """Read n_bytes of the request body, at no more than the configured bandwidth."""
+        if self.server_state.faults.bandwidth_bytes_per_second is None:
+            return self.rfile.read(n_bytes)
+        data = bytearray()
+        while len(data) < n_bytes:
+            block = self.rfile.read(min(STREAM_BLOCK_SIZE, n_bytes - len(data)))
+            if not block:
+                break
+            self.server_state.faults.throttle(len(block))
+            data += block
+        return bytes(data)
+
+    def _get_blob(self, blob_name: str) -> None:
+        with self.server_state._lock:
+            data = self.server_state.blobs.get(blob_name)
+        if data is None:
+            self._send_json(HTTPStatus.NOT_FOUND, _error_report("No such blob"))
+            return
+
+        status, start, end = HTTPStatus.OK, 0, len(data)
+        if range_header := self.headers.get("Range"):
+            if (byte_range := parse_range(range_header, len(data))) is None:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status, (start, end) = HTTPStatus.PARTIAL_CONTENT, byte_range
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        self.end_headers()
+
+        faults = self.server_state.faults
+        if end - start > 1 and faults.should_disconnect(blob_name, start):
+            # send half of the body, then drop the connection
+            end = start + (end - start) // 2
+            self.close_connection = True
+        view = memoryview(data)
+        for offset in range(start, end, STREAM_BLOCK_SIZE):
+            block = view[offset : min(offset + STREAM_BLOCK_SIZE, end)]
+            faults.throttle(len(block))
+            self.wfile.write(block)
+
+    def _send_json(self, status: int, body: Any) -> None:
+        encoded_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+
+def _make_handler(
+    server_state: FakeTeaspoonsServer,
+) -> Callable[..., _FakeTeaspoonsHandler]:
+    return type(
+        "FakeTeaspoonsHandler",
+        (_FakeTeaspoonsHandler,),
+        {"server_state": server_state},
+    )
+
+
+def parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single byte range Range header (`bytes=0-99`, `bytes=100-`, or `bytes=-100`) for a blob of
+    the given size, returning the (start, end) of the range with end exclusive, or None if it can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # the last N bytes
+        start, end = max(0, size - int(last)), size
+    else:
+        start, end = int(first), min(size, int(last) + 1) if last else size
+    return (start, end) if start < end else None
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _error_report(message: str, status: int = HTTPStatus.NOT_FOUND) -> Any:
+    return {"message": message, "statusCode": int(status), "causes": []}
+
+
+def _error(status: int, message: str) -> tuple[int, Any]:
+    return status, _error_report(message, status)
+
+
+def _not_found(message: str) -> tuple[int, Any]:
+    return _error(HTTPStatus.NOT_FOUND, message)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run a fake Teaspoons API and signed URL server."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds to add to every request"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=parse_bandwidth,
+        help="limit for all signed URL transfers combined, e.g. 10M",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests to fail with --failure-status",
+    )
+    parser.add_argument(
+        "--failure-status", type=int, default=HTTPStatus.SERVICE_UNAVAILABLE
+    )
+    parser.add_argument(
+        "--disconnect-rate",
+        type=float,
+        default=0.0,
+        help="fraction of signed URL downloads to cut off halfway through",
+    )
+    parser.add_argument(
+        "--job-duration",
+        type=float,
+        default=0.0,
+        help="seconds that jobs run before succeeding",
+    )
+    parser.add_argument(
+        "--output-size",
+        type=int,
+        default=1024,
+        help="size in bytes of each job output",
+    )
+    parser.add_argument("--seed", type=int, help="random seed for injected faults")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    server = FakeTeaspoonsServer(
+        args.host,
+        args.port,
+        FaultInjection(
+            latency_seconds=args.latency,
+            bandwidth_bytes_per_second=args.bandwidth,
+            failure_rate=args.failure_rate,
+            failure_status=args.failure_status,
+            disconnect_rate=args.disconnect_rate,
+            seed=args.seed,
+        ),
+        job_duration_seconds=args.job_duration,
+        output_size_bytes=args.output_size,
+    )
+    LOGGER.info(f"Fake Teaspoons server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# gcs_helper.py
+
+import logging
+import subprocess
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from terralab.constants import GCS_API_HOST, GCS_PREFIX
+from terralab.tracing import traced
+
+LOGGER = logging.getLogger(__name__)
+
+GCS_XML_API_URL = f"https://{GCS_API_HOST}"
+DEFAULT_MAX_CHECK_WORKERS = 32
+CHECK_TIMEOUT_SECONDS = 30
+
+
+class CloudObjectChecker(ABC):
+    """Interface for looking up cloud objects, so that validation can run against GCS or a local stand-in."""
+
+    @abstractmethod
+    def get_object_size(self, gcs_path: str) -> int | None:
+        """Return the size in bytes of the object at gcs_path, or None if it does not exist.
+        Raises an exception if the object's existence can't be determined (e.g. no access).
+        """
+
+
+class GcsObjectChecker(CloudObjectChecker):
+    """Looks up objects with metadata-only (HEAD) requests to the GCS XML API, reusing pooled connections."""
+
+    def __init__(
+        self,
+        access_token: str,
+        api_url: str = GCS_XML_API_URL,
+        max_workers: int = DEFAULT_MAX_CHECK_WORKERS,
+    ) -> None:
+        self.api_url = api_url
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+
+    def get_object_size(self, gcs_path: str) -> int | None:
+        bucket_name, _, object_name = gcs_path[len(GCS_PREFIX) :].partition("/")
+        if not object_name:
+            return None
+        response = self.session.head(
+            f"{self.api_url}/{bucket_name}/{quote(object_name)}",
+            timeout=CHECK_TIMEOUT_SECONDS,
+        )
+        if response.status_code == 404:
+            return None
+        if response.status_code == 403:
+            raise PermissionError("access denied")
+        response.raise_for_status()
+        return int(
+            response.headers.get(
+                "x-goog-stored-content-length",
+                response.headers.get("content-length", 0),
+            )
+        )
+
+
+@traced()
+def get_gcloud_access_token() -> str:
+    """Get a Google access token for the user from the gcloud CLI."""
+    try:
+        result = subprocess.run(
+            ["gcloud", "auth", "print-access-token"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        LOGGER.debug(f"Failed to get gcloud access token: {e}")
+        raise RuntimeError(
+            "Could not get Google credentials to validate cloud inputs. "
+            "Make sure the gcloud CLI is installed and you are logged in (`gcloud auth login`)."
+        ) from e
+    return result.stdout.strip()
+
+
+@traced()
+def check_cloud_objects(
+    gcs_paths: Iterable[str],
+    checker: CloudObjectChecker,
+    max_workers: int = DEFAULT_MAX_CHECK_WORKERS,
+) -> dict[str, int | None | Exception]:
+    """Concurrently look up the given GCS paths, checking each distinct path once.
+    Objects can be created or deleted between calls, so results aren't kept for later calls.
+
+    Returns a dictionary of {gcs_path: size_bytes}, where the value is None for missing objects
+    and the raised exception for objects that could not be checked."""
+    paths_to_check = list(dict.fromkeys(gcs_paths))
+    if not paths_to_check:
+        return {}
+
+    def check_one(gcs_path: str) -> int | None | Exception:
+        try:
+            return checker.get_object_size(gcs_path)
+        except Exception as e:
+            return e
+
+    LOGGER.debug(f"Checking {len(paths_to_check)} cloud objects")
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(paths_to_check))
+    ) as executor:
+        return dict(zip(paths_to_check, executor.map(check_one, paths_to_check)))
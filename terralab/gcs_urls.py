@@ -0,0 +1,18 @@
+# gcs_urls.py
+
+from urllib.parse import unquote, urlsplit
+
+from terralab.constants import GCS_API_HOST, GCS_PREFIX
+
+
+def get_cloud_path_from_signed_url(signed_url: str) -> str | None:
+    """Return the gs:// path of the object a GCS signed URL points to, or None if it isn't a GCS signed URL."""
+    url = urlsplit(signed_url)
+    path = unquote(url.path).lstrip("/")
+    if url.hostname == GCS_API_HOST:
+        bucket, _, object_name = path.partition("/")
+    elif url.hostname and url.hostname.endswith(f".{GCS_API_HOST}"):
+        bucket, object_name = url.hostname.removesuffix(f".{GCS_API_HOST}"), path
+    else:
+        return None
+    return f"{GCS_PREFIX}{bucket}/{object_name}" if bucket and object_name else None
@@ -1,6 +1,10 @@
 # log.py
 
+import itertools
 import logging
+import re
+import textwrap
+from collections.abc import Iterable, Iterator
 
 import colorlog
 from tabulate import tabulate
@@ -98,6 +102,114 @@ def format_table_with_status(
     )
 
 
+# number of rows used to fix column widths when rendering a table incrementally; at most the API page size,
+# so that the table starts printing before the second page of results is requested
+DEFAULT_TABLE_SAMPLE_SIZE = 10
+# tabulate pads headers by this many characters when computing column widths
+TABLE_HEADER_PADDING = 2
+TABLE_COLUMN_SEPARATOR = "  "
+ANSI_ESCAPE_PATTERN = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def iter_table_lines_with_status(
+    rows: Iterable[list[str]],
+    status_key: str = "Status",
+    max_col_size: int = DEFAULT_MAX_COL_SIZE,
+    sample_size: int = DEFAULT_TABLE_SAMPLE_SIZE,
+    width_hints: dict[str, int] | None = None,
+) -> Iterator[str]:
+    """Provided an iterable of lists of strings representing rows to be formatted into a table,
+    with the headers as the first list of strings, color-format a Status column's values
+    and yield the lines of the table as rows arrive.
+
+    If there are fewer than sample_size rows, the output is identical to format_table_with_status.
+    Otherwise, column widths are fixed from the headers, the first sample_size rows, and any width_hints
+    (minimum widths keyed by header), and later cells that don't fit are wrapped. No row after the sample
+    is read until the sample has been yielded.
+    Nothing is yielded if there are no rows besides the headers.
+
+    Raises a ValueError if the status_key is not found in the first row (headers) of the table.
+    """
+    rows_iterator = iter(rows)
+    headers = next(rows_iterator, None)
+    if headers is None:
+        return
+    status_column_index = headers.index(status_key)
+    formatted_rows = (
+        format_status_in_table_row(table_row, status_column_index)
+        for table_row in rows_iterator
+    )
+
+    sample_rows = list(itertools.islice(formatted_rows, sample_size))
+    if not sample_rows:
+        return
+    if len(sample_rows) < sample_size:
+        yield from tabulate(
+            [headers, *sample_rows],
+            headers="firstrow",
+            numalign="left",
+            maxcolwidths=max_col_size,
+        ).split("\n")
+        return
+
+    width_hints = width_hints or {}
+    column_widths = [
+        max(
+            len(header) + TABLE_HEADER_PADDING,
+            min(width_hints.get(header, 0), max_col_size),
+            *(
+                _max_visible_line_width(table_row[i], max_col_size)
+                for table_row in sample_rows
+            ),
+        )
+        for i, header in enumerate(headers)
+    ]
+
+    yield _format_table_line(headers, column_widths)
+    yield TABLE_COLUMN_SEPARATOR.join("-" * width for width in column_widths)
+    for table_row in itertools.chain(sample_rows, formatted_rows):
+        yield from _format_table_row_lines(table_row, column_widths)
+
+
+def _visible_width(string: str) -> int:
+    return len(ANSI_ESCAPE_PATTERN.sub("", string))
+
+
+def _wrap_cell(cell: str, width: int) -> list[str]:
+    # like tabulate, ignore surrounding whitespace
+    cell = cell.strip()
+    if _visible_width(cell) <= width:
+        return [cell]
+    return textwrap.wrap(cell, width) or [""]
+
+
+def _max_visible_line_width(cell: str, max_col_size: int) -> int:
+    return max(_visible_width(line) for line in _wrap_cell(cell, max_col_size))
+
+
+def _format_table_line(cells: list[str], column_widths: list[int]) -> str:
+    return TABLE_COLUMN_SEPARATOR.join(
+        cell.strip() + " " * (width - _visible_width(cell.strip()))
+        for cell, width in zip(cells, column_widths)
+    ).rstrip()
+
+
+def _format_table_row_lines(
+    table_row: list[str], column_widths: list[int]
+) -> Iterator[str]:
+    wrapped_cells = [
+        _wrap_cell(cell, width) for cell, width in zip(table_row, column_widths)
+    ]
+    for line_index in range(max(len(cell_lines) for cell_lines in wrapped_cells)):
+        yield _format_table_line(
+            [
+                cell_lines[line_index] if line_index < len(cell_lines) else ""
+                for cell_lines in wrapped_cells
+            ],
+            column_widths,
+        )
+
+
 COLORFUL_STATUS = {
     FAILED_KEY: "\033[1;37;41mFailed\033[0m",
     SUCCEEDED_KEY: "\033[1;37;42mSucceeded\033[0m",
@@ -7,10 +7,12 @@ import jwt
 from terralab.auth_helper import get_or_refresh_access_token
 from terralab.config import load_config
 from terralab.sam_helper import get_user_proxy_group, _get_email_from_token
+from terralab.tracing import traced
 
 LOGGER = logging.getLogger(__name__)
 
 
+@traced()
 def get_account_info() -> list[list[str]]:
     """Get basic account information for the logged-in user from the JWT.
 
@@ -29,6 +31,7 @@ def get_account_info() -> list[list[str]]:
     ]
 
 
+@traced()
 def get_cloud_info() -> list[list[str]]:
     """Get cloud integration information for the logged-in user.
 
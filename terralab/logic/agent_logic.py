@@ -0,0 +1,41 @@
+# logic/agent_logic.py
+
+import logging
+
+from terralab.agent import (
+    PING_REQUEST,
+    STOP_REQUEST,
+    get_agent_socket_path,
+    send_agent_request,
+)
+from terralab.tracing import traced
+
+LOGGER = logging.getLogger(__name__)
+
+
+def get_agent_pid() -> int | None:
+    """Return the pid of the running terralab agent, or None if it is not running."""
+    try:
+        pid: int = send_agent_request(PING_REQUEST, get_agent_socket_path())["pid"]
+        return pid
+    except (OSError, KeyError):
+        return None
+
+
+@traced()
+def start_agent() -> int:
+    """Start the terralab agent in the background and return its pid."""
+    # imported here since the agent server is only available on platforms that support fork
+    from terralab.agent_server import start_agent_process
+
+    return start_agent_process(get_agent_socket_path())
+
+
+@traced()
+def stop_agent() -> bool:
+    """Stop the terralab agent. Returns False if it was not running."""
+    try:
+        send_agent_request(STOP_REQUEST, get_agent_socket_path())
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,203 @@
+# logic/async_pipeline_runs_logic.py
+
+"""
+Awaitable wrappers around the pipeline_runs_logic functions, so that many status checks and transfers can be
+driven from a single event loop.
+
+This is a thread-pool facade, not non-blocking I/O: the generated Teaspoons client and the signed URL transfers
+are blocking, so each function here runs the pipeline_runs_logic function of the same name in a thread pool,
+and every call in flight holds a thread. Fan-outs are capped by a semaphore, with a thread for each slot
+(the event loop's default executor can have fewer). All calls share the ApiClient's connection pool.
+"""
+
+import asyncio
+import logging
+import threading
+import uuid
+from collections.abc import Awaitable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from teaspoons_client import (  # type: ignore[attr-defined]
+    AsyncPipelineRunResponseV2,
+    PipelineRun,
+)
+
+from terralab.download_layout import DEFAULT_LAYOUT
+from terralab.logic import pipeline_runs_logic
+from terralab.utils import (
+    DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    run_in_executor,
+    upload_file_with_signed_url,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 32
+
+T = TypeVar("T")
+
+# runs API calls that aren't part of a fan-out with its own limit; created on first use
+_api_executor: ThreadPoolExecutor | None = None
+_api_executor_lock = threading.Lock()
+
+
+def _get_api_executor() -> ThreadPoolExecutor:
+    """Return the executor for API calls that aren't part of a fan-out, creating it the first time."""
+    global _api_executor
+    with _api_executor_lock:
+        if _api_executor is None:
+            _api_executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                thread_name_prefix="terralab-api",
+            )
+        return _api_executor
+
+
+async def gather_with_concurrency_limit(
+    awaitables: Iterable[Awaitable[T]],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+) -> list[T]:
+    """Await all the awaitables, running at most max_concurrency of them at a time.
+    Returns their results in order; raises the first exception encountered."""
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def run_in_slot(awaitable: Awaitable[T]) -> T:
+        async with slots:
+            return await awaitable
+
+    return list(await asyncio.gather(*map(run_in_slot, awaitables)))
+
+
+## API wrapper functions
+
+
+async def prepare_pipeline_run(
+    pipeline_name: str,
+    job_id: str,
+    pipeline_version: int | None,
+    pipeline_inputs: dict[str, Any],
+    description: str,
+    agree_to_terms: bool,
+) -> dict[str, str] | None:
+    """Async equivalent of pipeline_runs_logic.prepare_pipeline_run."""
+    return await run_in_executor(
+        _get_api_executor(),
+        pipeline_runs_logic.prepare_pipeline_run,
+        pipeline_name,
+        job_id,
+        pipeline_version,
+        pipeline_inputs,
+        description,
+        agree_to_terms,
+    )
+
+
+async def start_pipeline_run(job_id: str) -> str:
+    """Async equivalent of pipeline_runs_logic.start_pipeline_run."""
+    return await run_in_executor(
+        _get_api_executor(), pipeline_runs_logic.start_pipeline_run, job_id
+    )
+
+
+async def get_pipeline_run_status(job_id: uuid.UUID) -> AsyncPipelineRunResponseV2:
+    """Async equivalent of pipeline_runs_logic.get_pipeline_run_status."""
+    return await run_in_executor(
+        _get_api_executor(), pipeline_runs_logic.get_pipeline_run_status, job_id
+    )
+
+
+async def get_pipeline_run_statuses(
+    job_ids: Iterable[uuid.UUID],
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+) -> dict[uuid.UUID, AsyncPipelineRunResponseV2]:
+    """Get the status of many pipeline runs concurrently.
+    Returns a dictionary of {job_id: pipeline_run_status}."""
+    job_ids = list(dict.fromkeys(job_ids))
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrent_requests, thread_name_prefix="terralab-api"
+    )
+    try:
+        statuses = await gather_with_concurrency_limit(
+            (
+                run_in_executor(
+                    executor, pipeline_runs_logic.get_pipeline_run_status, job_id
+                )
+                for job_id in job_ids
+            ),
+            max_concurrent_requests,
+        )
+    finally:
+        executor.shutdown(wait=False)
+    return dict(zip(job_ids, statuses))
+
+
+async def get_pipeline_runs(n_results_requested: int) -> list[PipelineRun]:
+    """Async equivalent of pipeline_runs_logic.get_pipeline_runs."""
+    return await run_in_executor(
+        _get_api_executor(), pipeline_runs_logic.get_pipeline_runs, n_results_requested
+    )
+
+
+## transfers
+
+
+async def upload_input_files(
+    file_input_upload_urls: dict[str, str],
+    pipeline_inputs: dict[str, Any],
+    max_concurrent_transfers: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    compress_inputs: bool = False,
+) -> None:
+    """Upload local input files concurrently, given the {input_name: signed_url} dictionary returned by
+    prepare_pipeline_run, BGZF compressing them on the way if compress_inputs is True.
+    Each upload runs utils.upload_file_with_signed_url, as `terralab submit` does; if one fails,
+    the others stop after their current block. Raises an exception if any upload fails.
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrent_transfers, thread_name_prefix="terralab-transfer"
+    )
+    # set when an upload fails, to stop the others
+    cancel_event = threading.Event()
+    try:
+        await gather_with_concurrency_limit(
+            (
+                run_in_executor(
+                    executor,
+                    upload_file_with_signed_url,
+                    pipeline_inputs[input_name],
+                    signed_url,
+                    compress_inputs,
+                    cancel_event,
+                )
+                for input_name, signed_url in file_input_upload_urls.items()
+            ),
+            max_concurrent_transfers,
+        )
+    except BaseException:
+        cancel_event.set()
+        raise
+    finally:
+        executor.shutdown(wait=False)
+
+
+async def download_pipeline_run_outputs(
+    job_id: uuid.UUID,
+    local_destination: str,
+    output_names: tuple[str, ...] = (),
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+    layout: str = DEFAULT_LAYOUT,
+    max_concurrent_transfers: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
+) -> list[str]:
+    """Async equivalent of pipeline_runs_logic.download_pipeline_run_outputs."""
+    return await run_in_executor(
+        _get_api_executor(),
+        pipeline_runs_logic.download_pipeline_run_outputs,
+        job_id,
+        local_destination,
+        output_names,
+        include_patterns,
+        exclude_patterns,
+        layout,
+        max_concurrent_transfers,
+    )
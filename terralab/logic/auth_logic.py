@@ -8,10 +8,12 @@ from terralab.auth_helper import (
     get_tokens_with_custom_redirect,
 )
 from terralab.config import load_config
+from terralab.tracing import traced
 
 LOGGER = logging.getLogger(__name__)
 
 
+@traced()
 def clear_local_tokens() -> None:
     """Remove access credentials"""
     cli_config = load_config()  # initialize the config from environment variables
@@ -20,12 +22,14 @@ def clear_local_tokens() -> None:
     _clear_local_token(cli_config.oauth_access_token_file)
 
 
+@traced()
 def login_with_oauth(token: str) -> None:
     cli_config = load_config()
     _save_local_token(cli_config.oauth_access_token_file, token)
     LOGGER.debug("Saved local oauth access token")
 
 
+@traced()
 def login_with_custom_redirect() -> None:
     cli_config = load_config()
     access, refresh = get_tokens_with_custom_redirect(cli_config)
@@ -1,8 +1,16 @@
 # logic/pipeline_runs_logic.py
 
+import contextlib
+import contextvars
+import fnmatch
 import logging
+import os
+import stat
+import threading
 import uuid
-from typing import Any
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, BinaryIO, TypeVar
 
 from teaspoons_client import (  # type: ignore[attr-defined]
     AsyncPipelineRunResponseV2,
@@ -11,6 +19,7 @@ from teaspoons_client import (  # type: ignore[attr-defined]
     PipelineRun,
     PipelineRunOutputSignedUrlsResponse,
     PipelineRunsApi,
+    PipelineWithDetails,
     PreparePipelineRunRequestBodyV2,
     PreparePipelineRunResponseV2,
     StartDataDeliveryRequestBody,
@@ -18,23 +27,47 @@ from teaspoons_client import (  # type: ignore[attr-defined]
 )
 
 from terralab.client import ClientWrapper
-from terralab.log import indented
+from terralab.compression import GZIP_SUFFIX, should_compress_input
+from terralab.constants import FILE_TYPE_KEY, GCS_PREFIX
+from terralab.download_layout import DEFAULT_LAYOUT, plan_download_paths
+from terralab.exceptions import InputValidationError, TerralabError
+from terralab.gcs_helper import CloudObjectChecker, check_cloud_objects
+from terralab.gcs_urls import get_cloud_path_from_signed_url
+from terralab.log import add_blankline_before, indented
+from terralab.logic import pipelines_logic
+from terralab.sam_helper import _get_email_from_token
 from terralab.utils import (
-    upload_file_with_signed_url,
+    DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    convert_file_size_to_human_readable,
     download_files_with_signed_urls,
+    get_disk_space_error,
+    is_stream_file,
+    upload_file_with_signed_url,
+)
+from terralab.stream_download import stream_signed_url
+from terralab.tracing import traced
+from terralab.transfer_session import warm_up_connections_in_background
+from terralab.upload_index import (
+    COMPRESSED_VARIANT,
+    FileFingerprint,
+    UploadIndex,
+    get_upload_index,
 )
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 ## API wrapper functions
 SIGNED_URL_KEY = "signedUrl"
 
 
+@traced()
 def prepare_pipeline_run(
     pipeline_name: str,
     job_id: str,
-    pipeline_version: int,
+    pipeline_version: int | None,
     pipeline_inputs: dict[str, Any],
     description: str,
     agree_to_terms: bool,
@@ -69,6 +102,7 @@ def prepare_pipeline_run(
         return None
 
 
+@traced()
 def start_pipeline_run(job_id: str) -> str:
     """Call the startPipelineRun Teaspoons endpoint and return the Async Job Response."""
     start_pipeline_run_request_body: StartPipelineRunRequestBody = (
@@ -81,6 +115,7 @@ def start_pipeline_run(job_id: str) -> str:
         ).job_report.id
 
 
+@traced()
 def get_pipeline_run_status(job_id: uuid.UUID) -> AsyncPipelineRunResponseV2:
     """Call the getPipelineRunResult Teaspoons endpoint and return the Async Pipeline Run Response."""
 
@@ -89,6 +124,7 @@ def get_pipeline_run_status(job_id: uuid.UUID) -> AsyncPipelineRunResponseV2:
         return pipeline_runs_client.get_pipeline_run_result_v3(str(job_id))
 
 
+@traced()
 def get_pipeline_run_output_signed_urls(
     job_id: uuid.UUID,
 ) -> PipelineRunOutputSignedUrlsResponse:
@@ -98,8 +134,15 @@ def get_pipeline_run_output_signed_urls(
         return pipeline_runs_client.get_pipeline_run_output_signed_urls(str(job_id))
 
 
+@traced()
 def get_pipeline_runs(n_results_requested: int) -> list[PipelineRun]:
     """Get the latest n_results_requested pipeline runs a user has submitted (most recent first)"""
+    return list(iter_pipeline_runs(n_results_requested))
+
+
+def iter_pipeline_runs(n_results_requested: int) -> Iterator[PipelineRun]:
+    """Yield the latest n_results_requested pipeline runs a user has submitted (most recent first),
+    fetching each page of results only once the previous page has been consumed."""
 
     with ClientWrapper() as api_client:
 
@@ -115,71 +158,320 @@ def get_pipeline_runs(n_results_requested: int) -> list[PipelineRun]:
         )
         results = list(response.results) if response.results else []
         LOGGER.debug(f"Retrieved {len(results)} PipelineRun results")
+        n_results_yielded = len(results)
+        yield from results
         # handle case where total_results is not present
         n_total_results = response.total_results if response.total_results else 0
 
         # continue fetching results until we reach the requested number or the total available;
         # min(n_results_requested, n_total_results) ensures we do not fetch more than available
-        while len(results) < min(n_results_requested, n_total_results):
+        while n_results_yielded < min(n_results_requested, n_total_results):
             page_number += 1
             response = pipeline_runs_client.get_all_pipeline_runs_v2(
                 page_number=page_number,
-                page_size=min(api_chunk_default, n_results_requested - len(results)),
+                page_size=min(
+                    api_chunk_default, n_results_requested - n_results_yielded
+                ),
             )
             new_results = list(response.results) if response.results else []
-            results.extend(new_results)
+            n_results_yielded += len(new_results)
             LOGGER.debug(f"Retrieved {len(new_results)} additional PipelineRun results")
-            if len(results) == n_total_results:
+            yield from new_results
+            if n_results_yielded == n_total_results:
                 LOGGER.debug(
                     f"Reached end of available PipelineRun results ({n_total_results})"
                 )
 
-        return results
-
 
 ## submit action
 
 
+@traced()
 def prepare_upload_start_pipeline_run(
     pipeline_name: str,
-    pipeline_version: int,
+    pipeline_version: int | None,
     pipeline_inputs: dict[str, Any],
     description: str,
     agree_to_terms: bool,
+    compress_inputs: bool = False,
+    reuse_uploads: bool = False,
+    cloud_object_checker: CloudObjectChecker | None = None,
+    pipeline_info: PipelineWithDetails | None = None,
 ) -> str:
     """Prepare pipeline run, upload input files if input files are local, and start pipeline run.
+    If compress_inputs is True, local files given for inputs that take compressed (.gz) files are
+    BGZF compressed as they're uploaded.
+    If reuse_uploads is True, local files uploaded for an earlier job (and unchanged since) are passed
+    by the cloud path of that upload instead of being uploaded again, and new uploads are recorded.
+    Earlier uploads are only reused once cloud_object_checker confirms they still exist and can be read;
+    without a checker, files are uploaded again.
+    pipeline_info is the pipeline's definition, if it was already fetched (e.g. to validate the inputs);
+    otherwise it's fetched if compress_inputs or reuse_uploads needs it.
     Returns the uuid of the job."""
     # generate a job id for the user
     job_id = str(uuid.uuid4())
     LOGGER.info(f"Generated job_id {job_id}")
 
-    file_input_upload_urls: dict[str, str] | None = prepare_pipeline_run(
-        pipeline_name,
-        job_id,
-        pipeline_version,
-        pipeline_inputs,
-        description,
-        agree_to_terms,
+    local_file_inputs: dict[str, tuple[str, str | None]] = {}
+    if compress_inputs or reuse_uploads:
+        if pipeline_info is None:
+            pipeline_info = pipelines_logic.get_pipeline_info(
+                pipeline_name, pipeline_version
+            )
+        local_file_inputs = get_local_file_inputs(pipeline_info, pipeline_inputs)
+    # {input_name: local file path} for inputs to compress; the service sees the compressed file names
+    compressed_input_files = {
+        input_name: local_file_path
+        for input_name, (local_file_path, file_suffix) in local_file_inputs.items()
+        if compress_inputs and should_compress_input(local_file_path, file_suffix)
+    }
+    upload_index = get_upload_index(get_upload_scope()) if reuse_uploads else None
+    # pipes can't be found in or recorded in the upload index, since their data can only be read once
+    indexed_input_files = {
+        input_name: local_file_path
+        for input_name, (local_file_path, _) in local_file_inputs.items()
+        if upload_index is not None and not is_stream_file(local_file_path)
+    }
+    earlier_uploads: dict[str, str] = {}
+    if upload_index is not None:
+        for input_name, local_file_path in indexed_input_files.items():
+            if cloud_path := upload_index.find(
+                local_file_path, _get_upload_variant(input_name, compressed_input_files)
+            ):
+                earlier_uploads[input_name] = cloud_path
+    reused_uploads = get_available_uploads(earlier_uploads, cloud_object_checker)
+    for input_name, cloud_path in reused_uploads.items():
+        LOGGER.info(
+            f"Reusing earlier upload of `{indexed_input_files[input_name]}` for {pipeline_name} input `{input_name}`: {cloud_path}"
+        )
+        compressed_input_files.pop(input_name, None)
+    pipeline_inputs = (
+        pipeline_inputs
+        | {
+            input_name: f"{local_file_path}{GZIP_SUFFIX}"
+            for input_name, local_file_path in compressed_input_files.items()
+        }
+        | reused_uploads
     )
 
-    if file_input_upload_urls:
-        for input_name, signed_url in file_input_upload_urls.items():
-            input_file_value = pipeline_inputs[input_name]
-            LOGGER.info(
-                f"Uploading file `{input_file_value}` for {pipeline_name} input `{input_name}`"
+    with ThreadPoolExecutor(
+        max_workers=DEFAULT_MAX_CONCURRENT_TRANSFERS,
+        thread_name_prefix="terralab-submit",
+    ) as executor:
+        # set when an upload fails, to stop the others
+        cancel_event = threading.Event()
+        try:
+            if _has_local_file_inputs(pipeline_inputs):
+                # open connections to the storage host while the prepare call is in flight
+                warm_up_connections_in_background()
+            prepare_future = _submit_in_context(
+                executor,
+                prepare_pipeline_run,
+                pipeline_name,
+                job_id,
+                pipeline_version,
+                pipeline_inputs,
+                description,
+                agree_to_terms,
             )
-            LOGGER.debug(f"Found signed url: {signed_url}")
-
-            upload_file_with_signed_url(input_file_value, signed_url)
+            # while the prepare call is in flight, fingerprint the files that will be uploaded,
+            # so that their uploads can be recorded as soon as they finish
+            file_fingerprints = {
+                input_name: FileFingerprint.from_path(local_file_path)
+                for input_name, local_file_path in indexed_input_files.items()
+                if input_name not in reused_uploads
+            }
+            file_input_upload_urls: dict[str, str] | None = prepare_future.result()
+            upload_files = {
+                input_name: compressed_input_files.get(
+                    input_name, pipeline_inputs[input_name]
+                )
+                for input_name in file_input_upload_urls or {}
+            }
+            if upload_files:
+                _log_upload_size(upload_files.values())
+
+            # all uploads start as soon as their signed URLs are known, and the job starts once they've all finished
+            upload_futures = [
+                _submit_in_context(
+                    executor,
+                    _upload_input_file,
+                    pipeline_name,
+                    input_name,
+                    upload_files[input_name],
+                    signed_url,
+                    input_name in compressed_input_files,
+                    upload_index if input_name in file_fingerprints else None,
+                    file_fingerprints.get(input_name),
+                    cancel_event,
+                    progress_position,
+                )
+                for progress_position, (input_name, signed_url) in enumerate(
+                    (file_input_upload_urls or {}).items()
+                )
+            ]
+            for upload_future in as_completed(upload_futures):
+                # re-raises the error of a failed upload
+                upload_future.result()
+        except BaseException:
+            # stop the uploads in flight after their current block, and don't start the rest
+            cancel_event.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
     LOGGER.debug(f"Starting {pipeline_name} job {job_id}")
 
     return start_pipeline_run(job_id)
 
 
+def _upload_input_file(
+    pipeline_name: str,
+    input_name: str,
+    local_file_path: str,
+    signed_url: str,
+    compress: bool,
+    upload_index: UploadIndex | None,
+    file_fingerprint: FileFingerprint | None,
+    cancel_event: threading.Event | None = None,
+    progress_position: int | None = None,
+) -> None:
+    """Upload a local file for a pipeline input and, if upload_index is given, record the upload in it.
+    The upload stops if cancel_event is set, and its progress bar is shown on line progress_position.
+    """
+    LOGGER.debug(f"Found signed url: {signed_url}")
+    if compress:
+        LOGGER.info(
+            f"Compressing and uploading file `{local_file_path}` for {pipeline_name} input `{input_name}`"
+        )
+        upload_file_with_signed_url(
+            local_file_path,
+            signed_url,
+            compress=True,
+            cancel_event=cancel_event,
+            progress_position=progress_position,
+        )
+    else:
+        LOGGER.info(
+            f"Uploading file `{local_file_path}` for {pipeline_name} input `{input_name}`"
+        )
+        upload_file_with_signed_url(
+            local_file_path,
+            signed_url,
+            cancel_event=cancel_event,
+            progress_position=progress_position,
+        )
+
+    if upload_index is not None and (
+        cloud_path := get_cloud_path_from_signed_url(signed_url)
+    ):
+        upload_index.record(
+            local_file_path,
+            cloud_path,
+            COMPRESSED_VARIANT if compress else None,
+            file_fingerprint,
+        )
+
+
+def _has_local_file_inputs(pipeline_inputs: dict[str, Any]) -> bool:
+    """Return whether any input is a local file, i.e. whether submitting will upload anything."""
+    return any(
+        isinstance(input_value, str)
+        and not input_value.startswith(GCS_PREFIX)
+        and os.path.exists(input_value)
+        for input_value in pipeline_inputs.values()
+    )
+
+
+def _log_upload_size(local_file_paths: Iterable[str]) -> None:
+    """Log how many files are being uploaded and their total size. Pipes have no size until they're read,
+    and files that can't be read are left to their upload to report."""
+    local_file_paths = list(local_file_paths)
+    total_size = 0
+    for local_file_path in local_file_paths:
+        try:
+            file_stat = os.stat(local_file_path)
+        except OSError:
+            continue
+        if stat.S_ISREG(file_stat.st_mode):
+            total_size += file_stat.st_size
+    LOGGER.info(
+        f"Uploading {len(local_file_paths)} file(s), {convert_file_size_to_human_readable(total_size)} in total"
+    )
+
+
+def _submit_in_context(
+    executor: ThreadPoolExecutor, func: Callable[..., T], *args: Any
+) -> Future[T]:
+    """Run func in the executor in a copy of the current context, so that it uses the same api client
+    (see client.use_api_client) and trace span as the caller."""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def get_local_file_inputs(
+    pipeline_info: PipelineWithDetails, pipeline_inputs: dict[str, Any]
+) -> dict[str, tuple[str, str | None]]:
+    """Return {input_name: (local file path, file suffix the input takes)} for each local file input."""
+    return {
+        input_def.name: (pipeline_inputs[input_def.name], input_def.file_suffix)
+        for input_def in pipeline_info.inputs
+        if input_def.type == FILE_TYPE_KEY
+        and isinstance(pipeline_inputs.get(input_def.name), str)
+        and not pipeline_inputs[input_def.name].startswith(GCS_PREFIX)
+    }
+
+
+def get_upload_scope() -> str:
+    """Return the user and Teaspoons environment that uploads are made for. Uploads are only reused in the
+    scope they were made in, so that one user's uploads aren't passed as another user's inputs.
+    """
+    with ClientWrapper() as api_client:
+        api_config = api_client.configuration
+        return f"{_get_email_from_token(api_config.access_token)} {api_config.host}"
+
+
+def get_available_uploads(
+    earlier_uploads: dict[str, str],
+    cloud_object_checker: CloudObjectChecker | None,
+) -> dict[str, str]:
+    """Return the earlier uploads ({input_name: cloud path}) that still exist and can be read, as checked with
+    cloud_object_checker. Uploaded inputs can be deleted (e.g. by a retention policy), so without a checker
+    none are returned."""
+    if not earlier_uploads:
+        return {}
+    if cloud_object_checker is None:
+        LOGGER.warning(
+            "Can't check that earlier uploads still exist (this needs the gcloud CLI), so uploading the files again"
+        )
+        return {}
+    object_sizes = check_cloud_objects(earlier_uploads.values(), cloud_object_checker)
+    available_uploads = {}
+    for input_name, cloud_path in earlier_uploads.items():
+        object_size = object_sizes[cloud_path]
+        if object_size is None:
+            LOGGER.info(
+                f"Earlier upload {cloud_path} for input `{input_name}` no longer exists, uploading the file again"
+            )
+        elif isinstance(object_size, Exception):
+            LOGGER.info(
+                f"Can't read earlier upload {cloud_path} for input `{input_name}` ({object_size}), uploading the file again"
+            )
+        else:
+            available_uploads[input_name] = cloud_path
+    return available_uploads
+
+
+def _get_upload_variant(
+    input_name: str, compressed_input_files: dict[str, str]
+) -> str | None:
+    """Return the upload index variant for an input: compressed uploads are indexed separately."""
+    return COMPRESSED_VARIANT if input_name in compressed_input_files else None
+
+
 ## deliver action
 
 
+@traced()
 def deliver_pipeline_run_to_cloud(
     job_id: uuid.UUID, destination_gcs_path: str
 ) -> JobReport:
@@ -197,22 +489,221 @@ def deliver_pipeline_run_to_cloud(
 ## download action
 
 
+@traced()
 def get_signed_urls_and_download_pipeline_run_outputs(
-    job_id: uuid.UUID, local_destination: str
-) -> None:
-    """Retrieve pipeline run output signed URLs, download all output files."""
+    job_id: uuid.UUID,
+    local_destination: str,
+    output_names: tuple[str, ...] = (),
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+    layout: str = DEFAULT_LAYOUT,
+) -> list[str]:
+    """Retrieve pipeline run output signed URLs, download the selected output files (by default, all of them).
+    See download_pipeline_run_outputs; exits with an error instead of raising one.
+    Returns the local file paths of the downloaded files."""
     LOGGER.info(
         f"Getting output signed URLs for job {job_id} and downloading to {local_destination}"
     )
+    with _exit_on_error():
+        downloaded_files = download_pipeline_run_outputs(
+            job_id,
+            local_destination,
+            output_names,
+            include_patterns,
+            exclude_patterns,
+            layout,
+        )
+
+    LOGGER.info("All file outputs downloaded:")
+    for local_file_path in downloaded_files:
+        LOGGER.info(indented(local_file_path))
+
+    return downloaded_files
+
+
+def download_pipeline_run_outputs(
+    job_id: uuid.UUID,
+    local_destination: str,
+    output_names: tuple[str, ...] = (),
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+    layout: str = DEFAULT_LAYOUT,
+    max_concurrent_transfers: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
+) -> list[str]:
+    """Retrieve pipeline run output signed URLs and download the selected output files (by default, all of them),
+    at most max_concurrent_transfers at a time.
+    See select_output_names for how outputs are selected, and download_layout for where they're saved.
+    Raises an InputValidationError before downloading anything if the selection is invalid, if the layout would
+    save two outputs to the same place, or if there isn't enough disk space for the outputs, and raises a
+    TransferError if a download fails.
+    Returns the local file paths of the downloaded files."""
+    # open connections to the storage host while the signed URLs are fetched
+    warm_up_connections_in_background()
     response = get_pipeline_run_output_signed_urls(job_id)
 
-    signed_urls_dict: dict[str, str] = response.output_signed_urls
+    all_signed_urls: dict[str, str] = response.output_signed_urls
+    selected_output_names = select_output_names(
+        list(all_signed_urls), output_names, include_patterns, exclude_patterns
+    )
+    signed_urls_dict: dict[str, str] = {
+        output_name: all_signed_urls[output_name]
+        for output_name in selected_output_names
+    }
+    # plan the download: decide where each output is saved, so that no two downloads write to the same file,
+    # and check there's space for the outputs whose sizes the service reports.
+    # each file's space is also reserved when its download starts.
+    try:
+        local_file_paths = plan_download_paths(
+            local_destination, signed_urls_dict, layout, job_id
+        )
+    except ValueError as e:
+        raise InputValidationError([f"Error: {e}"]) from e
+    output_sizes = get_pipeline_run_output_sizes(job_id)
+    required_bytes = sum(
+        output_sizes.get(output_name) or 0 for output_name in signed_urls_dict
+    )
+    if error := get_disk_space_error(local_destination, required_bytes):
+        raise InputValidationError([error])
+    if required_bytes:
+        LOGGER.info(
+            f"Downloading {len(signed_urls_dict)} files ({convert_file_size_to_human_readable(required_bytes)})"
+        )
+
     # extract output signed urls and download them all
     signed_url_list: list[str] = list(signed_urls_dict.values())
-    downloaded_files: list[str] = download_files_with_signed_urls(
-        local_destination, signed_url_list
+    return download_files_with_signed_urls(
+        local_destination,
+        signed_url_list,
+        list(local_file_paths.values()),
+        max_concurrent_transfers,
     )
 
-    LOGGER.info("All file outputs downloaded:")
-    for local_file_path in downloaded_files:
-        LOGGER.info(indented(local_file_path))
+
+@contextlib.contextmanager
+def _exit_on_error() -> Iterator[None]:
+    """Log a TerralabError raised by the logic functions and exit, as the commands do for errors."""
+    try:
+        yield
+    except TerralabError as e:
+        LOGGER.error(add_blankline_before(str(e)))
+        exit(1)
+
+
+def stream_pipeline_run_output(
+    job_id: uuid.UUID,
+    out_file: BinaryIO,
+    output_names: tuple[str, ...] = (),
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+) -> int:
+    """Retrieve pipeline run output signed URLs and stream a single selected output file to out_file,
+    e.g. stdout or a named pipe. See select_output_names for how outputs are selected.
+    Exits with an error if the selection isn't exactly one output. Returns the number of bytes written.
+    """
+    # open connections to the storage host while the signed URLs are fetched
+    warm_up_connections_in_background()
+    response = get_pipeline_run_output_signed_urls(job_id)
+    signed_urls_dict: dict[str, str] = response.output_signed_urls
+    with _exit_on_error():
+        selected_output_names = select_output_names(
+            list(signed_urls_dict), output_names, include_patterns, exclude_patterns
+        )
+    if len(selected_output_names) != 1:
+        LOGGER.error(
+            f"Only one output can be streamed at a time, but {len(selected_output_names)} outputs were selected: "
+            f"{', '.join(selected_output_names)}. Select one with --output-name."
+        )
+        exit(1)
+
+    output_name = selected_output_names[0]
+    LOGGER.info(f"Streaming output {output_name} of job {job_id}")
+    try:
+        bytes_written = stream_signed_url(signed_urls_dict[output_name], out_file)
+    except BrokenPipeError:
+        # e.g. the output was piped to `head`, which exits after reading what it needs
+        LOGGER.warning(
+            f"Stopped streaming output {output_name}: the reader closed the pipe"
+        )
+        return 0
+    except Exception as e:
+        LOGGER.error(add_blankline_before(f"Error streaming output: {e}"))
+        exit(1)
+
+    LOGGER.info(
+        f"Streamed output {output_name} ({convert_file_size_to_human_readable(bytes_written)})"
+    )
+    return bytes_written
+
+
+def list_pipeline_run_outputs(
+    job_id: uuid.UUID,
+    output_names: tuple[str, ...] = (),
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+) -> dict[str, int | None]:
+    """Return {output_name: size in bytes} for a job's selected outputs, without getting signed URLs for them.
+    See select_output_names for how outputs are selected."""
+    output_sizes = get_pipeline_run_output_sizes(job_id)
+    with _exit_on_error():
+        selected_output_names = select_output_names(
+            list(output_sizes), output_names, include_patterns, exclude_patterns
+        )
+    return {
+        output_name: output_sizes[output_name] for output_name in selected_output_names
+    }
+
+
+def select_output_names(
+    available_output_names: list[str],
+    output_names: tuple[str, ...] = (),
+    include_patterns: tuple[str, ...] = (),
+    exclude_patterns: tuple[str, ...] = (),
+) -> list[str]:
+    """Select outputs by name and glob pattern, in the order of available_output_names.
+
+    An output is selected if it's one of output_names or matches one of include_patterns
+    (or if neither is given), and it doesn't match any of exclude_patterns.
+    Raises an InputValidationError if any of output_names isn't an available output, or if nothing is selected.
+    """
+    if unknown_output_names := [
+        output_name
+        for output_name in output_names
+        if output_name not in available_output_names
+    ]:
+        raise InputValidationError(
+            [
+                f"Unknown output(s): {', '.join(unknown_output_names)}. "
+                f"Available outputs: {', '.join(available_output_names)}"
+            ]
+        )
+
+    selected_output_names = [
+        output_name
+        for output_name in available_output_names
+        if (
+            not (output_names or include_patterns)
+            or output_name in output_names
+            or any(fnmatch.fnmatchcase(output_name, p) for p in include_patterns)
+        )
+        and not any(fnmatch.fnmatchcase(output_name, p) for p in exclude_patterns)
+    ]
+    if not selected_output_names:
+        raise InputValidationError(
+            [
+                f"No outputs match the given filters. Available outputs: {', '.join(available_output_names)}"
+            ]
+        )
+    return selected_output_names
+
+
+def get_pipeline_run_output_sizes(job_id: uuid.UUID) -> dict[str, int | None]:
+    """Return {output_name: size in bytes} for a job's outputs, with None where the size isn't reported."""
+    outputs = get_pipeline_run_status(job_id).pipeline_run_report.outputs or {}
+    return {
+        output_name: (
+            output_value.get("metadata", {}).get("sizeInBytes")
+            if isinstance(output_value, dict)
+            else None
+        )
+        for output_name, output_value in outputs.items()
+    }
@@ -1,6 +1,8 @@
 # logic/pipelines_logic.py
 
+import contextvars
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 from teaspoons_client import (  # type: ignore[attr-defined]
@@ -13,15 +15,23 @@ from teaspoons_client import (  # type: ignore[attr-defined]
 
 from terralab.client import ClientWrapper
 from terralab.constants import (
+    FILE_ARRAY_TYPE_KEY,
     FILE_TYPE_KEY,
     GCS_PREFIX,
 )
+from terralab.gcs_helper import CloudObjectChecker, check_cloud_objects
 from terralab.log import join_lines, add_blankline_before
-from terralab.utils import is_valid_local_file, validate_file_size
+from terralab.utils import (
+    convert_file_size_to_human_readable,
+    is_valid_local_file,
+    validate_file_size,
+)
+from terralab.tracing import traced
 
 LOGGER = logging.getLogger(__name__)
 
 
+@traced()
 def list_pipelines() -> list[Pipeline]:
     """List all pipelines, returning a list of Pipeline objects."""
     with ClientWrapper() as api_client:
@@ -31,7 +41,8 @@ def list_pipelines() -> list[Pipeline]:
         return [pipeline for pipeline in pipelines.results]
 
 
-def get_pipeline_info(pipeline_name: str, version: int) -> PipelineWithDetails:
+@traced()
+def get_pipeline_info(pipeline_name: str, version: int | None) -> PipelineWithDetails:
     """Get the details of a pipeline, returning a dictionary."""
     get_pipeline_details_request_body: GetPipelineDetailsRequestBody = (
         GetPipelineDetailsRequestBody(pipelineVersion=version)
@@ -44,30 +55,145 @@ def get_pipeline_info(pipeline_name: str, version: int) -> PipelineWithDetails:
 
 
 def validate_pipeline_inputs(
-    pipeline_name: str, version: int, inputs_dict: dict[str, Any]
-) -> None:
+    pipeline_name: str,
+    version: int,
+    inputs_dict: dict[str, Any],
+    cloud_object_checker: CloudObjectChecker | None = None,
+) -> PipelineWithDetails:
     """Validate pipeline inputs against required parameters and file existence.
-    Exits with error if validation fails."""
+    If a cloud_object_checker is provided, also check that all cloud file inputs exist;
+    these checks start once the pipeline definition shows which inputs are files, and run concurrently
+    with local validation.
+    Exits with error if validation fails. Returns the pipeline definition, so that submitting doesn't
+    need to fetch it again."""
+    pipeline_info, errors = get_pipeline_info_and_input_errors(
+        pipeline_name, version, inputs_dict, cloud_object_checker
+    )
+    if errors:
+        LOGGER.error(add_blankline_before(join_lines(errors)))
+        exit(1)
+    return pipeline_info
+
+
+def get_pipeline_input_errors(
+    pipeline_name: str,
+    version: int | None,
+    inputs_dict: dict[str, Any],
+    cloud_object_checker: CloudObjectChecker | None = None,
+) -> list[str]:
+    """Validate pipeline inputs as in validate_pipeline_inputs, returning a list of error messages
+    (empty if the inputs are valid)."""
+    return get_pipeline_info_and_input_errors(
+        pipeline_name, version, inputs_dict, cloud_object_checker
+    )[1]
+
+
+@traced()
+def get_pipeline_info_and_input_errors(
+    pipeline_name: str,
+    version: int | None,
+    inputs_dict: dict[str, Any],
+    cloud_object_checker: CloudObjectChecker | None = None,
+) -> tuple[PipelineWithDetails, list[str]]:
+    """Validate pipeline inputs as in validate_pipeline_inputs, returning the pipeline definition and
+    a list of error messages (empty if the inputs are valid)."""
     pipeline_info = get_pipeline_info(pipeline_name, version)
-    errors = []
 
-    # validate all expected inputs
-    for input_def in pipeline_info.inputs:
-        if error := _validate_single_input(input_def, inputs_dict):
-            errors.append(error)
-
-    # check for unexpected inputs
-    expected_inputs = {input_def.name for input_def in pipeline_info.inputs}
-    unexpected_inputs = set(inputs_dict.keys()) - expected_inputs
-    if unexpected_inputs:
-        errors.extend(
-            f"Error: Unexpected input '{input_name}'."
-            for input_name in unexpected_inputs
+    # check the cloud files given for file inputs while the other inputs are validated
+    cloud_check_future: Future[dict[str, int | None | Exception]] | None = None
+    executor = ThreadPoolExecutor(max_workers=1)
+    if cloud_object_checker is not None:
+        cloud_check_future = executor.submit(
+            contextvars.copy_context().run,
+            check_cloud_objects,
+            _get_file_input_cloud_paths(pipeline_info.inputs, inputs_dict),
+            cloud_object_checker,
         )
 
-    if errors:
-        LOGGER.error(add_blankline_before(join_lines(errors)))
-        exit(1)
+    try:
+        errors = []
+
+        # validate all expected inputs
+        for input_def in pipeline_info.inputs:
+            if error := _validate_single_input(input_def, inputs_dict):
+                errors.append(error)
+
+        # check for unexpected inputs
+        expected_inputs = {input_def.name for input_def in pipeline_info.inputs}
+        unexpected_inputs = set(inputs_dict.keys()) - expected_inputs
+        if unexpected_inputs:
+            errors.extend(
+                f"Error: Unexpected input '{input_name}'."
+                for input_name in unexpected_inputs
+            )
+
+        if cloud_check_future is not None:
+            errors.extend(
+                _get_cloud_input_errors(
+                    pipeline_info.inputs, inputs_dict, cloud_check_future.result()
+                )
+            )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return pipeline_info, errors
+
+
+def _get_cloud_paths(input_values: Any) -> list[str]:
+    """Return all cloud paths found in the provided input values (single values or arrays)."""
+    cloud_paths: list[str] = []
+    for input_value in input_values:
+        values = input_value if isinstance(input_value, list) else [input_value]
+        cloud_paths.extend(
+            value
+            for value in values
+            if isinstance(value, str) and value.startswith(GCS_PREFIX)
+        )
+    return cloud_paths
+
+
+def _get_file_input_cloud_paths(
+    input_defs: list[PipelineUserProvidedInputDefinition], inputs_dict: dict[str, Any]
+) -> list[str]:
+    """Return the cloud paths given for file and file array inputs."""
+    return _get_cloud_paths(
+        inputs_dict.get(input_def.name)
+        for input_def in input_defs
+        if input_def.type in (FILE_TYPE_KEY, FILE_ARRAY_TYPE_KEY)
+    )
+
+
+def _get_cloud_input_errors(
+    input_defs: list[PipelineUserProvidedInputDefinition],
+    inputs_dict: dict[str, Any],
+    cloud_object_sizes: dict[str, int | None | Exception],
+) -> list[str]:
+    """Return an error message for each missing or inaccessible cloud file input."""
+    errors = []
+    total_size_bytes = 0
+    n_objects = 0
+    for input_def in input_defs:
+        if input_def.type not in (FILE_TYPE_KEY, FILE_ARRAY_TYPE_KEY):
+            continue
+        for gcs_path in _get_cloud_paths([inputs_dict.get(input_def.name)]):
+            result = cloud_object_sizes.get(gcs_path)
+            if result is None:
+                errors.append(
+                    f"Error: Could not find cloud file for input '{input_def.name}': '{gcs_path}'."
+                )
+            elif isinstance(result, Exception):
+                errors.append(
+                    f"Error: Could not check cloud file for input '{input_def.name}': '{gcs_path}' ({result})."
+                )
+            else:
+                total_size_bytes += result
+                n_objects += 1
+
+    if n_objects:
+        LOGGER.info(
+            f"Found {n_objects} cloud input file{'' if n_objects == 1 else 's'} ({convert_file_size_to_human_readable(total_size_bytes)} total)"
+        )
+    return errors
 
 
 def _validate_single_input(
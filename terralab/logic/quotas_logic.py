@@ -5,10 +5,12 @@ import logging
 from teaspoons_client import QuotasApi, QuotaWithDetails  # type: ignore[attr-defined]
 
 from terralab.client import ClientWrapper
+from terralab.tracing import traced
 
 LOGGER = logging.getLogger(__name__)
 
 
+@traced()
 def get_user_quota(pipeline_name: str) -> QuotaWithDetails:
     """Get the details of a user's quota for a specific pipeline"""
     with ClientWrapper() as api_client:
@@ -0,0 +1,109 @@
+# output.py
+
+import csv
+import datetime
+import io
+import json
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
+import click
+
+TEXT_FORMAT = "text"
+JSON_FORMAT = "json"
+NDJSON_FORMAT = "ndjson"
+CSV_FORMAT = "csv"
+OUTPUT_FORMATS = [TEXT_FORMAT, JSON_FORMAT, NDJSON_FORMAT, CSV_FORMAT]
+
+_output_format = TEXT_FORMAT
+
+
+def configure_output(output_format: str) -> None:
+    """Set the output format used by all commands for this invocation."""
+    global _output_format
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}'")
+    _output_format = output_format
+
+
+def is_machine_readable() -> bool:
+    """Return whether command results should be written to stdout in a machine-readable format
+    instead of being logged as human-readable text."""
+    return _output_format != TEXT_FORMAT
+
+
+def to_serializable(obj: Any) -> Any:
+    """Convert a teaspoons_client model (or a dict/list containing them) to plain JSON-compatible values."""
+    if hasattr(obj, "to_dict"):
+        return to_serializable(obj.to_dict())
+    if isinstance(obj, dict):
+        return {str(key): to_serializable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_serializable(value) for value in obj]
+    if isinstance(obj, (uuid.UUID, datetime.date, datetime.datetime)):
+        return str(obj)
+    return obj
+
+
+def emit(obj: Any) -> None:
+    """Write a single result object to stdout in the configured machine-readable format."""
+    if _output_format == JSON_FORMAT:
+        click.echo(json.dumps(to_serializable(obj), indent=2))
+    else:
+        emit_rows([obj])
+
+
+def emit_rows(rows: Iterable[Any]) -> None:
+    """Write result objects to stdout in the configured machine-readable format, one at a time,
+    so that rows from a paginated fetch are written as soon as they arrive."""
+    if _output_format == JSON_FORMAT:
+        _emit_json_array(rows)
+    elif _output_format == CSV_FORMAT:
+        _emit_csv(rows)
+    else:
+        for row in rows:
+            click.echo(json.dumps(to_serializable(row)))
+
+
+def _emit_json_array(rows: Iterable[Any]) -> None:
+    click.echo("[", nl=False)
+    separator = "\n"
+    for row in rows:
+        click.echo(f"{separator}  {json.dumps(to_serializable(row))}", nl=False)
+        separator = ",\n"
+    click.echo("\n]" if separator != "\n" else "]")
+
+
+def _emit_csv(rows: Iterable[Any]) -> None:
+    buffer = io.StringIO()
+    writer: csv.DictWriter[str] | None = None
+    for row in rows:
+        flat_row = _flatten_for_csv(to_serializable(row))
+        if writer is None:
+            # columns are fixed by the first row; later rows' missing fields are left empty
+            writer = csv.DictWriter(
+                buffer, fieldnames=_csv_fieldnames(row, flat_row), extrasaction="ignore"
+            )
+            writer.writeheader()
+        writer.writerow(flat_row)
+        click.echo(buffer.getvalue(), nl=False)
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _csv_fieldnames(row: Any, flat_row: dict[str, Any]) -> list[str]:
+    """Use all of a model's fields as columns, since unset fields are omitted from its serialized form."""
+    if model_fields := getattr(type(row), "model_fields", None):
+        return [field.alias or name for name, field in model_fields.items()]
+    return list(flat_row)
+
+
+def _flatten_for_csv(row: Any) -> dict[str, Any]:
+    """CSV cells must be scalar, so nested values are written as JSON strings."""
+    if not isinstance(row, dict):
+        row = {"value": row}
+    return {
+        key: json.dumps(value) if isinstance(value, (dict, list)) else value
+        for key, value in row.items()
+    }
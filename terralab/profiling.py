@@ -0,0 +1,207 @@
+# profiling.py
+
+"""
+Profiling for any terralab command, with the hidden --profile option:
+
+    terralab --profile jobs list                   # cProfile; read the stats with `python -m pstats terralab.prof`
+    terralab --profile=sampling submit ...         # sampled stacks in collapsed format, for flamegraph tools
+    terralab --profile --profile-file=out.prof ... # write the profile somewhere else
+
+When run through the `terralab` entrypoint, profiling starts before the CLI is imported, so the profile
+includes import time. Profiled commands always run in the calling process rather than in the terralab agent.
+
+This module is imported on every invocation, so it must only import lightweight modules at the top level.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_OPTION = "--profile"
+PROFILE_FILE_OPTION = "--profile-file"
+CPROFILE = "cprofile"
+SAMPLING = "sampling"
+PROFILERS = [CPROFILE, SAMPLING]
+# the root command's options that don't take a value; all its others except --profile take one
+ROOT_FLAG_OPTIONS = {"--debug", "--stats", "--version", "-h", "--help"}
+DEFAULT_PROFILE_FILES = {CPROFILE: "terralab.prof", SAMPLING: "terralab.collapsed"}
+SAMPLING_INTERVAL_SECONDS = 0.001
+
+
+def get_subcommand_index(args: list[str]) -> int:
+    """Return the index in args of the subcommand name (or len(args) if there isn't one), i.e. where the
+    root command's options end. Arguments after it belong to the subcommand, e.g. a pipeline input named
+    `profile`."""
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--" or not arg.startswith("-"):
+            return i
+        if arg == PROFILE_OPTION:
+            i += 2 if i + 1 < len(args) and args[i + 1] in PROFILERS else 1
+        elif "=" in arg or arg in ROOT_FLAG_OPTIONS:
+            i += 1
+        else:
+            i += 2  # the option and its value
+    return len(args)
+
+
+def normalize_profile_args(args: list[str]) -> list[str]:
+    """Rewrite a bare `--profile` root option (one not followed by a profiler name) as `--profile=cprofile`,
+    so that the option's value is optional without swallowing the subcommand name."""
+    subcommand_index = get_subcommand_index(args)
+    return [
+        (
+            f"{PROFILE_OPTION}={CPROFILE}"
+            if arg == PROFILE_OPTION
+            and i < subcommand_index
+            and (i + 1 == len(args) or args[i + 1] not in PROFILERS)
+            else arg
+        )
+        for i, arg in enumerate(args)
+    ]
+
+
+def get_profile_options(args: list[str]) -> tuple[str | None, str | None]:
+    """Return the profiler and profile file requested in args, if any, without parsing the whole command."""
+    profiler = profile_file = None
+    args = normalize_profile_args(args)
+    root_args = args[: get_subcommand_index(args)]
+    for i, arg in enumerate(root_args):
+        next_arg = root_args[i + 1] if i + 1 < len(root_args) else None
+        if arg.startswith(f"{PROFILE_OPTION}="):
+            profiler = arg.partition("=")[2]
+        elif arg == PROFILE_OPTION:
+            profiler = next_arg
+        elif arg.startswith(f"{PROFILE_FILE_OPTION}="):
+            profile_file = arg.partition("=")[2]
+        elif arg == PROFILE_FILE_OPTION:
+            profile_file = next_arg
+    return profiler, profile_file
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval, and writes the number of times each stack
+    was seen in collapsed ("folded") format: `frame;frame;frame count`, one stack per line.
+    """
+
+    def __init__(self, interval_seconds: float = SAMPLING_INTERVAL_SECONDS) -> None:
+        self.interval_seconds = interval_seconds
+        self.stack_counts: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="terralab-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self) -> None:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._thread.ident:
+                continue
+            stack = ";".join(
+                [thread_names.get(thread_id, str(thread_id))]
+                + [_format_frame(stack_frame) for stack_frame in _walk_stack(frame)]
+            )
+            self.stack_counts[stack] += 1
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as profile_file:
+            for stack, count in self.stack_counts.most_common():
+                profile_file.write(f"{stack} {count}\n")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.sample()
+
+
+def _walk_stack(frame: FrameType | None) -> list[FrameType]:
+    """Return the frames of a stack, outermost first."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    return frames[::-1]
+
+
+def _format_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    # `;` separates frames in the collapsed format
+    file_name = code.co_filename.replace(";", "_")
+    return f"{code.co_qualname} ({file_name}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """Profiles the process with cProfile or the sampling profiler, writing the profile when stopped"""
+
+    def __init__(self, profiler: str, profile_file: str | None = None) -> None:
+        if profiler not in PROFILERS:
+            raise ValueError(
+                f"Invalid profiler '{profiler}'; expected one of {', '.join(PROFILERS)}"
+            )
+        self.profiler = profiler
+        self.profile_file = profile_file or DEFAULT_PROFILE_FILES[profiler]
+        if profiler == CPROFILE:
+            import cProfile
+
+            self._profile: cProfile.Profile | SamplingProfiler = cProfile.Profile()
+        else:
+            self._profile = SamplingProfiler()
+        self.started_at = time.monotonic()
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+        if isinstance(self._profile, SamplingProfiler):
+            self._profile.start()
+        else:
+            self._profile.enable()
+
+    def stop(self) -> None:
+        """Stop profiling and write the profile."""
+        if isinstance(self._profile, SamplingProfiler):
+            self._profile.stop()
+            self._profile.write(self.profile_file)
+        else:
+            self._profile.disable()
+            self._profile.dump_stats(self.profile_file)
+        LOGGER.info(
+            f"Wrote {self.profiler} profile of {time.monotonic() - self.started_at:.2f}s "
+            f"to {os.path.abspath(self.profile_file)}"
+        )
+
+
+_profiler: Profiler | None = None
+
+
+def start_profiling(profiler: str, profile_file: str | None = None) -> bool:
+    """Start profiling this process, unless it's already being profiled. Returns whether profiling started."""
+    global _profiler
+    if _profiler is not None:
+        return False
+    _profiler = Profiler(profiler, profile_file)
+    _profiler.start()
+    return True
+
+
+def stop_profiling() -> None:
+    """Stop profiling this process and write the profile, if it's being profiled."""
+    global _profiler
+    if _profiler is None:
+        return
+    profiler, _profiler = _profiler, None
+    try:
+        profiler.stop()
+    except OSError as e:
+        LOGGER.error(f"Unable to write profile to '{profiler.profile_file}': {e}")
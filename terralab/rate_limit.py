@@ -0,0 +1,202 @@
+# rate_limit.py
+
+"""
+Client-side rate limiting for Teaspoons API calls, so that many concurrent terralab processes stay under the
+service's throttling limits instead of all backing off together.
+
+Limits are set per endpoint class with the TERRALAB_API_RATE_LIMITS environment variable, in requests per
+second, e.g. `read=20,write=2` (or `*=10` for all endpoints). Requests that change something (preparing and
+starting jobs, delivering outputs) are writes; all others, including the POST that gets a pipeline's details,
+are reads. Limits apply within a process unless
+TERRALAB_API_RATE_LIMIT_FILE names a file, in which case all processes on the host using that file share them.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO
+
+LOGGER = logging.getLogger(__name__)
+
+RATE_LIMITS_ENV_VAR = "TERRALAB_API_RATE_LIMITS"
+RATE_LIMIT_FILE_ENV_VAR = "TERRALAB_API_RATE_LIMIT_FILE"
+
+READ_ENDPOINT_CLASS = "read"
+WRITE_ENDPOINT_CLASS = "write"
+ALL_ENDPOINT_CLASSES = "*"
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Teaspoons endpoints that only read, but take their parameters in a POST body
+READ_POST_PATHS = (
+    # get pipeline details
+    re.compile(r"/api/pipelines/v\d+/[^/]+$"),
+)
+
+
+class TokenBucket:
+    """Allows rate_per_second acquisitions per second on average, with bursts of up to burst at once.
+
+    Callers that exceed the rate reserve a future token (the bucket goes negative) and wait for it,
+    so waiting callers are served in order."""
+
+    def __init__(self, rate_per_second: float, burst: float | None = None) -> None:
+        if rate_per_second <= 0:
+            raise ValueError("Rate limit must be positive")
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens from the bucket, waiting until they're available. Returns the time waited in seconds."""
+        wait_seconds = self.reserve(tokens)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+        return wait_seconds
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens from the bucket and return how long the caller must wait before using them."""
+        with self._lock:
+            self._tokens, self._updated_at, wait_seconds = self._take(
+                self._tokens, self._updated_at, time.monotonic(), tokens
+            )
+        return wait_seconds
+
+    def _take(
+        self, available: float, updated_at: float, now: float, tokens: float
+    ) -> tuple[float, float, float]:
+        """Refill the bucket for the time since updated_at and take tokens from it.
+        Returns the new token count, the refill time, and the seconds to wait for the tokens.
+        """
+        available = min(
+            self.burst, available + (now - updated_at) * self.rate_per_second
+        )
+        available -= tokens
+        wait_seconds = max(0.0, -available / self.rate_per_second)
+        return available, now, wait_seconds
+
+
+class SharedTokenBucket(TokenBucket):
+    """A TokenBucket whose state is kept in a file, locked while it's updated, so that it is shared
+    by all processes on the host that use the same file and bucket name."""
+
+    def __init__(
+        self,
+        state_file: str,
+        name: str,
+        rate_per_second: float,
+        burst: float | None = None,
+    ) -> None:
+        super().__init__(rate_per_second, burst)
+        self.state_file = state_file
+        self.name = name
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        with self._lock, _locked_state_file(self.state_file) as state_file:
+            try:
+                state = json.load(state_file)
+            except ValueError:
+                state = {}  # new or corrupt file
+            # wall clock time, since monotonic clocks aren't comparable across processes
+            now = time.time()
+            available, updated_at = state.get(self.name, (self.burst, now))
+            available, updated_at, wait_seconds = self._take(
+                available, updated_at, now, tokens
+            )
+            state[self.name] = (available, updated_at)
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump(state, state_file)
+        return wait_seconds
+
+
+@contextmanager
+def _locked_state_file(path: str) -> Iterator[IO[str]]:
+    import fcntl  # not available on Windows, where rate limits can't be shared
+
+    descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(descriptor, "r+") as state_file:
+        fcntl.flock(state_file, fcntl.LOCK_EX)
+        try:
+            yield state_file
+        finally:
+            state_file.flush()
+            fcntl.flock(state_file, fcntl.LOCK_UN)
+
+
+def get_endpoint_class(method: str, path: str = "") -> str:
+    """Return the endpoint class used to look up the rate limit for a request to the given URL path."""
+    if method.upper() in READ_METHODS or (
+        method.upper() == "POST"
+        and any(pattern.search(path) for pattern in READ_POST_PATHS)
+    ):
+        return READ_ENDPOINT_CLASS
+    return WRITE_ENDPOINT_CLASS
+
+
+def parse_rate_limits(rate_limits: str) -> dict[str, float]:
+    """Parse rate limits in the form `read=20,write=2` to a dictionary of {endpoint_class: requests_per_second}."""
+    parsed_limits = {}
+    for rate_limit in filter(None, (part.strip() for part in rate_limits.split(","))):
+        endpoint_class, separator, rate = rate_limit.partition("=")
+        try:
+            rate_per_second = float(rate) if separator else 0.0
+        except ValueError:
+            rate_per_second = 0.0
+        if rate_per_second <= 0:
+            raise ValueError(
+                f"Invalid rate limit '{rate_limit}' in {RATE_LIMITS_ENV_VAR}; "
+                "expected ENDPOINT_CLASS=REQUESTS_PER_SECOND"
+            )
+        parsed_limits[endpoint_class.strip()] = rate_per_second
+    return parsed_limits
+
+
+class ApiRateLimiter:
+    """Applies per-endpoint-class rate limits to API requests"""
+
+    def __init__(
+        self, rate_limits: dict[str, float], state_file: str | None = None
+    ) -> None:
+        self._buckets: dict[str, TokenBucket] = {}
+        for endpoint_class, rate in rate_limits.items():
+            self._buckets[endpoint_class] = (
+                SharedTokenBucket(state_file, endpoint_class, rate)
+                if state_file
+                else TokenBucket(rate)
+            )
+
+    def acquire(self, method: str, path: str = "") -> None:
+        """Wait until a request with the given HTTP method and URL path is allowed by the rate limits."""
+        endpoint_class = get_endpoint_class(method, path)
+        bucket = self._buckets.get(endpoint_class) or self._buckets.get(
+            ALL_ENDPOINT_CLASSES
+        )
+        if bucket is not None and (wait_seconds := bucket.acquire()) > 0:
+            LOGGER.debug(
+                f"Waited {wait_seconds:.2f}s for {endpoint_class} API rate limit"
+            )
+
+
+_api_rate_limiter: ApiRateLimiter | None = None
+_api_rate_limiter_loaded = False
+_api_rate_limiter_lock = threading.Lock()
+
+
+def get_api_rate_limiter() -> ApiRateLimiter | None:
+    """Return the API rate limiter configured by environment variables, or None if there are no limits."""
+    global _api_rate_limiter, _api_rate_limiter_loaded
+    with _api_rate_limiter_lock:
+        if not _api_rate_limiter_loaded:
+            if rate_limits := os.environ.get(RATE_LIMITS_ENV_VAR):
+                _api_rate_limiter = ApiRateLimiter(
+                    parse_rate_limits(rate_limits),
+                    os.environ.get(RATE_LIMIT_FILE_ENV_VAR),
+                )
+            _api_rate_limiter_loaded = True
+        return _api_rate_limiter
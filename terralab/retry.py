@@ -0,0 +1,216 @@
+# retry.py
+
+"""
+Retry policy shared by Teaspoons API calls, Sam calls, and signed URL transfers.
+
+Retries back off exponentially with full jitter, honor the server's Retry-After header, and draw from a
+process-wide retry budget, so that a persistent outage fails fast instead of every call backing off in turn.
+"""
+
+import datetime
+import email.utils
+import http.client
+import logging
+import random
+import threading
+import time
+import urllib.error
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+import requests
+from urllib3.util.retry import Retry
+
+LOGGER = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+# statuses for which the server may tell us how long to wait
+RETRY_AFTER_STATUS_CODES = frozenset({429, 503})
+# never wait longer than this for a single retry, whatever the server asks for
+MAX_RETRY_AFTER_SECONDS = 300
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How many times, and how long to wait between attempts, to retry transient failures"""
+
+    max_attempts: int = 5
+    initial_backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 60.0
+    # total retries allowed per process, across all calls
+    retry_budget: int = 100
+    retryable_status_codes: frozenset[int] = field(default=RETRYABLE_STATUS_CODES)
+
+    def get_backoff_seconds(
+        self, retry_number: int, retry_after_seconds: float | None = None
+    ) -> float:
+        """Return how long to wait before the retry_number'th retry (starting at 1)."""
+        if retry_after_seconds is not None:
+            return min(retry_after_seconds, MAX_RETRY_AFTER_SECONDS)
+        # "full jitter" keeps concurrent clients from retrying in lockstep
+        max_backoff = min(
+            self.max_backoff_seconds,
+            self.initial_backoff_seconds * 2 ** (retry_number - 1),
+        )
+        return random.uniform(0, max_backoff)
+
+
+class RetryBudget:
+    """A thread-safe count of the retries remaining in this process"""
+
+    def __init__(self, retries: int) -> None:
+        self._remaining = retries
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Use up one retry, returning False if the budget is exhausted."""
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+_retry_policy = RetryPolicy()
+_retry_budget = RetryBudget(_retry_policy.retry_budget)
+
+
+def configure_retries(policy: RetryPolicy) -> None:
+    """Set the retry policy used for all calls in this process, resetting the retry budget."""
+    global _retry_policy, _retry_budget
+    _retry_policy = policy
+    _retry_budget = RetryBudget(policy.retry_budget)
+
+
+def get_retry_policy() -> RetryPolicy:
+    return _retry_policy
+
+
+def parse_retry_after(retry_after: str | None) -> float | None:
+    """Parse a Retry-After header value, which is either a number of seconds or an HTTP date."""
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(
+        0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+    )
+
+
+def get_retry_status_and_delay(e: BaseException) -> tuple[bool, float | None]:
+    """Return whether the exception is a transient failure worth retrying and, if the server said so,
+    how long to wait before retrying."""
+    status: int | None = None
+    headers: Any = None
+    if isinstance(e, requests.HTTPError):
+        if e.response is None:
+            return False, None
+        status, headers = e.response.status_code, e.response.headers
+    elif isinstance(e, urllib.error.HTTPError):
+        status, headers = e.code, e.headers
+    elif isinstance(
+        e,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+            urllib.error.URLError,
+            http.client.IncompleteRead,
+            ConnectionError,
+            TimeoutError,
+        ),
+    ):
+        return True, None
+    else:
+        return False, None
+
+    if status not in _retry_policy.retryable_status_codes:
+        return False, None
+    retry_after = (
+        parse_retry_after(headers.get("Retry-After"))
+        if headers is not None and status in RETRY_AFTER_STATUS_CODES
+        else None
+    )
+    return True, retry_after
+
+
+def get_retry_delay(e: BaseException, retry_number: int) -> float | None:
+    """Return how long to wait before retrying after the exception e, or None if the call shouldn't be retried
+    because the failure isn't transient or retries are used up. retry_number counts retries from 1.
+    Uses up one retry from the process-wide budget if the call should be retried."""
+    should_retry, retry_after_seconds = get_retry_status_and_delay(e)
+    if (
+        not should_retry
+        or retry_number >= _retry_policy.max_attempts
+        or not _retry_budget.try_acquire()
+    ):
+        return None
+    return _retry_policy.get_backoff_seconds(retry_number, retry_after_seconds)
+
+
+def call_with_retries(
+    func: Callable[[], T],
+    description: str,
+    on_retry: Callable[[], None] | None = None,
+) -> T:
+    """Call func, retrying transient failures according to the configured retry policy.
+    Calls on_retry, if given, before each retry.
+    Re-raises the last exception if the failure isn't transient or retries are used up.
+    """
+    retry_number = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            retry_number += 1
+            if (backoff_seconds := get_retry_delay(e, retry_number)) is None:
+                raise
+            log_retry(description, e, backoff_seconds, retry_number)
+            if on_retry is not None:
+                on_retry()
+            time.sleep(backoff_seconds)
+
+
+def log_retry(
+    description: str, e: BaseException, backoff_seconds: float, retry_number: int
+) -> None:
+    LOGGER.debug(
+        f"{description} failed ({e}); retrying in {backoff_seconds:.1f}s "
+        f"(attempt {retry_number + 1} of {_retry_policy.max_attempts})"
+    )
+
+
+class PolicyRetry(Retry):
+    """urllib3 Retry for the Teaspoons api client that follows the configured retry policy:
+    jittered exponential backoff, Retry-After on 429 and 503, and the process-wide retry budget.
+    """
+
+    def increment(self, *args: Any, **kwargs: Any) -> "PolicyRetry":
+        if not _retry_budget.try_acquire():
+            # exhaust this Retry, so that urllib3 raises MaxRetryError
+            return Retry.increment(self.new(total=0), *args, **kwargs)
+        return super().increment(*args, **kwargs)
+
+    def get_backoff_time(self) -> float:
+        # the first retry is immediate in urllib3; count retries from 1 instead
+        return _retry_policy.get_backoff_seconds(len(self.history))
+
+
+def get_api_retries() -> PolicyRetry:
+    """Return the urllib3 retry configuration to use for the Teaspoons api client."""
+    return PolicyRetry(
+        total=_retry_policy.max_attempts - 1,
+        status_forcelist=_retry_policy.retryable_status_codes,
+        respect_retry_after_header=True,
+        # return the last response rather than raising, so that ApiExceptions include the server's message
+        raise_on_status=False,
+    )
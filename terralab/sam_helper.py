@@ -7,12 +7,15 @@ import jwt
 
 from terralab.config import CliConfig
 from terralab.constants import SUPPORT_EMAIL
+from terralab.retry import call_with_retries
+from terralab.tracing import traced
 
 LOGGER = logging.getLogger(__name__)
 
 PROXY_GROUP_ENDPOINT = "/api/google/v1/user/proxyGroup/{email}"
 
 
+@traced()
 def get_user_proxy_group(cli_config: CliConfig, access_token: str) -> str:
     """Get the proxy group email for the logged-in user from Sam.
 
@@ -28,10 +31,14 @@ def get_user_proxy_group(cli_config: CliConfig, access_token: str) -> str:
         url,
         headers={"Authorization": f"Bearer {access_token}"},
     )
-    try:
+
+    def fetch_proxy_group() -> str:
         with urllibrequest.urlopen(req) as response:
             proxy_group: str = response.read().decode("utf-8").strip('"')
             return proxy_group
+
+    try:
+        return call_with_retries(fetch_proxy_group, "Fetching proxy group from Sam")
     except urlliberror.URLError as e:
         LOGGER.debug(f"Failed to retrieve proxy group from Sam: {e}")
         LOGGER.error(
@@ -0,0 +1,217 @@
+# session.py
+
+import contextlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from teaspoons_client import (  # type: ignore[attr-defined]
+    ApiException,
+    AsyncPipelineRunResponseV2,
+    Configuration,
+    JobReport,
+    PipelineRun,
+)
+from urllib3.exceptions import MaxRetryError
+
+from terralab.auth_helper import get_or_refresh_access_token, get_token_expiry
+from terralab.client import RateLimitedApiClient, use_api_client
+from terralab.config import CliConfig, load_config
+from terralab.constants import TERMS_OF_SERVICE_URL
+from terralab.download_layout import DEFAULT_LAYOUT
+from terralab.exceptions import (
+    ApiError,
+    AuthenticationError,
+    ConfigError,
+    InputValidationError,
+    ServiceUnavailableError,
+)
+from terralab.gcs_helper import CloudObjectChecker
+from terralab.logic import pipeline_runs_logic, pipelines_logic
+from terralab.retry import get_api_retries
+from terralab.utils import get_message_from_api_exception, is_valid_gcs_path
+
+LOGGER = logging.getLogger(__name__)
+
+# refresh access tokens this long before they expire
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+# how often to re-read tokens whose expiration can't be determined
+TOKEN_RECHECK_SECONDS = 300
+
+
+class Session:
+    """A reusable connection to Teaspoons for Python programs, as an alternative to running terralab commands.
+
+    A Session loads the config once and keeps one api client (and its connection pool) for all calls,
+    refreshing the access token as needed. The user must have logged in with `terralab login`; a Session
+    never starts a login itself. Methods raise a terralab.exceptions.TerralabError instead of exiting.
+
+    Session methods block, so they must not be called from a running event loop; use
+    terralab.logic.async_pipeline_runs_logic there instead.
+
+        with terralab.Session() as session:
+            job_id = session.submit("my_pipeline", {"input_file": "gs://bucket/file.vcf.gz"}, agree_to_terms=True)
+            session.status(job_id)
+    """
+
+    def __init__(self, config: CliConfig | None = None) -> None:
+        try:
+            self.config = config if config is not None else load_config()
+        except RuntimeError as e:
+            raise ConfigError(str(e)) from e
+        self._token_lock = threading.Lock()
+        self._access_token_recheck_time = 0.0
+        api_config = Configuration()
+        api_config.host = self.config.teaspoons_api_url
+        api_config.retries = get_api_retries()
+        self._api_client = RateLimitedApiClient(configuration=api_config)
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the session's pooled connections."""
+        self._api_client.rest_client.pool_manager.clear()
+
+    def submit(
+        self,
+        pipeline_name: str,
+        inputs: dict[str, Any],
+        version: int | None = None,
+        description: str = "",
+        agree_to_terms: bool = False,
+        cloud_object_checker: CloudObjectChecker | None = None,
+        compress_inputs: bool = False,
+    ) -> str:
+        """Validate inputs, upload any local input files, and start a job. Returns the job id.
+        If a cloud_object_checker is provided, cloud file inputs are also checked before submitting.
+        compress_inputs is as for `terralab submit --compress-inputs`.
+        """
+        if not agree_to_terms:
+            raise InputValidationError(
+                [
+                    f"You must agree to the terms of service ({TERMS_OF_SERVICE_URL}) to run a pipeline."
+                ]
+            )
+        with self._api_context():
+            pipeline_info, errors = pipelines_logic.get_pipeline_info_and_input_errors(
+                pipeline_name, version, inputs, cloud_object_checker
+            )
+            if errors:
+                raise InputValidationError(errors)
+
+            return pipeline_runs_logic.prepare_upload_start_pipeline_run(
+                pipeline_name,
+                version,
+                inputs,
+                description,
+                agree_to_terms,
+                compress_inputs,
+                cloud_object_checker=cloud_object_checker,
+                pipeline_info=pipeline_info,
+            )
+
+    def status(self, job_id: str | uuid.UUID) -> AsyncPipelineRunResponseV2:
+        """Get the status and details of a job."""
+        job_id_uuid = _to_job_uuid(job_id)
+        with self._api_context():
+            return pipeline_runs_logic.get_pipeline_run_status(job_id_uuid)
+
+    def list_jobs(self, num_results: int = 10) -> list[PipelineRun]:
+        """Get the latest num_results jobs the user has submitted (most recent first)."""
+        with self._api_context():
+            return pipeline_runs_logic.get_pipeline_runs(num_results)
+
+    def download(
+        self,
+        job_id: str | uuid.UUID,
+        local_destination: str = ".",
+        output_names: Iterable[str] = (),
+        include_patterns: Iterable[str] = (),
+        exclude_patterns: Iterable[str] = (),
+        layout: str = DEFAULT_LAYOUT,
+    ) -> list[str]:
+        """Download a job's output files, as `terralab download` does: all of them unless outputs are selected
+        by name (output_names) or glob pattern (include_patterns, exclude_patterns), saved where layout says.
+        Raises an InputValidationError before downloading anything if the selection or layout is invalid or
+        there isn't enough disk space. Returns the local file paths of the downloaded files.
+        """
+        job_id_uuid = _to_job_uuid(job_id)
+        if not os.path.isdir(local_destination):
+            raise InputValidationError(
+                [f"Error: '{local_destination}' is not a directory."]
+            )
+        with self._api_context():
+            return pipeline_runs_logic.download_pipeline_run_outputs(
+                job_id_uuid,
+                local_destination,
+                tuple(output_names),
+                tuple(include_patterns),
+                tuple(exclude_patterns),
+                layout,
+            )
+
+    def deliver(self, job_id: str | uuid.UUID, destination: str) -> JobReport:
+        """Start delivering a job's output files to a GCS destination. Returns the delivery's JobReport."""
+        job_id_uuid = _to_job_uuid(job_id)
+        if not is_valid_gcs_path(destination):
+            raise InputValidationError(
+                [f"Error: '{destination}' is not a valid GCS path."]
+            )
+        with self._api_context():
+            return pipeline_runs_logic.deliver_pipeline_run_to_cloud(
+                job_id_uuid, destination
+            )
+
+    @contextlib.contextmanager
+    def _api_context(self) -> Iterator[None]:
+        """Route logic functions' API calls through this session's client, and convert API errors
+        to TerralabErrors."""
+        self._refresh_access_token()
+        with use_api_client(self._api_client):
+            try:
+                yield
+            except ApiException as e:
+                raise _to_api_error(e) from e
+            except MaxRetryError as e:
+                raise ServiceUnavailableError(
+                    "Unable to connect to the server after multiple retries."
+                ) from e
+
+    def _refresh_access_token(self) -> None:
+        with self._token_lock:
+            if time.time() < self._access_token_recheck_time:
+                return
+            access_token = get_or_refresh_access_token(
+                self.config, interactive_login=False
+            )
+            self._api_client.configuration.access_token = access_token
+            if (expiry := get_token_expiry(access_token)) is not None:
+                self._access_token_recheck_time = expiry - TOKEN_EXPIRY_MARGIN_SECONDS
+            else:
+                self._access_token_recheck_time = time.time() + TOKEN_RECHECK_SECONDS
+
+
+def _to_job_uuid(job_id: str | uuid.UUID) -> uuid.UUID:
+    try:
+        return job_id if isinstance(job_id, uuid.UUID) else uuid.UUID(job_id)
+    except (TypeError, ValueError) as e:
+        raise InputValidationError(["Error: JOB_ID must be a valid uuid."]) from e
+
+
+def _to_api_error(e: ApiException) -> ApiError:
+    message = get_message_from_api_exception(e)
+    reason = f" ({e.reason})" if e.reason else ""
+    formatted_message = f"API call failed with status code {e.status}{reason}" + (
+        f": {message}" if message else ""
+    )
+    if e.status == 401:
+        return AuthenticationError(e.status, formatted_message)
+    return ApiError(e.status, formatted_message)
@@ -0,0 +1,255 @@
+# stream_download.py
+
+"""
+Streaming a signed URL download to a pipe (stdout or a named pipe) instead of a local file, so that an output can
+be read straight into a downstream tool (e.g. `samtools` or `bcftools`) without being written to disk first.
+
+The file is fetched in STREAM_CHUNK_SIZE Range requests, several at a time, and the chunks are written to the pipe
+in order, so that the pipe is kept full even when a single connection can't keep up with the reader. Each chunk is
+retried on its own if its request fails. Servers that don't support Range requests are read over one connection.
+"""
+
+import concurrent.futures
+import contextlib
+import errno
+import functools
+import logging
+import os
+import re
+import stat
+from collections import deque
+from collections.abc import Iterator
+from typing import BinaryIO
+
+import requests
+from tqdm import tqdm
+
+from terralab.bandwidth import throttle
+from terralab.download_layout import get_file_name_from_signed_url
+from terralab.retry import call_with_retries
+from terralab.tracing import traced
+from terralab.transfer_session import get_transfer_session
+from terralab.transfer_stats import DOWNLOAD, TransferRecord, get_transfer_stats
+
+LOGGER = logging.getLogger(__name__)
+
+# bytes per Range request; large enough that per-request latency is small next to the transfer time
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+# chunks fetched ahead of the one being written; at most (1 + this) chunks are held in memory
+DEFAULT_STREAM_READ_AHEAD = 4
+STREAM_BLOCK_SIZE = 1024 * 1024
+# the largest pipe buffer an unprivileged process can ask for by default on Linux (/proc/sys/fs/pipe-max-size)
+PIPE_BUFFER_SIZE = 1024 * 1024
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+STDOUT_FD = 1
+
+
+class RangesNotSupportedError(Exception):
+    """The server sent a whole file in response to a Range request"""
+
+
+@traced()
+def stream_signed_url(
+    signed_url: str,
+    out_file: BinaryIO,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    read_ahead: int = DEFAULT_STREAM_READ_AHEAD,
+) -> int:
+    """Write the file at signed_url to out_file, fetching up to read_ahead chunks of chunk_size bytes in parallel.
+    Returns the number of bytes written. Raises an exception (BrokenPipeError if the reader of a pipe went away)
+    if the download fails."""
+    file_name = get_file_name_from_signed_url(signed_url)
+    transfer_stats = get_transfer_stats()
+    transfer_record = transfer_stats.start_transfer(DOWNLOAD, file_name)
+    try:
+        with tqdm(
+            unit="B",
+            unit_scale=True,
+            desc=f"Streaming {file_name}",
+            leave=False,
+            dynamic_ncols=True,
+        ) as progress_bar:
+            bytes_written = 0
+            for data in _iter_chunks(
+                signed_url, file_name, transfer_record, chunk_size, read_ahead
+            ):
+                if progress_bar.total is None and transfer_record.size_bytes:
+                    progress_bar.reset(total=transfer_record.size_bytes)
+                transfer_record.add_bytes(len(data))
+                out_file.write(data)
+                bytes_written += len(data)
+                progress_bar.update(len(data))
+            out_file.flush()
+    except BaseException:
+        transfer_stats.finish_transfer(transfer_record, succeeded=False)
+        raise
+    transfer_stats.finish_transfer(transfer_record, succeeded=True)
+    return bytes_written
+
+
+def _iter_chunks(
+    signed_url: str,
+    file_name: str,
+    transfer_record: TransferRecord,
+    chunk_size: int,
+    read_ahead: int,
+) -> Iterator[bytes]:
+    """Yield the file's contents in order, in chunks of up to chunk_size bytes."""
+    try:
+        first_chunk, total_size_bytes = call_with_retries(
+            lambda: _get_chunk(signed_url, 0, chunk_size),
+            f"Downloading {file_name}",
+            on_retry=transfer_record.add_retry,
+        )
+    except RangesNotSupportedError:
+        yield from _iter_whole_file(signed_url, file_name, transfer_record)
+        return
+
+    transfer_record.size_bytes = total_size_bytes
+    yield first_chunk
+
+    offsets = iter(range(len(first_chunk), total_size_bytes, chunk_size))
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=read_ahead, thread_name_prefix="terralab-stream"
+    ) as executor:
+        pending: deque[concurrent.futures.Future[tuple[bytes, int]]] = deque()
+        try:
+            while True:
+                while (
+                    len(pending) < read_ahead
+                    and (offset := next(offsets, None)) is not None
+                ):
+                    pending.append(
+                        executor.submit(
+                            call_with_retries,
+                            functools.partial(
+                                _get_chunk, signed_url, offset, chunk_size
+                            ),
+                            f"Downloading {file_name} from byte {offset}",
+                            transfer_record.add_retry,
+                        )
+                    )
+                if not pending:
+                    return
+                yield pending.popleft().result()[0]
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _get_chunk(signed_url: str, start_byte: int, chunk_size: int) -> tuple[bytes, int]:
+    """Fetch up to chunk_size bytes of the file starting at start_byte.
+    Returns the data and the total size of the file."""
+    end_byte = start_byte + chunk_size - 1
+    with get_transfer_session().get(
+        signed_url, stream=True, headers={"Range": f"bytes={start_byte}-{end_byte}"}
+    ) as response:
+        if (
+            response.status_code == requests.codes.range_not_satisfiable
+            and start_byte == 0
+        ):
+            # an empty file
+            return b"", 0
+        response.raise_for_status()
+        if response.status_code != requests.codes.partial_content:
+            raise RangesNotSupportedError(
+                f"Expected a partial response, got {response.status_code}"
+            )
+        content_range = CONTENT_RANGE_PATTERN.match(
+            response.headers.get("Content-Range", "")
+        )
+        if content_range is None or int(content_range[1]) != start_byte:
+            raise ValueError(
+                f"Unexpected Content-Range '{response.headers.get('Content-Range')}' "
+                f"for a request from byte {start_byte}"
+            )
+
+        data = bytearray()
+        for block in response.iter_content(STREAM_BLOCK_SIZE):
+            throttle(len(block))
+            data += block
+        return bytes(data), int(content_range[3])
+
+
+def _iter_whole_file(
+    signed_url: str, file_name: str, transfer_record: TransferRecord
+) -> Iterator[bytes]:
+    """Yield the file's contents over a single connection, for servers that don't support Range requests.
+    The download can't be resumed from where it stopped, so it's only retried if nothing was written yet.
+    """
+    response = call_with_retries(
+        lambda: _get_whole_file(signed_url),
+        f"Downloading {file_name}",
+        on_retry=transfer_record.add_retry,
+    )
+    with response:
+        transfer_record.size_bytes = int(response.headers.get("content-length", 0))
+        for block in response.iter_content(STREAM_BLOCK_SIZE):
+            throttle(len(block))
+            yield block
+
+
+def _get_whole_file(signed_url: str) -> requests.Response:
+    response = get_transfer_session().get(signed_url, stream=True)
+    response.raise_for_status()
+    return response
+
+
+def enlarge_pipe_buffer(fd: int) -> None:
+    """Ask for a PIPE_BUFFER_SIZE buffer if fd is a pipe, so that the reader can keep reading while the next
+    chunk is written. Does nothing where this isn't supported (it's Linux only)."""
+    try:
+        import fcntl  # not available on Windows
+    except ImportError:
+        return
+    set_pipe_size = getattr(fcntl, "F_SETPIPE_SZ", None)
+    if set_pipe_size is None or not stat.S_ISFIFO(os.fstat(fd).st_mode):
+        return
+    try:
+        fcntl.fcntl(fd, set_pipe_size, PIPE_BUFFER_SIZE)
+    except OSError as e:
+        LOGGER.debug(f"Unable to enlarge pipe buffer: {e}")
+
+
+@contextlib.contextmanager
+def open_stdout() -> Iterator[BinaryIO]:
+    """Open stdout for writing binary data. This is separate from sys.stdout, so that data left unwritten
+    when the reader goes away isn't flushed (and doesn't fail again) when terralab exits.
+    """
+    with _open_pipe_writer(os.dup(STDOUT_FD)) as stdout:
+        yield stdout
+
+
+@contextlib.contextmanager
+def open_named_pipe(pipe_path: str) -> Iterator[BinaryIO]:
+    """Open a named pipe for writing, creating it if it doesn't exist (and removing it when done, if so).
+    Waits until a reader opens the pipe."""
+    created = False
+    try:
+        os.mkfifo(pipe_path)
+        created = True
+    except FileExistsError:
+        if not stat.S_ISFIFO(os.stat(pipe_path).st_mode):
+            raise OSError(errno.EEXIST, f"'{pipe_path}' exists and isn't a named pipe")
+    try:
+        LOGGER.info(f"Waiting for a reader to open named pipe '{pipe_path}'")
+        with _open_pipe_writer(os.open(pipe_path, os.O_WRONLY)) as pipe:
+            yield pipe
+    finally:
+        if created:
+            with contextlib.suppress(OSError):
+                os.remove(pipe_path)
+
+
+@contextlib.contextmanager
+def _open_pipe_writer(fd: int) -> Iterator[BinaryIO]:
+    """Wrap a pipe's file descriptor, which is closed when done, in a buffered binary file.
+    Data left unwritten because the reader went away is dropped, rather than failing again on close.
+    """
+    enlarge_pipe_buffer(fd)
+    pipe = os.fdopen(fd, "wb", buffering=PIPE_BUFFER_SIZE)
+    try:
+        yield pipe
+    finally:
+        with contextlib.suppress(BrokenPipeError):
+            pipe.close()
@@ -0,0 +1,251 @@
+# tracing.py
+
+"""
+Opt-in tracing of where terralab spends its time: commands, config loading, authentication, logic functions,
+API calls, and file transfers are recorded as nested spans and written to a file, in Chrome trace format
+(viewable at chrome://tracing or https://ui.perfetto.dev) or as OTLP JSON.
+
+Tracing is off unless enabled with the --trace-file option (or enable_tracing(), from Python), and
+traced functions then only cost a check of whether tracing is enabled.
+"""
+
+import contextlib
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, TypeVar, cast
+
+from terralab import __version__
+
+CHROME_FORMAT = "chrome"
+OTLP_FORMAT = "otlp"
+TRACE_FORMATS = [CHROME_FORMAT, OTLP_FORMAT]
+
+SERVICE_NAME = "terralab"
+# OTLP span kind and status codes
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_UNSET = 0
+STATUS_CODE_ERROR = 2
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    """A timed operation. Times are nanoseconds since the epoch."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: int | None = None
+    thread_id: int = field(default_factory=threading.get_ident)
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Tracer:
+    """Collects the spans finished in this process, from any thread"""
+
+    def __init__(self) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, parent: Span | None) -> Span:
+        return Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent is not None else None,
+        )
+
+    def finish_span(self, span: Span) -> None:
+        span.end_time_ns = time.time_ns()
+        with self._lock:
+            self.spans.append(span)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Return the spans as complete ("X") events in the Chrome trace event format."""
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "cat": SERVICE_NAME,
+                    "ph": "X",
+                    "ts": span.start_time_ns / 1000,
+                    "dur": (
+                        (span.end_time_ns or span.start_time_ns) - span.start_time_ns
+                    )
+                    / 1000,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": span.attributes
+                    | ({"error": span.error} if span.error else {}),
+                }
+                for span in spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Return the spans as an OTLP/JSON ExportTraceServiceRequest."""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _to_otlp_attributes(
+                            {
+                                "service.name": SERVICE_NAME,
+                                "service.version": __version__,
+                                "process.pid": os.getpid(),
+                            }
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SERVICE_NAME, "version": __version__},
+                            "spans": [_to_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def write(self, path: str, trace_format: str = CHROME_FORMAT) -> None:
+        trace = (
+            self.to_otlp() if trace_format == OTLP_FORMAT else self.to_chrome_trace()
+        )
+        with open(path, "w") as trace_file:
+            json.dump(trace, trace_file, default=str)
+
+
+def _to_otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    def to_value(value: Any) -> dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            # OTLP JSON encodes 64 bit integers as strings
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    return [{"key": key, "value": to_value(value)} for key, value in attributes.items()]
+
+
+def _to_otlp_span(span: Span) -> dict[str, Any]:
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns or span.start_time_ns),
+        "attributes": _to_otlp_attributes(span.attributes),
+        "status": (
+            {"code": STATUS_CODE_ERROR, "message": span.error}
+            if span.error
+            else {"code": STATUS_CODE_UNSET}
+        ),
+    }
+    if span.parent_span_id is not None:
+        otlp_span["parentSpanId"] = span.parent_span_id
+    return otlp_span
+
+
+_tracer: Tracer | None = None
+# the innermost span in progress in this thread or task; copied to threads started with asyncio.to_thread or utils.run_in_executor
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def enable_tracing() -> Tracer:
+    """Start recording spans in this process, returning the Tracer that collects them."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def disable_tracing() -> None:
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Record the enclosed code as a span, nested in the current span, if tracing is enabled.
+    Yields the Span (or None if tracing is disabled) so that attributes can be added to it.
+    """
+    if (tracer := _tracer) is None:
+        yield None
+        return
+    current = tracer.start_span(name, _current_span.get())
+    current.attributes.update(attributes)
+    reset_token = _current_span.set(current)
+    try:
+        yield current
+    except GeneratorExit:
+        raise
+    except SystemExit as e:
+        if e.code:  # commands exit(1) on errors
+            current.error = f"exit({e.code})"
+        raise
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(reset_token)
+        tracer.finish_span(current)
+
+
+def traced(name: str | None = None) -> Callable[[F], F]:
+    """Decorator to record each call of a function (or coroutine function) as a span,
+    named by default after the function's module and name."""
+
+    def decorator(func: F) -> F:
+        span_name = (
+            name or f"{func.__module__.removeprefix('terralab.')}.{func.__name__}"
+        )
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if _tracer is None:
+                    return await func(*args, **kwargs)
+                with span(span_name):
+                    return await func(*args, **kwargs)
+
+            return cast(F, async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return cast(F, wrapper)
+
+    return decorator
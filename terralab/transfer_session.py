@@ -0,0 +1,123 @@
+# transfer_session.py
+
+"""
+The HTTP session used for signed URL uploads and downloads.
+
+All transfers in a process share one requests.Session, whose connection pool keeps connections to each signed
+URL host open between files. Transferring many small files then costs one DNS lookup, TCP connection and TLS
+handshake per pooled connection instead of per file.
+
+Connections can also be opened ahead of the transfers that will use them (see warm_up_connections), while the
+Teaspoons call that returns the signed URLs is still in flight. The number of connections opened ahead is set
+with the TERRALAB_WARM_CONNECTIONS environment variable (0 turns this off).
+"""
+
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from terralab.constants import GCS_API_HOST
+
+LOGGER = logging.getLogger(__name__)
+
+WARM_CONNECTIONS_ENV_VAR = "TERRALAB_WARM_CONNECTIONS"
+DEFAULT_WARM_CONNECTIONS = 4
+# connections kept open per host; enough for the most concurrent transfers plus streaming read-ahead
+POOL_MAXSIZE = 32
+# signed URL hosts with a connection pool at once
+POOL_CONNECTIONS = 8
+WARM_UP_TIMEOUT_SECONDS = 10
+GCS_API_URL = f"https://{GCS_API_HOST}/"
+
+_transfer_session: requests.Session | None = None
+_transfer_session_lock = threading.Lock()
+
+
+def get_transfer_session() -> requests.Session:
+    """Return the process's session for signed URL requests, creating it the first time."""
+    global _transfer_session
+    with _transfer_session_lock:
+        if _transfer_session is None:
+            _transfer_session = requests.Session()
+            # requests are retried by terralab.retry, which knows which transfers can be resumed
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=0,
+            )
+            _transfer_session.mount("https://", adapter)
+            _transfer_session.mount("http://", adapter)
+        return _transfer_session
+
+
+def get_warm_connection_count() -> int:
+    """Return how many connections to open ahead of transfers, as set by TERRALAB_WARM_CONNECTIONS."""
+    warm_connections = os.environ.get(WARM_CONNECTIONS_ENV_VAR)
+    if warm_connections is None:
+        return DEFAULT_WARM_CONNECTIONS
+    try:
+        return min(max(int(warm_connections), 0), POOL_MAXSIZE)
+    except ValueError:
+        LOGGER.warning(
+            f"Ignoring {WARM_CONNECTIONS_ENV_VAR}={warm_connections}: expected a number of connections"
+        )
+        return DEFAULT_WARM_CONNECTIONS
+
+
+def warm_up_connections(url: str = GCS_API_URL, count: int | None = None) -> int:
+    """Open count connections (by default, TERRALAB_WARM_CONNECTIONS) to the host of url and leave them in the
+    transfer session's pool, for transfers that are about to start. Returns the number of connections opened.
+    Failures are only logged: the transfers will open their own connections."""
+    count = get_warm_connection_count() if count is None else count
+    if count <= 0:
+        return 0
+    split_url = urlsplit(url)
+    host_url = f"{split_url.scheme}://{split_url.netloc}/"
+    session = get_transfer_session()
+
+    opened_connections: list[bool] = []
+
+    def open_connection() -> None:
+        try:
+            session.head(
+                host_url, timeout=WARM_UP_TIMEOUT_SECONDS, allow_redirects=False
+            ).close()
+            opened_connections.append(True)
+        except requests.RequestException as e:
+            LOGGER.debug(f"Couldn't open a connection to {host_url}: {e}")
+
+    # requests in flight at the same time each take their own connection from the pool.
+    # the threads are daemons (unlike a ThreadPoolExecutor's), so a slow host can't hold up the process's exit
+    threads = [
+        threading.Thread(
+            target=open_connection, name=f"terralab-warm-up-{i}", daemon=True
+        )
+        for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    n_opened = len(opened_connections)
+    LOGGER.debug(f"Opened {n_opened} connection(s) to {host_url}")
+    return n_opened
+
+
+def warm_up_connections_in_background(
+    url: str = GCS_API_URL, count: int | None = None
+) -> threading.Thread:
+    """Start warm_up_connections in a background thread, returning the thread.
+    All of its threads are daemon threads, so the process doesn't wait for them to finish before exiting.
+    """
+    thread = threading.Thread(
+        target=warm_up_connections,
+        args=(url, count),
+        name="terralab-warm-up",
+        daemon=True,
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,220 @@
+# transfer_stats.py
+
+"""
+Metrics for signed URL uploads and downloads: per-file bytes, timings, and retries, and aggregate throughput,
+reported with the --stats and --stats-file options.
+"""
+
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+UPLOAD = "upload"
+DOWNLOAD = "download"
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class TransferRecord:
+    """Metrics for a single file transfer. Times are from time.monotonic()."""
+
+    direction: str
+    file_name: str
+    size_bytes: int | None = None
+    bytes_transferred: int = 0
+    retries: int = 0
+    # number of transfers in progress (including this one) when it started
+    concurrency: int = 1
+    started_at: float = field(default_factory=time.monotonic)
+    first_byte_at: float | None = None
+    finished_at: float | None = None
+    succeeded: bool | None = None
+
+    def add_bytes(self, n_bytes: int) -> None:
+        if self.first_byte_at is None and n_bytes:
+            self.first_byte_at = time.monotonic()
+        self.bytes_transferred += n_bytes
+
+    def add_retry(self) -> None:
+        self.retries += 1
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def time_to_first_byte_seconds(self) -> float | None:
+        return (
+            self.first_byte_at - self.started_at
+            if self.first_byte_at is not None
+            else None
+        )
+
+    @property
+    def throughput_bytes_per_second(self) -> float | None:
+        return self.bytes_transferred / self.wall_seconds if self.wall_seconds else None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "direction": self.direction,
+            "fileName": self.file_name,
+            "sizeBytes": self.size_bytes,
+            "bytesTransferred": self.bytes_transferred,
+            "wallSeconds": self.wall_seconds,
+            "timeToFirstByteSeconds": self.time_to_first_byte_seconds,
+            "throughputBytesPerSecond": self.throughput_bytes_per_second,
+            "retries": self.retries,
+            "concurrency": self.concurrency,
+            "succeeded": self.succeeded,
+        }
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """Return the nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class TransferStats:
+    """Thread-safe collection of TransferRecords for all transfers in the process"""
+
+    def __init__(self) -> None:
+        self.records: list[TransferRecord] = []
+        self._active_transfers = 0
+        self._lock = threading.Lock()
+
+    def start_transfer(
+        self, direction: str, file_name: str, size_bytes: int | None = None
+    ) -> TransferRecord:
+        with self._lock:
+            self._active_transfers += 1
+            record = TransferRecord(
+                direction,
+                file_name,
+                size_bytes=size_bytes,
+                concurrency=self._active_transfers,
+            )
+            self.records.append(record)
+        return record
+
+    def finish_transfer(self, record: TransferRecord, succeeded: bool) -> None:
+        with self._lock:
+            if record.finished_at is None:
+                self._active_transfers -= 1
+            record.finished_at = time.monotonic()
+            record.succeeded = succeeded
+
+    def summarize(self, direction: str) -> dict[str, Any] | None:
+        """Return aggregate metrics for transfers in the given direction, or None if there were none."""
+        with self._lock:
+            records = [
+                record for record in self.records if record.direction == direction
+            ]
+            peak_concurrency = max(
+                (record.concurrency for record in records), default=0
+            )
+        if not records:
+            return None
+
+        wall_seconds = max(
+            record.finished_at or time.monotonic() for record in records
+        ) - min(record.started_at for record in records)
+        total_bytes = sum(record.bytes_transferred for record in records)
+        throughputs = [
+            throughput
+            for record in records
+            if (throughput := record.throughput_bytes_per_second) is not None
+        ]
+        times_to_first_byte = [
+            ttfb
+            for record in records
+            if (ttfb := record.time_to_first_byte_seconds) is not None
+        ]
+        return {
+            "files": len(records),
+            "failedFiles": sum(1 for record in records if not record.succeeded),
+            "bytesTransferred": total_bytes,
+            "wallSeconds": wall_seconds,
+            "throughputBytesPerSecond": (
+                total_bytes / wall_seconds if wall_seconds else None
+            ),
+            "fileThroughputBytesPerSecond": {
+                f"p{percent}": percentile(throughputs, percent)
+                for percent in PERCENTILES
+            },
+            "timeToFirstByteSeconds": {
+                f"p{percent}": percentile(times_to_first_byte, percent)
+                for percent in PERCENTILES
+            },
+            "retries": sum(record.retries for record in records),
+            "peakConcurrency": peak_concurrency,
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+        return {
+            "uploads": self.summarize(UPLOAD),
+            "downloads": self.summarize(DOWNLOAD),
+            "files": [record.to_dict() for record in records],
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as stats_file:
+            json.dump(self.to_dict(), stats_file, indent=2)
+
+    def format_summary_lines(self) -> list[str]:
+        """Return a human-readable summary of uploads and downloads."""
+        # imported here since utils records transfer stats
+        from terralab.utils import convert_file_size_to_human_readable as format_size
+
+        def format_rate(bytes_per_second: float | None) -> str:
+            return (
+                f"{format_size(int(bytes_per_second))}/s"
+                if bytes_per_second is not None
+                else "n/a"
+            )
+
+        def format_seconds(seconds: float | None) -> str:
+            return f"{seconds:.2f}s" if seconds is not None else "n/a"
+
+        lines = []
+        for direction, verb in ((UPLOAD, "Uploaded"), (DOWNLOAD, "Downloaded")):
+            if (summary := self.summarize(direction)) is None:
+                continue
+            failed = (
+                f", {summary['failedFiles']} failed" if summary["failedFiles"] else ""
+            )
+            file_throughput = summary["fileThroughputBytesPerSecond"]
+            ttfb = summary["timeToFirstByteSeconds"]
+            lines.extend(
+                [
+                    f"{verb} {summary['files']} file{'' if summary['files'] == 1 else 's'}{failed}: "
+                    f"{format_size(summary['bytesTransferred'])} in {format_seconds(summary['wallSeconds'])} "
+                    f"({format_rate(summary['throughputBytesPerSecond'])} overall)",
+                    "  Per-file throughput: "
+                    + ", ".join(
+                        f"{p} {format_rate(value)}"
+                        for p, value in file_throughput.items()
+                    ),
+                    "  Time to first byte: "
+                    + ", ".join(
+                        f"{p} {format_seconds(value)}" for p, value in ttfb.items()
+                    ),
+                    f"  Retries: {summary['retries']}, peak concurrency: {summary['peakConcurrency']}",
+                ]
+            )
+        return lines or ["No files were transferred"]
+
+
+_transfer_stats = TransferStats()
+
+
+def get_transfer_stats() -> TransferStats:
+    return _transfer_stats
@@ -0,0 +1,197 @@
+# upload_index.py
+
+"""
+A local index of files uploaded as job inputs, so that a file used for many jobs (e.g. a reference panel or
+a cohort rerun) can be referenced by its earlier upload's cloud path instead of being uploaded again.
+
+Entries are keyed by the file's device, inode, size, and modification time, so finding a file is a single
+stat, and confirmed with a fingerprint hash of the file's size and samples of its contents, which catches
+files modified in place without a change to their modification time.
+
+Each index is scoped to a user and Teaspoons environment, so that one user's uploads are never passed as
+another's inputs, and entries expire after UPLOAD_MAX_AGE_SECONDS, since uploaded inputs aren't kept forever.
+An entry only says that a file was uploaded; callers should check that the upload still exists before
+reusing it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from terralab.config import load_config
+
+LOGGER = logging.getLogger(__name__)
+
+UPLOAD_INDEX_VERSION = 2
+# the fingerprint hashes this much of the start, middle, and end of a file
+FINGERPRINT_SAMPLE_SIZE = 1024 * 1024
+# earlier uploads older than this aren't reused
+UPLOAD_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+# variant of an upload, for files compressed while uploading
+COMPRESSED_VARIANT = "bgzf"
+
+
+@dataclass(frozen=True)
+class FileIdentity:
+    """Identifies a local file's current contents, as cheaply as possible"""
+
+    device: int
+    inode: int
+    size_bytes: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, local_file_path: str) -> "FileIdentity":
+        stat = os.stat(local_file_path)
+        return cls(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def get_key(self, variant: str | None = None) -> str:
+        key = f"{self.device}:{self.inode}:{self.size_bytes}:{self.mtime_ns}"
+        return f"{key}:{variant}" if variant else key
+
+
+def fingerprint_file(local_file_path: str) -> str:
+    """Return a hash of a file's size and its first, middle, and last FINGERPRINT_SAMPLE_SIZE bytes."""
+    fingerprint = hashlib.blake2b(digest_size=16)
+    with open(local_file_path, "rb") as local_file:
+        size_bytes = os.fstat(local_file.fileno()).st_size
+        fingerprint.update(str(size_bytes).encode())
+        for offset in sorted(
+            {
+                0,
+                max(0, size_bytes // 2 - FINGERPRINT_SAMPLE_SIZE // 2),
+                max(0, size_bytes - FINGERPRINT_SAMPLE_SIZE),
+            }
+        ):
+            local_file.seek(offset)
+            fingerprint.update(local_file.read(FINGERPRINT_SAMPLE_SIZE))
+    return fingerprint.hexdigest()
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    """A local file's identity and fingerprint, taken ahead of recording its upload"""
+
+    identity: FileIdentity
+    fingerprint: str
+
+    @classmethod
+    def from_path(cls, local_file_path: str) -> "FileFingerprint":
+        return cls(
+            FileIdentity.from_path(local_file_path), fingerprint_file(local_file_path)
+        )
+
+
+class UploadIndex:
+    """The index of earlier uploads made in scope (e.g. by a user against a Teaspoons environment),
+    stored as JSON in index_file. The file can hold the uploads of several scopes."""
+
+    def __init__(
+        self,
+        index_file: str,
+        scope: str = "",
+        max_age_seconds: float = UPLOAD_MAX_AGE_SECONDS,
+    ) -> None:
+        self.index_file = index_file
+        self.scope = scope
+        self.max_age_seconds = max_age_seconds
+        self._entries: dict[str, dict[str, Any]] | None = None
+        self._lock = threading.Lock()
+
+    def find(self, local_file_path: str, variant: str | None = None) -> str | None:
+        """Return the cloud path of an earlier, unexpired upload of the file's current contents in this scope,
+        if there was one."""
+        key = self._get_key(FileIdentity.from_path(local_file_path), variant)
+        with self._lock:
+            entry = self._get_entries().get(key)
+        if (
+            entry is None
+            or self._is_expired(entry)
+            or entry["fingerprint"] != fingerprint_file(local_file_path)
+        ):
+            return None
+        return str(entry["cloudPath"])
+
+    def record(
+        self,
+        local_file_path: str,
+        cloud_path: str,
+        variant: str | None = None,
+        file_fingerprint: FileFingerprint | None = None,
+    ) -> None:
+        """Record that the file's current contents were uploaded to cloud_path, and save the index.
+        file_fingerprint, if given, is the file's fingerprint taken earlier (e.g. while it was uploading),
+        which is used if the file hasn't changed since."""
+        identity = FileIdentity.from_path(local_file_path)
+        if file_fingerprint is None or file_fingerprint.identity != identity:
+            file_fingerprint = FileFingerprint.from_path(local_file_path)
+        key = self._get_key(file_fingerprint.identity, variant)
+        entry = {
+            "path": os.path.abspath(local_file_path),
+            "fingerprint": file_fingerprint.fingerprint,
+            "cloudPath": cloud_path,
+            "uploadedAt": time.time(),
+        }
+        with self._lock:
+            # re-read the index, in case another terralab process has added to it, and drop expired entries
+            self._entries = None
+            self._entries = {
+                other_key: other_entry
+                for other_key, other_entry in self._get_entries().items()
+                if not self._is_expired(other_entry)
+            }
+            self._entries[key] = entry
+            self._save()
+
+    def _get_key(self, identity: FileIdentity, variant: str | None) -> str:
+        return f"{self.scope} {identity.get_key(variant)}"
+
+    def _is_expired(self, entry: dict[str, Any]) -> bool:
+        return bool(time.time() - entry["uploadedAt"] > self.max_age_seconds)
+
+    def _get_entries(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.index_file) as index_file:
+                index = json.load(index_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            LOGGER.debug(f"Ignoring unreadable upload index {self.index_file}: {e}")
+            return {}
+        if index.get("version") != UPLOAD_INDEX_VERSION:
+            return {}
+        return dict(index.get("entries", {}))
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+        # write a temporary file and rename it, so that readers never see a partly written index
+        temp_file = f"{self.index_file}.{os.getpid()}.tmp"
+        try:
+            with open(temp_file, "w") as index_file:
+                json.dump(
+                    {"version": UPLOAD_INDEX_VERSION, "entries": self._entries},
+                    index_file,
+                )
+            os.replace(temp_file, self.index_file)
+        except OSError as e:
+            LOGGER.debug(f"Failed to write upload index {self.index_file}: {e}")
+
+
+_upload_indexes: dict[str, UploadIndex] = {}
+
+
+def get_upload_index(scope: str) -> UploadIndex:
+    """Return the index of uploads made in scope (see pipeline_runs_logic.get_upload_scope)."""
+    if scope not in _upload_indexes:
+        _upload_indexes[scope] = UploadIndex(load_config().upload_index_file, scope)
+    return _upload_indexes[scope]
@@ -1,14 +1,25 @@
 # utils.py
 
+import asyncio
+import contextlib
+import contextvars
 import datetime
+import errno
 import json
 import logging
 import math
+import mmap
 import os
+import shutil
+import stat
+import sys
+import threading
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
-from functools import wraps
-from typing import Any
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial, wraps
+from typing import Any, BinaryIO, TypeVar
 
 import requests
 import tzlocal
@@ -17,15 +28,34 @@ from tqdm import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
 from urllib3.exceptions import MaxRetryError
 
+from terralab.bandwidth import throttle
+from terralab.compression import iter_bgzf_compressed
+from terralab.exceptions import TransferError
+from terralab.download_layout import (
+    find_path_collisions,
+    get_download_path,
+    get_file_name_from_signed_url,
+)
 from terralab.constants import (
     MAX_FILE_UPLOAD_SIZE_BYTES,
     SUPPORT_EMAIL_TEXT,
     GCS_PREFIX,
 )
 from terralab.log import add_blankline_before
+from terralab.retry import call_with_retries, get_retry_delay, log_retry
+from terralab.tracing import traced
+from terralab.transfer_session import get_transfer_session
+from terralab.transfer_stats import (
+    DOWNLOAD,
+    UPLOAD,
+    TransferRecord,
+    get_transfer_stats,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 def handle_api_exceptions(func: Any) -> Any:
     @wraps(func)
@@ -94,6 +124,10 @@ def process_inputs_to_dict(
     - '--key=value'
     - '--flag' (value will be None)
 
+    Array values can be passed comma-separated ('--key v1,v2') or, for long lists, read
+    one value per line from a file ('--key=@values.txt') or from stdin ('--key=@-').
+    A value that starts with '@' is passed by doubling the '@' ('--key=@@value').
+
     Args:
         inputs: Tuple of string arguments, generated by Click
 
@@ -105,6 +139,7 @@ def process_inputs_to_dict(
     """
     inputs_dict: dict[str, str | list[str] | None] = {}
     i = 0
+    stdin_key: str | None = None
 
     # parser keys
     INPUT_PREFIX = "--"
@@ -121,31 +156,61 @@ def process_inputs_to_dict(
         # strip leading dashes
         arg_without_dashes = current_arg[2:]
 
+        raw_value: str | None
         if ALTERNATE_INPUT_DELIMITER in arg_without_dashes:
             # Handle --key=value format
             key, raw_value = arg_without_dashes.split(ALTERNATE_INPUT_DELIMITER, 1)
-            value = process_value(raw_value)
         else:
             # Handle --key value or --flag format
             key = arg_without_dashes
             if i + 1 < len(inputs) and not inputs[i + 1].startswith(INPUT_PREFIX):
-                value = process_value(inputs[i + 1])
+                raw_value = inputs[i + 1]
                 i += 1
             else:
-                value = None
+                raw_value = None
 
         if key in inputs_dict:
             raise ValueError(f"Error: Duplicate input key found: '{key}'.")
 
-        LOGGER.debug(f"Processed input: {key}={value}")
+        # stdin can only be consumed once, so check before reading any values from it
+        if raw_value == f"{VALUES_FILE_PREFIX}{STDIN_VALUES_FILE}":
+            if stdin_key is not None:
+                raise ValueError(
+                    f"Error: Only one input can be read from stdin; found '{stdin_key}' and '{key}'."
+                )
+            stdin_key = key
+
+        value = process_value(raw_value) if raw_value is not None else None
+
+        if isinstance(value, list) and len(value) > MAX_LOGGED_ARRAY_VALUES:
+            LOGGER.debug(f"Processed input: {key}=<{len(value)} values>")
+        else:
+            LOGGER.debug(f"Processed input: {key}={value}")
         inputs_dict[key] = value
         i += 1
 
     return inputs_dict
 
 
+# prefix marking an input value as a file containing one array value per line; "@-" reads stdin
+VALUES_FILE_PREFIX = "@"
+# a value starting with the prefix twice is the value itself, with one prefix removed
+ESCAPED_VALUES_FILE_PREFIX = VALUES_FILE_PREFIX * 2
+STDIN_VALUES_FILE = "-"
+# arrays longer than this are summarized rather than logged in full at debug level
+MAX_LOGGED_ARRAY_VALUES = 20
+
+
 def process_value(raw_value: str) -> str | list[str]:
-    """Process a raw input value string, splitting to an array if commas are present."""
+    """Process a raw input value string, splitting to an array if commas are present
+    or reading the array from a file if the value starts with '@' (but not '@@', which is
+    replaced by a literal '@'). Values read from a file are all read into the returned list.
+    """
+    if raw_value.startswith(ESCAPED_VALUES_FILE_PREFIX):
+        raw_value = raw_value[len(VALUES_FILE_PREFIX) :]
+    elif raw_value.startswith(VALUES_FILE_PREFIX):
+        return list(iter_values_from_file(raw_value[len(VALUES_FILE_PREFIX) :]))
+
     # process arrays
     ARRAY_INPUT_DELIMITER = ","
     if ARRAY_INPUT_DELIMITER in raw_value:
@@ -154,6 +219,41 @@ def process_value(raw_value: str) -> str | list[str]:
         return raw_value
 
 
+def iter_values_from_file(values_file_path: str) -> Iterator[str]:
+    """Yield array values from a file (or stdin, if the path is '-'), one value per line.
+
+    Surrounding whitespace is stripped and blank lines are skipped.
+
+    Raises:
+        ValueError: If the file cannot be read or contains no values
+    """
+    n_values = 0
+    try:
+        if values_file_path == STDIN_VALUES_FILE:
+            lines: Iterator[str] = iter(sys.stdin)
+            for value in _iter_stripped_values(lines):
+                n_values += 1
+                yield value
+        else:
+            with open(values_file_path, "r") as values_file:
+                for value in _iter_stripped_values(values_file):
+                    n_values += 1
+                    yield value
+    except OSError as e:
+        raise ValueError(
+            f"Error: Could not read input values from '{values_file_path}': {e.strerror}."
+        ) from e
+
+    if n_values == 0:
+        raise ValueError(f"Error: No input values found in '{values_file_path}'.")
+
+
+def _iter_stripped_values(lines: Iterator[str]) -> Iterator[str]:
+    for line in lines:
+        if value := line.strip():
+            yield value
+
+
 def is_valid_local_file(local_file_path: str) -> bool:
     """Validate that the provided local file path exists."""
     return True if os.path.exists(local_file_path) else False
@@ -185,55 +285,338 @@ def convert_file_size_to_human_readable(size_bytes: int) -> str:
 PROGRESS_BAR_FORMAT = "{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [elapsed: {elapsed} ETA: {remaining} ({rate_fmt}{postfix})]"
 
 
-def upload_file_with_signed_url(local_file_path: str, signed_url: str) -> None:
-    """Uploads a local file using a signed URL"""
+DEFAULT_MAX_CONCURRENT_TRANSFERS = 16
+# large enough that per-block overhead is negligible next to sending the block
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadCancelledError(Exception):
+    """An upload was stopped because its cancel event was set, e.g. because another upload failed"""
+
+
+def upload_file_with_signed_url(
+    local_file_path: str,
+    signed_url: str,
+    compress: bool = False,
+    cancel_event: threading.Event | None = None,
+    progress_position: int | None = None,
+) -> None:
+    """Uploads a local file using a signed URL, BGZF compressing it on the way if compress is True.
+    If cancel_event is given and gets set, the upload stops before sending its next block and
+    UploadCancelledError is raised. progress_position is the line of the upload's progress bar,
+    for uploads that run at the same time. Raises a TransferError if the upload fails.
+    """
     try:
-        with open(local_file_path, "rb") as in_file:
-            total_bytes = os.fstat(in_file.fileno()).st_size
-            with tqdm.wrapattr(
-                in_file,
-                "read",
-                total=total_bytes,
-                miniters=1,
-                desc="Upload progress",
-                bar_format=PROGRESS_BAR_FORMAT,
-            ) as file_obj:
-                response = requests.request(
-                    method="PUT",
-                    url=signed_url,
-                    data=file_obj,
-                    headers={"Content-Type": "application/octet-stream"},
-                )
-                response.raise_for_status()
-        LOGGER.info(add_blankline_before(f"File '{local_file_path}' upload complete"))
+        _upload_file_with_signed_url(
+            local_file_path, signed_url, compress, cancel_event, progress_position
+        )
+    except UploadCancelledError:
+        raise
     except Exception as e:
-        LOGGER.error(add_blankline_before(f"Error uploading file: {e}"))
-        exit(1)
+        raise TransferError(f"Error uploading file: {e}") from e
+
+
+@traced("utils.upload_file_with_signed_url")
+def _upload_file_with_signed_url(
+    local_file_path: str,
+    signed_url: str,
+    compress: bool = False,
+    cancel_event: threading.Event | None = None,
+    progress_position: int | None = None,
+) -> None:
+    transfer_stats = get_transfer_stats()
+    transfer_record = transfer_stats.start_transfer(
+        UPLOAD, os.path.basename(local_file_path)
+    )
+    put_file = partial(
+        _put_file_with_signed_url,
+        local_file_path,
+        signed_url,
+        transfer_record,
+        compress,
+        cancel_event,
+        progress_position,
+    )
+    try:
+        if is_stream_file(local_file_path):
+            # data read from a pipe can't be read again, so a failed upload can't be retried
+            put_file()
+        else:
+            # signed URL uploads are a single PUT, so a failed upload is retried from the start of the file
+            call_with_retries(
+                put_file,
+                f"Uploading '{local_file_path}'",
+                on_retry=transfer_record.add_retry,
+            )
+    except Exception:
+        transfer_stats.finish_transfer(transfer_record, succeeded=False)
+        raise
+    transfer_stats.finish_transfer(transfer_record, succeeded=True)
+    LOGGER.info(add_blankline_before(f"File '{local_file_path}' upload complete"))
+
+
+def _put_file_with_signed_url(
+    local_file_path: str,
+    signed_url: str,
+    transfer_record: TransferRecord,
+    compress: bool = False,
+    cancel_event: threading.Event | None = None,
+    progress_position: int | None = None,
+) -> None:
+    # don't start sending an upload that has already been cancelled
+    _check_upload_cancelled(cancel_event)
+    with open(local_file_path, "rb") as in_file:
+        file_stat = os.fstat(in_file.fileno())
+        # the size of a pipe's data isn't known until it's all been read
+        is_stream = not stat.S_ISREG(file_stat.st_mode)
+        total_bytes = None if is_stream else file_stat.st_size
+        transfer_record.size_bytes = total_bytes
+        with tqdm(
+            total=total_bytes,
+            unit="B",
+            unit_scale=True,
+            desc=f"Uploading {os.path.basename(local_file_path)}",
+            bar_format=PROGRESS_BAR_FORMAT,
+            position=progress_position,
+            leave=False,  # remove progress bar when complete
+            dynamic_ncols=True,  # play nice with window resizing
+        ) as progress_bar:
+            upload_body: FileUploadBody | Iterator[bytes]
+            if compress:
+                # sent with chunked transfer encoding, since the compressed size isn't known up front
+                upload_body = _iter_compressed_upload(
+                    in_file, progress_bar, transfer_record, cancel_event
+                )
+            elif is_stream:
+                # also sent with chunked transfer encoding
+                upload_body = _iter_stream_upload(
+                    in_file, progress_bar, transfer_record, cancel_event
+                )
+            else:
+                upload_body = FileUploadBody(
+                    in_file,
+                    file_stat.st_size,
+                    on_progress=lambda offset: _report_upload_progress(
+                        offset, progress_bar, transfer_record, cancel_event
+                    ),
+                )
+            response = get_transfer_session().request(
+                method="PUT",
+                url=signed_url,
+                # the socket accepts memoryview blocks as well as bytes
+                data=upload_body,  # type: ignore[arg-type]
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            response.raise_for_status()
+        if is_stream:
+            transfer_record.size_bytes = progress_bar.n
+
+
+def is_stream_file(local_file_path: str) -> bool:
+    """Return whether a local file is a pipe (e.g. a named pipe, or `<(command)` in bash) or another kind of stream,
+    rather than a regular file: its data can only be read once, and its size isn't known until it's been read.
+    """
+    return not stat.S_ISREG(os.stat(local_file_path).st_mode)
+
+
+def _check_upload_cancelled(cancel_event: threading.Event | None) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise UploadCancelledError("Upload cancelled")
+
+
+def _check_upload_size(bytes_sent: int) -> None:
+    # for uploads whose size isn't known up front (compressed files and pipes), called before each block is sent
+    if bytes_sent > MAX_FILE_UPLOAD_SIZE_BYTES:
+        raise TransferError(
+            f"More than the maximum file size of {convert_file_size_to_human_readable(MAX_FILE_UPLOAD_SIZE_BYTES)} "
+            "would be uploaded"
+        )
+
+
+def _report_upload_progress(
+    offset: int,
+    progress_bar: tqdm,
+    transfer_record: TransferRecord,
+    cancel_event: threading.Event | None = None,
+) -> None:
+    # called before each block is sent
+    _check_upload_cancelled(cancel_event)
+    transfer_record.add_bytes(offset - progress_bar.n)
+    progress_bar.update(offset - progress_bar.n)
+
+
+def _iter_compressed_upload(
+    in_file: BinaryIO,
+    progress_bar: tqdm,
+    transfer_record: TransferRecord,
+    cancel_event: threading.Event | None = None,
+) -> Iterator[bytes]:
+    """BGZF compress a file as it's uploaded. Progress is shown through the uncompressed file,
+    while transfer stats, the bandwidth limit and the maximum upload size count the compressed bytes sent.
+    """
+    bytes_sent = 0
+    for compressed_data in iter_bgzf_compressed(
+        in_file, on_progress=lambda offset: progress_bar.update(offset - progress_bar.n)
+    ):
+        _check_upload_cancelled(cancel_event)
+        bytes_sent += len(compressed_data)
+        _check_upload_size(bytes_sent)
+        throttle(len(compressed_data))
+        transfer_record.add_bytes(len(compressed_data))
+        yield compressed_data
+
+
+def _iter_stream_upload(
+    in_file: BinaryIO,
+    progress_bar: tqdm,
+    transfer_record: TransferRecord,
+    cancel_event: threading.Event | None = None,
+) -> Iterator[bytes]:
+    """Read a pipe in UPLOAD_BLOCK_SIZE blocks as it's uploaded.
+    Fails once more than the maximum upload size has been read, since that can't be checked up front.
+    """
+    bytes_read = 0
+    while data := in_file.read(UPLOAD_BLOCK_SIZE):
+        _check_upload_cancelled(cancel_event)
+        bytes_read += len(data)
+        _check_upload_size(bytes_read)
+        throttle(len(data))
+        transfer_record.add_bytes(len(data))
+        progress_bar.update(len(data))
+        yield data
+
+
+class FileUploadBody:
+    """An upload request body that sends a file straight from a memory map, in UPLOAD_BLOCK_SIZE blocks,
+    rather than reading it into Python bytes objects block by block.
+
+    requests sends an iterable body with a length as a Content-Length request, passing each block to
+    the socket as is. on_progress is called with the offset reached in the file before sending each block
+    and once the whole file is sent. Blocks follow the bandwidth limit.
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        size_bytes: int,
+        on_progress: Callable[[int], None] | None = None,
+    ) -> None:
+        self._file = file
+        self._size_bytes = size_bytes
+        self._on_progress = on_progress
+
+    def __len__(self) -> int:
+        return self._size_bytes
+
+    def __iter__(self) -> Iterator[memoryview]:
+        if self._size_bytes == 0:
+            self._report_progress(0)
+            return
+        with (
+            mmap.mmap(
+                self._file.fileno(), self._size_bytes, access=mmap.ACCESS_READ
+            ) as file_map,
+            memoryview(file_map) as file_view,
+        ):
+            for offset in range(0, self._size_bytes, UPLOAD_BLOCK_SIZE):
+                self._report_progress(offset)
+                # release each block once it's sent, so that the memory map can be closed
+                with file_view[offset : offset + UPLOAD_BLOCK_SIZE] as block:
+                    throttle(len(block))
+                    yield block
+        self._report_progress(self._size_bytes)
+
+    def _report_progress(self, offset: int) -> None:
+        if self._on_progress is not None:
+            self._on_progress(offset)
 
 
 class SignedUrlDownload:
     """Class to generate and capture all the information needed to perform a download of a file based on a signed url."""
 
-    def __init__(self, signed_url: str, local_destination_dir: str) -> None:
+    def __init__(
+        self,
+        signed_url: str,
+        local_destination_dir: str,
+        local_file_path: str | None = None,
+    ) -> None:
+        """Start downloading signed_url to local_file_path or, by default, to a file in local_destination_dir
+        named after the file the signed URL points to."""
         self.signed_url = signed_url
-        # extract file name from signed url; signed url looks like:
-        # https://storage.googleapis.com/fc-secure-6970c3a9-dc92-436d-af3d-917bcb4cf05a/test_signed_urls/helloworld.txt?x-goog-signature...
-        self.file_name = signed_url.split("?")[0].split("/")[-1]
-        self.local_file_path = os.path.join(local_destination_dir, self.file_name)
+        if local_file_path is None:
+            local_file_path = get_download_path(local_destination_dir, signed_url)
+        self.local_file_path = local_file_path
+        self.file_name = os.path.basename(local_file_path)
         LOGGER.debug(f"Will download file to '{self.local_file_path}'")
-        self.response = requests.get(signed_url, stream=True)
-
-        self.response.raise_for_status()
+        self.transfer_record = get_transfer_stats().start_transfer(
+            DOWNLOAD, self.file_name
+        )
+        try:
+            self.response = call_with_retries(
+                self._request,
+                f"Downloading {self.file_name}",
+                on_retry=self.transfer_record.add_retry,
+            )
+        except Exception:
+            get_transfer_stats().finish_transfer(self.transfer_record, succeeded=False)
+            raise
 
         self.total_size_bytes = int(self.response.headers.get("content-length", 0))
+        self.transfer_record.size_bytes = self.total_size_bytes
+
+    def resume(self, start_byte: int) -> bool:
+        """Request the rest of the file, starting at start_byte, after a download was interrupted.
+        Returns False if the server sent the whole file instead."""
+        self.response = call_with_retries(
+            lambda: self._request(start_byte),
+            f"Resuming download of {self.file_name}",
+            on_retry=self.transfer_record.add_retry,
+        )
+        return self.response.status_code == 206
+
+    @traced("utils.SignedUrlDownload.request")
+    def _request(self, start_byte: int = 0) -> requests.Response:
+        if start_byte:
+            response = get_transfer_session().get(
+                self.signed_url,
+                stream=True,
+                headers={"Range": f"bytes={start_byte}-"},
+            )
+        else:
+            response = get_transfer_session().get(self.signed_url, stream=True)
+        response.raise_for_status()
+        return response
 
 
+@traced()
 def download_with_pbar(download: SignedUrlDownload) -> str:
     """Helper function to take a SignedUrlDownload object and perform a download with a progress bar.
+    If the connection drops, the download resumes from the last byte received.
     Return the local file path of the downloaded file."""
+    transfer_stats = get_transfer_stats()
+    try:
+        _write_download(download)
+    except Exception as e:
+        transfer_stats.finish_transfer(download.transfer_record, succeeded=False)
+        if isinstance(e, OSError) and e.errno == errno.ENOSPC:
+            # don't leave a partial file using up the space that's left
+            with contextlib.suppress(OSError):
+                os.remove(download.local_file_path)
+        raise
+    transfer_stats.finish_transfer(download.transfer_record, succeeded=True)
+
+    with logging_redirect_tqdm():  # log without interfering with progress bars
+        LOGGER.info(f"Downloading {download.file_name}: complete")
+
+    return download.local_file_path
+
+
+def _write_download(download: SignedUrlDownload) -> None:
     download_block_size = 8192  # https://stackoverflow.com/questions/48719893/why-is-the-block-size-for-python-httplibs-reads-hard-coded-as-8192-bytes
 
+    os.makedirs(os.path.dirname(download.local_file_path) or ".", exist_ok=True)
     with open(download.local_file_path, "wb") as file:
+        preallocate_file(file, download.total_size_bytes, download.file_name)
         with tqdm(
             total=download.total_size_bytes,
             unit="B",
@@ -243,40 +626,159 @@ def download_with_pbar(download: SignedUrlDownload) -> str:
             leave=False,  # remove progress bar when complete
             dynamic_ncols=True,  # play nice with window resizing
         ) as progress_bar:
-            for data in download.response.iter_content(download_block_size):
-                file.write(data)
-                progress_bar.update(len(data))
-
-    with logging_redirect_tqdm():  # log without interfering with progress bars
-        LOGGER.info(f"Downloading {download.file_name}: complete")
-
-    return download.local_file_path
+            bytes_written = 0
+            retry_number = 0
+            while True:
+                try:
+                    for data in download.response.iter_content(download_block_size):
+                        file.write(data)
+                        bytes_written += len(data)
+                        progress_bar.update(len(data))
+                        download.transfer_record.add_bytes(len(data))
+                        throttle(len(data))
+                    break
+                except Exception as e:
+                    retry_number += 1
+                    if (backoff_seconds := get_retry_delay(e, retry_number)) is None:
+                        raise
+                    log_retry(
+                        f"Downloading {download.file_name}",
+                        e,
+                        backoff_seconds,
+                        retry_number,
+                    )
+                    download.transfer_record.add_retry()
+                    time.sleep(backoff_seconds)
+                    if not download.resume(bytes_written):
+                        # the server doesn't support range requests; start over
+                        file.seek(0)
+                        file.truncate()
+                        progress_bar.reset()
+                        bytes_written = 0
+            # in case the file was preallocated for more than was downloaded
+            file.truncate(bytes_written)
+
+
+def preallocate_file(file: BinaryIO, size_bytes: int, file_name: str) -> None:
+    """Allocate disk space for a file that's about to be written, so that it's written contiguously, and
+    so that a download fails straight away if there isn't enough space rather than partway through.
+    Does nothing where preallocation isn't supported."""
+    if size_bytes <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(file.fileno(), 0, size_bytes)
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            raise OSError(
+                errno.ENOSPC,
+                f"Not enough disk space for {file_name} ({convert_file_size_to_human_readable(size_bytes)})",
+            ) from e
+        # e.g. the filesystem doesn't support preallocation
+        LOGGER.debug(f"Unable to preallocate {file_name}: {e}")
+
+
+def get_disk_space_error(local_destination_dir: str, required_bytes: int) -> str | None:
+    """Return an error message if local_destination_dir doesn't have required_bytes of free disk space,
+    else None."""
+    if required_bytes <= 0:
+        return None
+    free_bytes = shutil.disk_usage(local_destination_dir).free
+    if required_bytes <= free_bytes:
+        return None
+    return (
+        f"Error: Not enough disk space to download to '{local_destination_dir}': "
+        f"{convert_file_size_to_human_readable(required_bytes)} needed, "
+        f"{convert_file_size_to_human_readable(free_bytes)} available."
+    )
 
 
+@traced()
 def download_files_with_signed_urls(
-    local_destination_dir: str, signed_urls: list[str]
+    local_destination_dir: str,
+    signed_urls: list[str],
+    local_file_paths: list[str] | None = None,
+    max_concurrent_transfers: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
 ) -> list[str]:
     """Downloads a file or multiple files in parallel, using signed urls, to a specified local destination.
-    Returns a list of the local file path(s) of the downloaded file(s)."""
+    local_file_paths, if given, are the paths to download each signed url to; by default, files are saved
+    in local_destination_dir under their own names.
+    Returns a list of the local file path(s) of the downloaded file(s). Raises a TransferError if any download fails.
+    """
 
     try:
-        downloads = [
-            SignedUrlDownload(signed_url, local_destination_dir)
-            for signed_url in signed_urls
-        ]
-
-        with ThreadPoolExecutor(max_workers=len(downloads)) as ex:
-            downloaded_file_paths: list[str] = list(
-                ex.map(download_with_pbar, downloads)
+        downloaded_file_paths = asyncio.run(
+            download_files_with_signed_urls_async(
+                local_destination_dir,
+                signed_urls,
+                max_concurrent_transfers,
+                local_file_paths,
             )
+        )
     except Exception as e:
-        LOGGER.error(add_blankline_before(f"Error downloading files: {e}"))
-        exit(1)
+        raise TransferError(f"Error downloading files: {e}") from e
 
     LOGGER.info(add_blankline_before("All downloads complete"))
     return downloaded_file_paths
 
 
+async def download_files_with_signed_urls_async(
+    local_destination_dir: str,
+    signed_urls: list[str],
+    max_concurrent_transfers: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    local_file_paths: list[str] | None = None,
+) -> list[str]:
+    """Downloads files concurrently on the running event loop, at most max_concurrent_transfers at a time.
+    Returns a list of the local file path(s) of the downloaded file(s), in the order of signed_urls.
+    Raises an exception, before starting any download, if two files would be downloaded to the same path,
+    and raises an exception if any download fails."""
+    if local_file_paths is None:
+        local_file_paths = [
+            get_download_path(local_destination_dir, signed_url)
+            for signed_url in signed_urls
+        ]
+    if collisions := find_path_collisions(
+        zip(map(get_file_name_from_signed_url, signed_urls), local_file_paths)
+    ):
+        raise ValueError(
+            "Some files would be downloaded to the same place:\n"
+            + "\n".join(collisions)
+        )
+    transfer_slots = asyncio.Semaphore(max_concurrent_transfers)
+    # a thread for every transfer slot; the event loop's default executor may have fewer
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrent_transfers, thread_name_prefix="terralab-transfer"
+    )
+
+    async def download_one(signed_url: str, local_file_path: str) -> str:
+        async with transfer_slots:
+            download = await run_in_executor(
+                executor,
+                SignedUrlDownload,
+                signed_url,
+                local_destination_dir,
+                local_file_path,
+            )
+            return await run_in_executor(executor, download_with_pbar, download)
+
+    try:
+        return list(
+            await asyncio.gather(*map(download_one, signed_urls, local_file_paths))
+        )
+    finally:
+        # don't block the event loop on downloads still running after another one failed
+        executor.shutdown(wait=False)
+
+
+async def run_in_executor(executor: Executor, func: Callable[..., T], *args: Any) -> T:
+    """Run func(*args) on executor without blocking the event loop, like asyncio.to_thread does on the loop's
+    default executor. Context variables (e.g. the API client in use) are copied to the executor's thread.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, partial(context.run, func, *args)
+    )
+
+
 def validate_job_id(job_id: str) -> uuid.UUID:
     """Attempts to convert a string to a valid uuid.
 
@@ -292,7 +794,7 @@ def validate_gcs_path(gcs_path: str) -> str:
     """Validates that the provided string is a valid GCS path (gs://bucket/...).
 
     Returns the path if valid, otherwise logs an error and exits."""
-    if not gcs_path.startswith(GCS_PREFIX) or len(gcs_path) <= len(GCS_PREFIX):
+    if not is_valid_gcs_path(gcs_path):
         LOGGER.error(
             f"Error: '{gcs_path}' is not a valid GCS path. GCS paths must start with '{GCS_PREFIX}' followed by a bucket name."
         )
@@ -300,6 +802,11 @@ def validate_gcs_path(gcs_path: str) -> str:
     return gcs_path
 
 
+def is_valid_gcs_path(gcs_path: str) -> bool:
+    """Returns whether the provided string is a valid GCS path (gs://bucket/...)."""
+    return gcs_path.startswith(GCS_PREFIX) and len(gcs_path) > len(GCS_PREFIX)
+
+
 def format_timestamp(
     timestamp_string: str | None, timestamp_format: str = "%Y-%m-%d %H:%M"
 ) -> str:
@@ -0,0 +1,60 @@
+# tests/commands/test_agent_commands.py
+
+from click.testing import CliRunner
+from mockito import when, verify
+
+from terralab.commands import agent_commands
+from tests.conftest import capture_logs
+
+
+def test_start(capture_logs, unstub):
+    when(agent_commands.agent_logic).get_agent_pid().thenReturn(None)
+    when(agent_commands.agent_logic).start_agent().thenReturn(1234)
+
+    runner = CliRunner()
+    result = runner.invoke(agent_commands.agent, ["start"])
+
+    assert result.exit_code == 0
+    verify(agent_commands.agent_logic).start_agent()
+    assert "Started terralab agent (pid 1234)" in capture_logs.text
+
+
+def test_start_already_running(capture_logs, unstub):
+    when(agent_commands.agent_logic).get_agent_pid().thenReturn(1234)
+
+    runner = CliRunner()
+    result = runner.invoke(agent_commands.agent, ["start"])
+
+    assert result.exit_code == 0
+    verify(agent_commands.agent_logic, times=0).start_agent()
+    assert "terralab agent is already running (pid 1234)" in capture_logs.text
+
+
+def test_stop(capture_logs, unstub):
+    when(agent_commands.agent_logic).stop_agent().thenReturn(True)
+
+    runner = CliRunner()
+    result = runner.invoke(agent_commands.agent, ["stop"])
+
+    assert result.exit_code == 0
+    assert "Stopped terralab agent" in capture_logs.text
+
+
+def test_stop_not_running(capture_logs, unstub):
+    when(agent_commands.agent_logic).stop_agent().thenReturn(False)
+
+    runner = CliRunner()
+    result = runner.invoke(agent_commands.agent, ["stop"])
+
+    assert result.exit_code == 0
+    assert "terralab agent is not running" in capture_logs.text
+
+
+def test_status(capture_logs, unstub):
+    when(agent_commands.agent_logic).get_agent_pid().thenReturn(1234)
+
+    runner = CliRunner()
+    result = runner.invoke(agent_commands.agent, ["status"])
+
+    assert result.exit_code == 0
+    assert "terralab agent is running (pid 1234)" in capture_logs.text
@@ -1,5 +1,8 @@
 # tests/commands/test_pipeline_runs_commands.py
 
+import contextlib
+import io
+import json
 import logging
 import uuid
 
@@ -13,11 +16,13 @@ from teaspoons_client import (
     ErrorReport,
     PipelineOutputDefinition,
     PipelineQuota,
+    PipelineRun,
     PipelineRunReportV2,
     PipelineUserProvidedInputDefinition,
     PipelineWithDetails,
 )
 
+from terralab import output
 from terralab.commands import pipeline_runs_commands
 from terralab.constants import (
     SUPPORT_EMAIL_TEXT,
@@ -38,6 +43,7 @@ TEST_INPUTS_TUPLE = (TEST_INPUT_KEY, TEST_INPUT_VALUE)
 TEST_INPUTS_DICT = {TEST_INPUT_KEY_STRIPPED: TEST_INPUT_VALUE}
 TEST_DESCRIPTION = "user description"
 TEST_JOB_ID = uuid.uuid4()
+TEST_PIPELINE_INFO = mock({"name": TEST_PIPELINE_NAME})
 TEST_QUOTA_CONSUMED = 500
 TEST_INPUT_SIZE = 100
 TEST_INPUT_UNIT = "samples"
@@ -54,10 +60,18 @@ def test_submit(capture_logs):
     )
     when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
         TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT
-    )  # do nothing
+    ).thenReturn(TEST_PIPELINE_INFO)
 
     when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
-        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT, TEST_DESCRIPTION, True
+        TEST_PIPELINE_NAME,
+        None,
+        TEST_INPUTS_DICT,
+        TEST_DESCRIPTION,
+        True,
+        False,
+        False,
+        None,
+        TEST_PIPELINE_INFO,
     ).thenReturn(TEST_JOB_ID)
 
     result = runner.invoke(
@@ -79,6 +93,46 @@ def test_submit(capture_logs):
     )
 
 
+def test_submit_compress_inputs(capture_logs):
+    runner = CliRunner()
+
+    when(pipeline_runs_commands).process_inputs_to_dict(TEST_INPUTS_TUPLE).thenReturn(
+        TEST_INPUTS_DICT
+    )
+    when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
+        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT
+    ).thenReturn(TEST_PIPELINE_INFO)
+
+    when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        TEST_PIPELINE_NAME,
+        None,
+        TEST_INPUTS_DICT,
+        "",
+        True,
+        True,
+        False,
+        None,
+        TEST_PIPELINE_INFO,
+    ).thenReturn(TEST_JOB_ID)
+
+    result = runner.invoke(
+        pipeline_runs_commands.submit,
+        [
+            TEST_PIPELINE_NAME,
+            TEST_INPUT_KEY,
+            TEST_INPUT_VALUE,
+            "--agreeToTerms",
+            "--compress-inputs",
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert (
+        f"Successfully started {TEST_PIPELINE_NAME} job {TEST_JOB_ID}"
+        in capture_logs.text
+    )
+
+
 def test_submit_with_prompt_to_agree_to_terms(capture_logs):
     runner = CliRunner()
 
@@ -132,10 +186,18 @@ def test_submit_no_description(capture_logs):
     )
     when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
         TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT
-    )  # do nothing
+    ).thenReturn(TEST_PIPELINE_INFO)
 
     when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
-        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT, "", True
+        TEST_PIPELINE_NAME,
+        None,
+        TEST_INPUTS_DICT,
+        "",
+        True,
+        False,
+        False,
+        None,
+        TEST_PIPELINE_INFO,
     ).thenReturn(TEST_JOB_ID)
 
     result = runner.invoke(
@@ -158,10 +220,18 @@ def test_submit_with_version(capture_logs):
     )
     when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
         TEST_PIPELINE_NAME, 1, TEST_INPUTS_DICT
-    )  # do nothing
+    ).thenReturn(TEST_PIPELINE_INFO)
 
     when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
-        TEST_PIPELINE_NAME, 1, TEST_INPUTS_DICT, "", True
+        TEST_PIPELINE_NAME,
+        1,
+        TEST_INPUTS_DICT,
+        "",
+        True,
+        False,
+        False,
+        None,
+        TEST_PIPELINE_INFO,
     ).thenReturn(TEST_JOB_ID)
 
     result = runner.invoke(
@@ -183,6 +253,130 @@ def test_submit_with_version(capture_logs):
     )
 
 
+def test_submit_prevalidate_cloud(capture_logs):
+    runner = CliRunner()
+
+    mock_checker = mock()
+    when(pipeline_runs_commands).get_gcloud_access_token().thenReturn("gcloud_token")
+    when(pipeline_runs_commands).GcsObjectChecker("gcloud_token").thenReturn(
+        mock_checker
+    )
+    when(pipeline_runs_commands).process_inputs_to_dict(TEST_INPUTS_TUPLE).thenReturn(
+        TEST_INPUTS_DICT
+    )
+    when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
+        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT, mock_checker
+    ).thenReturn(TEST_PIPELINE_INFO)
+
+    when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        TEST_PIPELINE_NAME,
+        None,
+        TEST_INPUTS_DICT,
+        "",
+        True,
+        False,
+        False,
+        mock_checker,
+        TEST_PIPELINE_INFO,
+    ).thenReturn(TEST_JOB_ID)
+
+    result = runner.invoke(
+        pipeline_runs_commands.submit,
+        [
+            TEST_PIPELINE_NAME,
+            TEST_INPUT_KEY,
+            TEST_INPUT_VALUE,
+            "--prevalidate-cloud",
+            "--agreeToTerms",
+        ],
+    )
+
+    assert result.exit_code == 0
+    verify(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
+        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT, mock_checker
+    )
+
+
+def test_submit_reuse_uploads(capture_logs):
+    runner = CliRunner()
+
+    mock_checker = mock()
+    when(pipeline_runs_commands).get_gcloud_access_token().thenReturn("gcloud_token")
+    when(pipeline_runs_commands).GcsObjectChecker("gcloud_token").thenReturn(
+        mock_checker
+    )
+    when(pipeline_runs_commands).process_inputs_to_dict(TEST_INPUTS_TUPLE).thenReturn(
+        TEST_INPUTS_DICT
+    )
+    when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
+        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT
+    ).thenReturn(TEST_PIPELINE_INFO)
+    # earlier uploads are checked with the gcloud credentials before they're reused
+    when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        TEST_PIPELINE_NAME,
+        None,
+        TEST_INPUTS_DICT,
+        "",
+        True,
+        False,
+        True,
+        mock_checker,
+        TEST_PIPELINE_INFO,
+    ).thenReturn(TEST_JOB_ID)
+
+    result = runner.invoke(
+        pipeline_runs_commands.submit,
+        [
+            TEST_PIPELINE_NAME,
+            TEST_INPUT_KEY,
+            TEST_INPUT_VALUE,
+            "--reuse-uploads",
+            "--agreeToTerms",
+        ],
+    )
+
+    assert result.exit_code == 0
+
+
+def test_submit_reuse_uploads_without_gcloud(capture_logs):
+    runner = CliRunner()
+
+    when(pipeline_runs_commands).get_gcloud_access_token().thenRaise(
+        RuntimeError("Could not get Google credentials")
+    )
+    when(pipeline_runs_commands).process_inputs_to_dict(TEST_INPUTS_TUPLE).thenReturn(
+        TEST_INPUTS_DICT
+    )
+    when(pipeline_runs_commands.pipelines_logic).validate_pipeline_inputs(
+        TEST_PIPELINE_NAME, None, TEST_INPUTS_DICT
+    ).thenReturn(TEST_PIPELINE_INFO)
+    # without a checker, the logic uploads files again
+    when(pipeline_runs_commands.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        TEST_PIPELINE_NAME,
+        None,
+        TEST_INPUTS_DICT,
+        "",
+        True,
+        False,
+        True,
+        None,
+        TEST_PIPELINE_INFO,
+    ).thenReturn(TEST_JOB_ID)
+
+    result = runner.invoke(
+        pipeline_runs_commands.submit,
+        [
+            TEST_PIPELINE_NAME,
+            TEST_INPUT_KEY,
+            TEST_INPUT_VALUE,
+            "--reuse-uploads",
+            "--agreeToTerms",
+        ],
+    )
+
+    assert result.exit_code == 0
+
+
 def test_download():
     runner = CliRunner()
 
@@ -191,7 +385,7 @@ def test_download():
     when(
         pipeline_runs_commands.pipeline_runs_logic
     ).get_signed_urls_and_download_pipeline_run_outputs(
-        TEST_JOB_ID, "."
+        TEST_JOB_ID, ".", (), (), (), "{file_name}"
     )  # do nothing, assume succeeded
 
     result = runner.invoke(pipeline_runs_commands.download, [test_job_id_str])
@@ -199,7 +393,126 @@ def test_download():
     assert result.exit_code == 0
     verify(
         pipeline_runs_commands.pipeline_runs_logic
-    ).get_signed_urls_and_download_pipeline_run_outputs(TEST_JOB_ID, ".")
+    ).get_signed_urls_and_download_pipeline_run_outputs(
+        TEST_JOB_ID, ".", (), (), (), "{file_name}"
+    )
+
+
+def test_download_selected_outputs():
+    runner = CliRunner()
+
+    when(
+        pipeline_runs_commands.pipeline_runs_logic
+    ).get_signed_urls_and_download_pipeline_run_outputs(
+        TEST_JOB_ID, ".", ("output1",), ("*Metrics*",), ("*.bam",), "{file_name}"
+    ).thenReturn(
+        []
+    )
+
+    result = runner.invoke(
+        pipeline_runs_commands.download,
+        [
+            str(TEST_JOB_ID),
+            "--output-name",
+            "output1",
+            "--include",
+            "*Metrics*",
+            "--exclude",
+            "*.bam",
+        ],
+    )
+
+    assert result.exit_code == 0
+
+
+def test_download_list(capture_logs):
+    runner = CliRunner()
+
+    when(pipeline_runs_commands.pipeline_runs_logic).list_pipeline_run_outputs(
+        TEST_JOB_ID, (), ("output*",), ()
+    ).thenReturn({"output1": 2048, "output2": None})
+
+    result = runner.invoke(
+        pipeline_runs_commands.download,
+        [str(TEST_JOB_ID), "--list", "--include", "output*"],
+    )
+
+    assert result.exit_code == 0
+    assert "output1" in capture_logs.text
+    assert "2.0 KiB" in capture_logs.text
+    assert "unknown" in capture_logs.text
+
+
+def test_download_list_machine_readable():
+    runner = CliRunner()
+
+    when(pipeline_runs_commands.pipeline_runs_logic).list_pipeline_run_outputs(
+        TEST_JOB_ID, (), (), ()
+    ).thenReturn({"output1": 2048, "output2": None})
+
+    output.configure_output(output.JSON_FORMAT)
+    try:
+        result = runner.invoke(
+            pipeline_runs_commands.download, [str(TEST_JOB_ID), "--list"]
+        )
+    finally:
+        output.configure_output(output.TEXT_FORMAT)
+
+    assert result.exit_code == 0
+    assert json.loads(result.output) == [
+        {"outputName": "output1", "sizeInBytes": 2048},
+        {"outputName": "output2", "sizeInBytes": None},
+    ]
+
+
+def test_download_to_stdout():
+    runner = CliRunner()
+    out_file = io.BytesIO()
+    when(pipeline_runs_commands).open_stdout().thenReturn(
+        contextlib.nullcontext(out_file)
+    )
+    when(pipeline_runs_commands.pipeline_runs_logic).stream_pipeline_run_output(
+        TEST_JOB_ID, out_file, ("output1",), (), ()
+    ).thenReturn(1024)
+
+    result = runner.invoke(
+        pipeline_runs_commands.download,
+        [str(TEST_JOB_ID), "--output-name", "output1", "--to-stdout"],
+    )
+
+    assert result.exit_code == 0
+    verify(pipeline_runs_commands.pipeline_runs_logic).stream_pipeline_run_output(
+        TEST_JOB_ID, out_file, ("output1",), (), ()
+    )
+
+
+def test_download_to_pipe():
+    runner = CliRunner()
+    out_file = io.BytesIO()
+    when(pipeline_runs_commands).open_named_pipe("output.pipe").thenReturn(
+        contextlib.nullcontext(out_file)
+    )
+    when(pipeline_runs_commands.pipeline_runs_logic).stream_pipeline_run_output(
+        TEST_JOB_ID, out_file, (), ("*Metrics*",), ()
+    ).thenReturn(1024)
+
+    result = runner.invoke(
+        pipeline_runs_commands.download,
+        [str(TEST_JOB_ID), "--include", "*Metrics*", "--to-pipe", "output.pipe"],
+    )
+
+    assert result.exit_code == 0
+
+
+def test_download_to_stdout_with_list(capture_logs):
+    runner = CliRunner()
+
+    result = runner.invoke(
+        pipeline_runs_commands.download, [str(TEST_JOB_ID), "--list", "--to-stdout"]
+    )
+
+    assert result.exit_code == 1
+    assert "can't be used together" in capture_logs.text
 
 
 def test_download_bad_job_id(capture_logs):
@@ -291,7 +604,9 @@ def test_download_api_error(capture_logs, unstub):
 
     when(
         pipeline_runs_commands.pipeline_runs_logic
-    ).get_signed_urls_and_download_pipeline_run_outputs(TEST_JOB_ID, ".").thenRaise(
+    ).get_signed_urls_and_download_pipeline_run_outputs(
+        TEST_JOB_ID, ".", (), (), (), "{file_name}"
+    ).thenRaise(
         Exception("API error")
     )
 
@@ -598,8 +913,8 @@ def test_list_jobs(capture_logs):
         ),
     ]
 
-    when(pipeline_runs_commands.pipeline_runs_logic).get_pipeline_runs(10).thenReturn(
-        test_pipeline_runs
+    when(pipeline_runs_commands.pipeline_runs_logic).iter_pipeline_runs(10).thenReturn(
+        iter(test_pipeline_runs)
     )
 
     result = runner.invoke(pipeline_runs_commands.jobs, ["list"])
@@ -625,6 +940,44 @@ def test_list_jobs(capture_logs):
     assert "Failed" in capture_logs.text
 
 
+def test_list_jobs_prints_first_page_before_fetching_next(capture_logs):
+    runner = CliRunner()
+    test_pipeline_runs = [
+        mock(
+            {
+                "job_id": str(uuid.uuid4()),
+                "pipeline_name": "test_pipeline",
+                "pipeline_version": 1,
+                "status": SUCCEEDED_KEY,
+                "time_submitted": "2024-01-01T12:00:00Z",
+                "description": f"test description {i}",
+                "output_expiration_date": None,
+            }
+        )
+        for i in range(15)
+    ]
+    logs_before_second_page = []
+
+    def iter_pages():
+        # the API returns 10 results per page
+        yield from test_pipeline_runs[:10]
+        logs_before_second_page.append(capture_logs.text)
+        yield from test_pipeline_runs[10:]
+
+    when(pipeline_runs_commands.pipeline_runs_logic).iter_pipeline_runs(20).thenReturn(
+        iter_pages()
+    )
+
+    result = runner.invoke(pipeline_runs_commands.jobs, ["list", "--num_results", 20])
+
+    assert result.exit_code == 0
+    assert all(
+        pipeline_run.job_id in logs_before_second_page[0]
+        for pipeline_run in test_pipeline_runs[:10]
+    )
+    assert test_pipeline_runs[14].job_id in capture_logs.text
+
+
 def test_list_jobs_custom_limit(capture_logs):
     runner = CliRunner()
     test_n_results = 5
@@ -643,9 +996,9 @@ def test_list_jobs_custom_limit(capture_logs):
         )
     ]
 
-    when(pipeline_runs_commands.pipeline_runs_logic).get_pipeline_runs(
+    when(pipeline_runs_commands.pipeline_runs_logic).iter_pipeline_runs(
         test_n_results
-    ).thenReturn(test_pipeline_runs)
+    ).thenReturn(iter(test_pipeline_runs))
 
     result = runner.invoke(
         pipeline_runs_commands.jobs, ["list", "--num_results", test_n_results]
@@ -655,11 +1008,41 @@ def test_list_jobs_custom_limit(capture_logs):
     assert test_pipeline_runs[0].job_id in capture_logs.text
 
 
+def test_list_jobs_json_output():
+    runner = CliRunner()
+
+    test_job_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+    test_pipeline_runs = [
+        PipelineRun(
+            jobId=test_job_id,
+            pipelineName=TEST_PIPELINE_NAME,
+            pipelineVersion=TEST_PIPELINE_VERSION,
+            status=SUCCEEDED_KEY,
+            timeSubmitted="2024-01-01T12:00:00Z",
+        )
+        for test_job_id in test_job_ids
+    ]
+    when(pipeline_runs_commands.pipeline_runs_logic).iter_pipeline_runs(10).thenReturn(
+        iter(test_pipeline_runs)
+    )
+
+    output.configure_output(output.JSON_FORMAT)
+    try:
+        result = runner.invoke(pipeline_runs_commands.jobs, ["list"])
+    finally:
+        output.configure_output(output.TEXT_FORMAT)
+
+    assert result.exit_code == 0
+    assert [run["jobId"] for run in json.loads(result.output)] == test_job_ids
+    # no table formatting in machine-readable mode
+    assert "Succeeded" not in result.output
+
+
 def test_list_jobs_no_results():
     runner = CliRunner()
 
-    when(pipeline_runs_commands.pipeline_runs_logic).get_pipeline_runs(10).thenReturn(
-        []
+    when(pipeline_runs_commands.pipeline_runs_logic).iter_pipeline_runs(10).thenReturn(
+        iter([])
     )
 
     result = runner.invoke(pipeline_runs_commands.jobs, ["list"])
@@ -5,6 +5,9 @@ import logging
 import pytest
 from mockito import unstub
 
+from terralab import retry
+from terralab.transfer_session import WARM_CONNECTIONS_ENV_VAR
+
 # Helper functions for unit tests
 
 
@@ -22,3 +25,17 @@ def unstub_fixture():
     """
     yield  # allows the test to run
     unstub()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_backoff():
+    """Retry immediately in tests, with a fresh retry budget for each test."""
+    retry.configure_retries(retry.RetryPolicy(initial_backoff_seconds=0))
+    yield
+    retry.configure_retries(retry.RetryPolicy())
+
+
+@pytest.fixture(autouse=True)
+def no_connection_warm_up(monkeypatch):
+    """Don't open connections to the real storage host in tests."""
+    monkeypatch.setenv(WARM_CONNECTIONS_ENV_VAR, "0")
@@ -0,0 +1,201 @@
+# tests/logic/test_async_pipeline_runs_logic.py
+
+import asyncio
+import subprocess
+import sys
+import threading
+import uuid
+
+import pytest
+from mockito import when, mock, verify
+
+from terralab.exceptions import TransferError
+from terralab.logic import async_pipeline_runs_logic
+from tests.conftest import capture_logs
+
+pytestmark = pytest.mark.usefixtures("unstub_fixture")
+
+
+def test_gather_with_concurrency_limit():
+    running = 0
+    max_running = 0
+
+    async def task(value):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return value * 2
+
+    results = asyncio.run(
+        async_pipeline_runs_logic.gather_with_concurrency_limit(
+            (task(i) for i in range(10)), max_concurrency=3
+        )
+    )
+
+    assert results == [i * 2 for i in range(10)]
+    assert max_running == 3
+
+
+def test_gather_with_concurrency_limit_error():
+    async def task(value):
+        if value == 2:
+            raise ValueError("bad value")
+        return value
+
+    with pytest.raises(ValueError, match="bad value"):
+        asyncio.run(
+            async_pipeline_runs_logic.gather_with_concurrency_limit(
+                task(i) for i in range(5)
+            )
+        )
+
+
+def test_get_pipeline_run_statuses():
+    test_job_ids = [uuid.uuid4() for _ in range(5)]
+    test_statuses = {job_id: mock() for job_id in test_job_ids}
+    for job_id, status in test_statuses.items():
+        when(async_pipeline_runs_logic.pipeline_runs_logic).get_pipeline_run_status(
+            job_id
+        ).thenReturn(status)
+
+    # duplicate job ids are only checked once
+    result = asyncio.run(
+        async_pipeline_runs_logic.get_pipeline_run_statuses(
+            test_job_ids + test_job_ids[:2], max_concurrent_requests=2
+        )
+    )
+
+    assert result == test_statuses
+    verify(
+        async_pipeline_runs_logic.pipeline_runs_logic, times=5
+    ).get_pipeline_run_status(...)
+
+
+def test_get_pipeline_run_statuses_runs_all_slots_at_once():
+    # more than the event loop's default executor has threads on most machines
+    n_jobs = 40
+    all_running = threading.Barrier(n_jobs, timeout=10)
+
+    def get_status(job_id):
+        all_running.wait()
+        return job_id
+
+    when(async_pipeline_runs_logic.pipeline_runs_logic).get_pipeline_run_status(
+        ...
+    ).thenAnswer(get_status)
+    test_job_ids = [uuid.uuid4() for _ in range(n_jobs)]
+
+    result = asyncio.run(
+        async_pipeline_runs_logic.get_pipeline_run_statuses(
+            test_job_ids, max_concurrent_requests=n_jobs
+        )
+    )
+
+    assert result == {job_id: job_id for job_id in test_job_ids}
+
+
+def test_prepare_pipeline_run():
+    test_job_id = str(uuid.uuid4())
+    test_upload_urls = {"input_file": "signed_url"}
+    when(async_pipeline_runs_logic.pipeline_runs_logic).prepare_pipeline_run(
+        "pipeline", test_job_id, 1, {"input_file": "file.txt"}, "description", True
+    ).thenReturn(test_upload_urls)
+
+    result = asyncio.run(
+        async_pipeline_runs_logic.prepare_pipeline_run(
+            "pipeline",
+            test_job_id,
+            1,
+            {"input_file": "file.txt"},
+            "description",
+            True,
+        )
+    )
+
+    assert result == test_upload_urls
+
+
+def test_upload_input_files():
+    test_pipeline_inputs = {"input_a": "a.txt", "input_b": "b.txt", "other": 3}
+    test_upload_urls = {"input_a": "signed_url_a", "input_b": "signed_url_b"}
+    uploaded = []
+
+    def fake_upload(local_file_path, signed_url, compress, cancel_event):
+        uploaded.append((local_file_path, signed_url, compress))
+
+    when(async_pipeline_runs_logic).upload_file_with_signed_url(...).thenAnswer(
+        fake_upload
+    )
+
+    asyncio.run(
+        async_pipeline_runs_logic.upload_input_files(
+            test_upload_urls, test_pipeline_inputs, compress_inputs=True
+        )
+    )
+
+    assert sorted(uploaded) == [
+        ("a.txt", "signed_url_a", True),
+        ("b.txt", "signed_url_b", True),
+    ]
+
+
+def test_upload_input_files_failure_cancels_the_others():
+    test_upload_urls = {"input_a": "signed_url_a", "input_b": "signed_url_b"}
+    cancel_events = []
+
+    def fake_upload(local_file_path, signed_url, compress, cancel_event):
+        cancel_events.append(cancel_event)
+        if signed_url == "signed_url_a":
+            raise TransferError("Error uploading file: failed")
+        cancel_event.wait(5)
+
+    when(async_pipeline_runs_logic).upload_file_with_signed_url(...).thenAnswer(
+        fake_upload
+    )
+
+    with pytest.raises(TransferError):
+        asyncio.run(
+            async_pipeline_runs_logic.upload_input_files(
+                test_upload_urls, {"input_a": "a.txt", "input_b": "b.txt"}
+            )
+        )
+
+    assert all(cancel_event.is_set() for cancel_event in cancel_events)
+
+
+def test_download_pipeline_run_outputs():
+    test_job_id = uuid.uuid4()
+    # delegates to the logic function the download command uses
+    when(async_pipeline_runs_logic.pipeline_runs_logic).download_pipeline_run_outputs(
+        test_job_id, "dest", ("output_a",), (), (), "{output_name}/{file_name}", 4
+    ).thenReturn(["dest/output_a/url_a"])
+
+    result = asyncio.run(
+        async_pipeline_runs_logic.download_pipeline_run_outputs(
+            test_job_id,
+            "dest",
+            ("output_a",),
+            layout="{output_name}/{file_name}",
+            max_concurrent_transfers=4,
+        )
+    )
+
+    assert result == ["dest/output_a/url_a"]
+
+
+def test_import_has_no_side_effects():
+    # the API executor is only created when a call needs it
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from terralab.logic import async_pipeline_runs_logic; "
+            "assert async_pipeline_runs_logic._api_executor is None",
+        ],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
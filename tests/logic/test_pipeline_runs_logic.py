@@ -1,9 +1,12 @@
 # tests/logic/test_pipeline_runs_logic.py
 
+import io
+import os
+import threading
 import uuid
 
 import pytest
-from mockito import when, mock, verify, times
+from mockito import ANY, when, mock, verify, times
 from teaspoons_client import (
     ApiException,
     PreparePipelineRunRequestBodyV2,
@@ -13,6 +16,11 @@ from teaspoons_client import (
 )
 
 from terralab.logic import pipeline_runs_logic
+from terralab.client import use_api_client
+from terralab.exceptions import InputValidationError
+from terralab.gcs_helper import CloudObjectChecker
+from terralab.upload_index import UploadIndex
+from terralab.utils import DEFAULT_MAX_CONCURRENT_TRANSFERS, UploadCancelledError
 from tests.conftest import capture_logs
 
 pytestmark = pytest.mark.usefixtures("unstub_fixture")
@@ -244,7 +252,7 @@ def test_prepare_upload_start_pipeline_run_local_input():
     ).thenReturn(test_upload_url_dict)
 
     when(pipeline_runs_logic).upload_file_with_signed_url(
-        test_input_value, test_signed_url
+        test_input_value, test_signed_url, cancel_event=ANY, progress_position=ANY
     )  # do nothing
 
     when(pipeline_runs_logic).start_pipeline_run(test_job_id_str).thenReturn(
@@ -258,6 +266,100 @@ def test_prepare_upload_start_pipeline_run_local_input():
     assert response == test_job_id
 
 
+def test_prepare_upload_start_pipeline_run_uploads_concurrently():
+    test_pipeline_name = "foobar"
+    test_pipeline_version = 0
+    test_inputs = {"input1": "value1", "input2": "value2"}
+    test_description = "user-provided description"
+
+    test_job_id = uuid.uuid4()
+    test_job_id_str = str(test_job_id)
+    when(pipeline_runs_logic.uuid).uuid4().thenReturn(test_job_id)
+
+    when(pipeline_runs_logic).prepare_pipeline_run(
+        test_pipeline_name,
+        test_job_id_str,
+        test_pipeline_version,
+        test_inputs,
+        test_description,
+        True,
+    ).thenReturn({"input1": "signed_url1", "input2": "signed_url2"})
+
+    # each upload waits for the other to start, so this only finishes if they run at the same time
+    both_uploading = threading.Barrier(2, timeout=5)
+    uploaded = []
+
+    def upload(local_file_path, signed_url, cancel_event, progress_position):
+        both_uploading.wait()
+        uploaded.append(local_file_path)
+
+    when(pipeline_runs_logic).upload_file_with_signed_url(...).thenAnswer(upload)
+
+    def start(job_id):
+        # the job only starts once all uploads have finished
+        assert sorted(uploaded) == ["value1", "value2"]
+        return test_job_id
+
+    when(pipeline_runs_logic).start_pipeline_run(test_job_id_str).thenAnswer(start)
+
+    response = pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        test_pipeline_name, test_pipeline_version, test_inputs, test_description, True
+    )
+
+    assert response == test_job_id
+
+
+def test_prepare_upload_start_pipeline_run_upload_fails():
+    test_pipeline_name = "foobar"
+    test_pipeline_version = 0
+    test_inputs = {"input1": "value1", "input2": "value2"}
+    test_description = "user-provided description"
+
+    test_job_id = uuid.uuid4()
+    test_job_id_str = str(test_job_id)
+    when(pipeline_runs_logic.uuid).uuid4().thenReturn(test_job_id)
+
+    when(pipeline_runs_logic).prepare_pipeline_run(
+        test_pipeline_name,
+        test_job_id_str,
+        test_pipeline_version,
+        test_inputs,
+        test_description,
+        True,
+    ).thenReturn({"input1": "signed_url1", "input2": "signed_url2"})
+    second_upload_started = threading.Event()
+    second_upload_cancelled = []
+
+    def fail_upload(local_file_path, signed_url, cancel_event, progress_position):
+        second_upload_started.wait(5)
+        raise SystemExit(1)
+
+    def long_upload(local_file_path, signed_url, cancel_event, progress_position):
+        second_upload_started.set()
+        # stops as soon as the other upload fails, rather than running to the end
+        second_upload_cancelled.append(cancel_event.wait(5))
+        raise UploadCancelledError("Upload cancelled")
+
+    when(pipeline_runs_logic).upload_file_with_signed_url(
+        "value1", "signed_url1", cancel_event=ANY, progress_position=ANY
+    ).thenAnswer(fail_upload)
+    when(pipeline_runs_logic).upload_file_with_signed_url(
+        "value2", "signed_url2", cancel_event=ANY, progress_position=ANY
+    ).thenAnswer(long_upload)
+
+    with pytest.raises(SystemExit):
+        pipeline_runs_logic.prepare_upload_start_pipeline_run(
+            test_pipeline_name,
+            test_pipeline_version,
+            test_inputs,
+            test_description,
+            True,
+        )
+
+    assert second_upload_cancelled == [True]
+    verify(pipeline_runs_logic, times(0)).start_pipeline_run(...)
+
+
 def test_prepare_upload_start_pipeline_run_cloud_input():
     test_pipeline_name = "foobar"
     test_pipeline_version = 0
@@ -360,6 +462,20 @@ def test_get_pipeline_runs(mock_pipeline_runs_api):
     verify(mock_pipeline_runs_api).get_all_pipeline_runs_v2(page_number=2, page_size=5)
 
 
+def test_iter_pipeline_runs_fetches_pages_lazily(mock_pipeline_runs_api):
+    test_pipeline_runs_10 = [mock() for _ in range(10)]
+    mock_response = mock({"results": test_pipeline_runs_10, "total_results": 20})
+    when(mock_pipeline_runs_api).get_all_pipeline_runs_v2(...).thenReturn(mock_response)
+
+    results = pipeline_runs_logic.iter_pipeline_runs(20)
+
+    # the first page is yielded before the second page is requested
+    assert [next(results) for _ in range(10)] == test_pipeline_runs_10
+    verify(mock_pipeline_runs_api, times(1)).get_all_pipeline_runs_v2(...)
+    assert len(list(results)) == 10
+    verify(mock_pipeline_runs_api, times(2)).get_all_pipeline_runs_v2(...)
+
+
 def test_get_pipeline_runs_requested_more_than_total(mock_pipeline_runs_api):
     test_n_results_requested = 15
     test_pipeline_runs_10 = [mock() for _ in range(10)]
@@ -441,10 +557,16 @@ def test_get_signed_urls_and_download_pipeline_run_outputs(capture_logs):
     when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
         test_job_id
     ).thenReturn(pipeline_run_output_signed_urls_response)
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn(
+        {test_output_name: None}
+    )
 
     expected_downloaded_file_paths = ["i am a file path"]
     when(pipeline_runs_logic).download_files_with_signed_urls(
-        test_local_destination, [test_signed_url]
+        test_local_destination,
+        [test_signed_url],
+        ["local/path/signed_url"],
+        DEFAULT_MAX_CONCURRENT_TRANSFERS,
     ).thenReturn(
         expected_downloaded_file_paths
     )  # do nothing
@@ -457,7 +579,10 @@ def test_get_signed_urls_and_download_pipeline_run_outputs(capture_logs):
 
     verify(pipeline_runs_logic).get_pipeline_run_output_signed_urls(test_job_id)
     verify(pipeline_runs_logic).download_files_with_signed_urls(
-        test_local_destination, [test_signed_url]
+        test_local_destination,
+        [test_signed_url],
+        ["local/path/signed_url"],
+        DEFAULT_MAX_CONCURRENT_TRANSFERS,
     )
 
 
@@ -549,3 +674,481 @@ def test_deliver_pipeline_run_to_cloud_error(mock_pipeline_runs_api):
         pipeline_runs_logic.deliver_pipeline_run_to_cloud(
             test_job_id, test_destination_gcs_path
         )
+
+
+def test_get_local_file_inputs():
+    file_input = mock({"name": "vcf", "type": "FILE", "file_suffix": ".vcf.gz"})
+    cloud_input = mock({"name": "reference", "type": "FILE", "file_suffix": None})
+    string_input = mock({"name": "basename", "type": "STRING", "file_suffix": None})
+    pipeline_info = mock({"inputs": [file_input, cloud_input, string_input]})
+
+    assert pipeline_runs_logic.get_local_file_inputs(
+        pipeline_info,
+        {"vcf": "local.vcf.gz", "reference": "gs://bucket/ref", "basename": "out"},
+    ) == {"vcf": ("local.vcf.gz", ".vcf.gz")}
+
+
+TEST_UPLOAD_SCOPE = "user@example.com https://teaspoons.example.com"
+TEST_PIPELINE_INFO = mock({"name": "foobar"})
+
+
+def test_prepare_upload_start_pipeline_run_reuse_uploads(tmp_path):
+    test_pipeline_name = "foobar"
+    test_job_id = uuid.uuid4()
+    test_job_id_str = str(test_job_id)
+    when(pipeline_runs_logic.uuid).uuid4().thenReturn(test_job_id)
+    reused_file = str(tmp_path / "reference.vcf.gz")
+    new_file = str(tmp_path / "samples.vcf.gz")
+    for local_file_path in (reused_file, new_file):
+        with open(local_file_path, "w") as f:
+            f.write(local_file_path)
+    test_inputs = {"reference": reused_file, "samples": new_file, "basename": "out"}
+    upload_index = UploadIndex(str(tmp_path / "upload_index.json"), TEST_UPLOAD_SCOPE)
+    upload_index.record(reused_file, "gs://bucket/earlier_job/reference.vcf.gz")
+    when(pipeline_runs_logic).get_upload_scope().thenReturn(TEST_UPLOAD_SCOPE)
+    when(pipeline_runs_logic).get_upload_index(TEST_UPLOAD_SCOPE).thenReturn(
+        upload_index
+    )
+    # the earlier upload still exists
+    cloud_object_checker = mock(CloudObjectChecker)
+    when(cloud_object_checker).get_object_size(
+        "gs://bucket/earlier_job/reference.vcf.gz"
+    ).thenReturn(len(reused_file))
+    # the pipeline definition fetched to validate the inputs is used, rather than fetched again
+    when(pipeline_runs_logic.pipelines_logic).get_pipeline_info(...).thenRaise(
+        AssertionError("the pipeline definition shouldn't be fetched again")
+    )
+    when(pipeline_runs_logic).get_local_file_inputs(
+        TEST_PIPELINE_INFO, test_inputs
+    ).thenReturn(
+        {"reference": (reused_file, ".vcf.gz"), "samples": (new_file, ".vcf.gz")}
+    )
+
+    test_signed_url = "https://storage.googleapis.com/bucket/this_job/samples.vcf.gz?X-Goog-Signature=abc"
+    when(pipeline_runs_logic).prepare_pipeline_run(
+        test_pipeline_name,
+        test_job_id_str,
+        0,
+        test_inputs | {"reference": "gs://bucket/earlier_job/reference.vcf.gz"},
+        "",
+        True,
+    ).thenReturn({"samples": test_signed_url})
+    when(pipeline_runs_logic).upload_file_with_signed_url(
+        new_file, test_signed_url, cancel_event=ANY, progress_position=ANY
+    )  # do nothing
+    when(pipeline_runs_logic).start_pipeline_run(test_job_id_str).thenReturn(
+        test_job_id
+    )
+
+    response = pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        test_pipeline_name,
+        0,
+        test_inputs,
+        "",
+        True,
+        reuse_uploads=True,
+        pipeline_info=TEST_PIPELINE_INFO,
+        cloud_object_checker=cloud_object_checker,
+    )
+
+    assert response == test_job_id
+    verify(pipeline_runs_logic, times(1)).upload_file_with_signed_url(...)
+    # the new upload is recorded for the next job
+    assert upload_index.find(new_file) == "gs://bucket/this_job/samples.vcf.gz"
+    # the pipeline definition fetched to validate the inputs is used, rather than fetched again
+    verify(pipeline_runs_logic.pipelines_logic, times(0)).get_pipeline_info(...)
+
+
+def test_get_upload_scope():
+    api_client = mock(
+        {
+            "configuration": mock(
+                {"access_token": "token", "host": "https://teaspoons.example.com"}
+            )
+        }
+    )
+    when(pipeline_runs_logic)._get_email_from_token("token").thenReturn(
+        "user@example.com"
+    )
+
+    with use_api_client(api_client):
+        assert (
+            pipeline_runs_logic.get_upload_scope()
+            == "user@example.com https://teaspoons.example.com"
+        )
+
+
+@pytest.mark.parametrize(
+    "object_size, cloud_object_checker_given",
+    [(None, True), (PermissionError("access denied"), True), (10, False)],
+)
+def test_prepare_upload_start_pipeline_run_reuse_uploads_unavailable(
+    tmp_path, capture_logs, object_size, cloud_object_checker_given
+):
+    test_pipeline_name = "foobar"
+    test_job_id = uuid.uuid4()
+    test_job_id_str = str(test_job_id)
+    when(pipeline_runs_logic.uuid).uuid4().thenReturn(test_job_id)
+    local_file = str(tmp_path / "reference.vcf.gz")
+    with open(local_file, "w") as f:
+        f.write("reference")
+    test_inputs = {"reference": local_file}
+    earlier_upload = f"gs://bucket/earlier_job_{uuid.uuid4()}/reference.vcf.gz"
+    upload_index = UploadIndex(str(tmp_path / "upload_index.json"), TEST_UPLOAD_SCOPE)
+    upload_index.record(local_file, earlier_upload)
+    when(pipeline_runs_logic).get_upload_scope().thenReturn(TEST_UPLOAD_SCOPE)
+    when(pipeline_runs_logic).get_upload_index(TEST_UPLOAD_SCOPE).thenReturn(
+        upload_index
+    )
+    when(pipeline_runs_logic).get_local_file_inputs(
+        TEST_PIPELINE_INFO, test_inputs
+    ).thenReturn({"reference": (local_file, ".vcf.gz")})
+    cloud_object_checker = mock(CloudObjectChecker)
+    if isinstance(object_size, Exception):
+        when(cloud_object_checker).get_object_size(earlier_upload).thenRaise(
+            object_size
+        )
+    else:
+        when(cloud_object_checker).get_object_size(earlier_upload).thenReturn(
+            object_size
+        )
+
+    # the earlier upload can't be used, so the file is uploaded again
+    test_signed_url = "https://storage.googleapis.com/bucket/this_job/reference.vcf.gz?X-Goog-Signature=abc"
+    when(pipeline_runs_logic).prepare_pipeline_run(
+        test_pipeline_name, test_job_id_str, 0, test_inputs, "", True
+    ).thenReturn({"reference": test_signed_url})
+    when(pipeline_runs_logic).upload_file_with_signed_url(
+        local_file, test_signed_url, cancel_event=ANY, progress_position=ANY
+    )  # do nothing
+    when(pipeline_runs_logic).start_pipeline_run(test_job_id_str).thenReturn(
+        test_job_id
+    )
+
+    pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        test_pipeline_name,
+        0,
+        test_inputs,
+        "",
+        True,
+        reuse_uploads=True,
+        pipeline_info=TEST_PIPELINE_INFO,
+        cloud_object_checker=(
+            cloud_object_checker if cloud_object_checker_given else None
+        ),
+    )
+
+    verify(pipeline_runs_logic, times(1)).upload_file_with_signed_url(
+        local_file, test_signed_url, cancel_event=ANY, progress_position=ANY
+    )
+    assert upload_index.find(local_file) == "gs://bucket/this_job/reference.vcf.gz"
+    assert "uploading the file" in capture_logs.text
+
+
+def test_prepare_upload_start_pipeline_run_reuse_uploads_named_pipe(tmp_path):
+    test_pipeline_name = "foobar"
+    test_job_id = uuid.uuid4()
+    test_job_id_str = str(test_job_id)
+    when(pipeline_runs_logic.uuid).uuid4().thenReturn(test_job_id)
+    pipe_path = str(tmp_path / "samples.vcf.gz")
+    os.mkfifo(pipe_path)
+    test_inputs = {"samples": pipe_path}
+    # a pipe's data can only be read once, so it must not be looked up or recorded
+    upload_index = mock(UploadIndex, strict=True)
+    when(pipeline_runs_logic).get_upload_scope().thenReturn(TEST_UPLOAD_SCOPE)
+    when(pipeline_runs_logic).get_upload_index(TEST_UPLOAD_SCOPE).thenReturn(
+        upload_index
+    )
+    when(pipeline_runs_logic).get_local_file_inputs(
+        TEST_PIPELINE_INFO, test_inputs
+    ).thenReturn({"samples": (pipe_path, ".vcf.gz")})
+    test_signed_url = "https://storage.googleapis.com/bucket/this_job/samples.vcf.gz?X-Goog-Signature=abc"
+    when(pipeline_runs_logic).prepare_pipeline_run(
+        test_pipeline_name, test_job_id_str, 0, test_inputs, "", True
+    ).thenReturn({"samples": test_signed_url})
+    when(pipeline_runs_logic).upload_file_with_signed_url(
+        pipe_path, test_signed_url, cancel_event=ANY, progress_position=ANY
+    )  # do nothing
+    when(pipeline_runs_logic).start_pipeline_run(test_job_id_str).thenReturn(
+        test_job_id
+    )
+
+    response = pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        test_pipeline_name,
+        0,
+        test_inputs,
+        "",
+        True,
+        reuse_uploads=True,
+        pipeline_info=TEST_PIPELINE_INFO,
+    )
+
+    assert response == test_job_id
+    verify(pipeline_runs_logic, times(1)).upload_file_with_signed_url(
+        pipe_path, test_signed_url, cancel_event=ANY, progress_position=ANY
+    )
+
+
+def test_get_signed_urls_and_download_pipeline_run_outputs_not_enough_space(
+    capture_logs, tmp_path
+):
+    test_job_id = uuid.uuid4()
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(mock({"output_signed_urls": {"output1": "signed_url"}}))
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn(
+        {"output1": 2**60}
+    )
+
+    with pytest.raises(SystemExit):
+        pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
+            test_job_id, str(tmp_path)
+        )
+
+    assert "Not enough disk space to download" in capture_logs.text
+    verify(pipeline_runs_logic, times(0)).download_files_with_signed_urls(...)
+
+
+def test_get_pipeline_run_output_sizes():
+    test_job_id = uuid.uuid4()
+    outputs = {
+        "output1": {"value": "gs://bucket/output1", "metadata": {"sizeInBytes": 100}},
+        "output2": {"value": "gs://bucket/output2"},
+    }
+    when(pipeline_runs_logic).get_pipeline_run_status(test_job_id).thenReturn(
+        mock({"pipeline_run_report": mock({"outputs": outputs})})
+    )
+
+    assert pipeline_runs_logic.get_pipeline_run_output_sizes(test_job_id) == {
+        "output1": 100,
+        "output2": None,
+    }
+
+
+def test_get_signed_urls_and_download_pipeline_run_outputs_selected(tmp_path):
+    test_job_id = uuid.uuid4()
+    test_local_destination = str(tmp_path)
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(
+        mock(
+            {
+                "output_signed_urls": {
+                    "imputedVcf": "signed_url_1",
+                    "qcMetrics": "signed_url_2",
+                }
+            }
+        )
+    )
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn(
+        {"imputedVcf": 2**60, "qcMetrics": 10}
+    )
+    when(pipeline_runs_logic).download_files_with_signed_urls(
+        test_local_destination,
+        ["signed_url_2"],
+        [os.path.join(test_local_destination, "signed_url_2")],
+        DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    ).thenReturn(["qcMetrics.txt"])
+
+    # the unselected output is too big to download, but isn't counted
+    assert pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
+        test_job_id,
+        test_local_destination,
+        include_patterns=("*Metrics",),
+    ) == ["qcMetrics.txt"]
+
+    verify(pipeline_runs_logic).download_files_with_signed_urls(
+        test_local_destination,
+        ["signed_url_2"],
+        [os.path.join(test_local_destination, "signed_url_2")],
+        DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    )
+
+
+@pytest.mark.parametrize(
+    "output_names, include_patterns, exclude_patterns, expected",
+    [
+        ((), (), (), ["vcf", "vcfIndex", "metrics"]),
+        (("metrics",), (), (), ["metrics"]),
+        ((), ("vcf*",), (), ["vcf", "vcfIndex"]),
+        (("metrics",), ("vcf",), (), ["vcf", "metrics"]),
+        ((), (), ("*Index",), ["vcf", "metrics"]),
+        ((), ("vcf*",), ("*Index",), ["vcf"]),
+    ],
+)
+def test_select_output_names(
+    output_names, include_patterns, exclude_patterns, expected
+):
+    assert (
+        pipeline_runs_logic.select_output_names(
+            ["vcf", "vcfIndex", "metrics"],
+            output_names,
+            include_patterns,
+            exclude_patterns,
+        )
+        == expected
+    )
+
+
+def test_select_output_names_unknown_name():
+    with pytest.raises(InputValidationError) as e:
+        pipeline_runs_logic.select_output_names(["vcf", "metrics"], ("bam",))
+
+    assert e.value.errors == ["Unknown output(s): bam. Available outputs: vcf, metrics"]
+
+
+def test_select_output_names_no_match():
+    with pytest.raises(
+        InputValidationError, match="No outputs match the given filters"
+    ):
+        pipeline_runs_logic.select_output_names(
+            ["vcf", "metrics"], include_patterns=("*.bam",)
+        )
+
+
+def test_list_pipeline_run_outputs_unknown_name(capture_logs):
+    test_job_id = uuid.uuid4()
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn(
+        {"vcf": 100, "metrics": None}
+    )
+
+    with pytest.raises(SystemExit):
+        pipeline_runs_logic.list_pipeline_run_outputs(test_job_id, ("bam",))
+
+    assert "Unknown output(s): bam" in capture_logs.text
+
+
+def test_download_pipeline_run_outputs_raises(tmp_path):
+    test_job_id = uuid.uuid4()
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(mock({"output_signed_urls": {"output1": "signed_url"}}))
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn(
+        {"output1": 2**60}
+    )
+
+    # unlike get_signed_urls_and_download_pipeline_run_outputs, doesn't exit
+    with pytest.raises(InputValidationError, match="Not enough disk space"):
+        pipeline_runs_logic.download_pipeline_run_outputs(test_job_id, str(tmp_path))
+    with pytest.raises(InputValidationError, match="Unknown output"):
+        pipeline_runs_logic.download_pipeline_run_outputs(
+            test_job_id, str(tmp_path), ("bam",)
+        )
+
+
+def test_list_pipeline_run_outputs():
+    test_job_id = uuid.uuid4()
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn(
+        {"vcf": 100, "metrics": None}
+    )
+
+    assert pipeline_runs_logic.list_pipeline_run_outputs(
+        test_job_id, exclude_patterns=("vcf",)
+    ) == {"metrics": None}
+    verify(pipeline_runs_logic, times(0)).get_pipeline_run_output_signed_urls(...)
+
+
+def test_stream_pipeline_run_output(capture_logs):
+    test_job_id = uuid.uuid4()
+    out_file = io.BytesIO()
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(
+        mock({"output_signed_urls": {"vcf": "signed_url_1", "metrics": "signed_url_2"}})
+    )
+    when(pipeline_runs_logic).stream_signed_url("signed_url_2", out_file).thenReturn(
+        2048
+    )
+
+    assert (
+        pipeline_runs_logic.stream_pipeline_run_output(
+            test_job_id, out_file, ("metrics",)
+        )
+        == 2048
+    )
+    assert "Streamed output metrics (2.0 KiB)" in capture_logs.text
+
+
+def test_stream_pipeline_run_output_more_than_one(capture_logs):
+    test_job_id = uuid.uuid4()
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(
+        mock({"output_signed_urls": {"vcf": "signed_url_1", "metrics": "signed_url_2"}})
+    )
+
+    with pytest.raises(SystemExit):
+        pipeline_runs_logic.stream_pipeline_run_output(test_job_id, io.BytesIO())
+
+    assert "Only one output can be streamed at a time" in capture_logs.text
+    verify(pipeline_runs_logic, times(0)).stream_signed_url(...)
+
+
+def test_stream_pipeline_run_output_reader_closed_pipe(capture_logs):
+    test_job_id = uuid.uuid4()
+    out_file = io.BytesIO()
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(mock({"output_signed_urls": {"vcf": "signed_url_1"}}))
+    when(pipeline_runs_logic).stream_signed_url("signed_url_1", out_file).thenRaise(
+        BrokenPipeError()
+    )
+
+    assert pipeline_runs_logic.stream_pipeline_run_output(test_job_id, out_file) == 0
+    assert "the reader closed the pipe" in capture_logs.text
+
+
+def test_get_signed_urls_and_download_pipeline_run_outputs_layout(tmp_path):
+    test_job_id = uuid.uuid4()
+    signed_urls = {
+        "vcf": "https://storage.googleapis.com/bucket/chunk1/out.vcf.gz?sig",
+        "vcfIndex": "https://storage.googleapis.com/bucket/chunk2/out.vcf.gz?sig",
+    }
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(mock({"output_signed_urls": signed_urls}))
+    when(pipeline_runs_logic).get_pipeline_run_output_sizes(test_job_id).thenReturn({})
+    expected_paths = [
+        str(tmp_path / str(test_job_id) / "vcf" / "out.vcf.gz"),
+        str(tmp_path / str(test_job_id) / "vcfIndex" / "out.vcf.gz"),
+    ]
+    when(pipeline_runs_logic).download_files_with_signed_urls(
+        str(tmp_path),
+        list(signed_urls.values()),
+        expected_paths,
+        DEFAULT_MAX_CONCURRENT_TRANSFERS,
+    ).thenReturn(expected_paths)
+
+    assert (
+        pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
+            test_job_id, str(tmp_path), layout="{job_id}/{output_name}/{file_name}"
+        )
+        == expected_paths
+    )
+
+
+def test_get_signed_urls_and_download_pipeline_run_outputs_collision(
+    capture_logs, tmp_path
+):
+    test_job_id = uuid.uuid4()
+    when(pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        test_job_id
+    ).thenReturn(
+        mock(
+            {
+                "output_signed_urls": {
+                    "vcf": "https://storage.googleapis.com/bucket/chunk1/out.vcf.gz?sig",
+                    "vcfIndex": "https://storage.googleapis.com/bucket/chunk2/out.vcf.gz?sig",
+                }
+            }
+        )
+    )
+
+    with pytest.raises(SystemExit):
+        pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
+            test_job_id, str(tmp_path)
+        )
+
+    assert "Some outputs would be downloaded to the same place" in capture_logs.text
+    assert "vcf and vcfIndex" in capture_logs.text
+    verify(pipeline_runs_logic, times(0)).download_files_with_signed_urls(...)
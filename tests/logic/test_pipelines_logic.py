@@ -1,7 +1,9 @@
 # tests/logic/test_pipelines_logic.py
 
+import contextvars
 import os
 import tempfile
+import threading
 
 import pytest
 from mockito import when, mock, verify
@@ -12,6 +14,7 @@ from terralab.constants import (
     FILE_TYPE_KEY,
     INTEGER_TYPE_KEY,
     STRING_ARRAY_TYPE_KEY,
+    FILE_ARRAY_TYPE_KEY,
 )
 from terralab.logic import pipelines_logic
 from tests.conftest import capture_logs
@@ -193,9 +196,12 @@ def test_validate_pipeline_inputs(input: dict, error_messages: list[str], captur
         for message in error_messages:
             assert message in capture_logs.text
     else:
-        # Should succeed with valid inputs
-        pipelines_logic.validate_pipeline_inputs(
-            TEST_PIPELINE_NAME, TEST_VERSION, input
+        # Should succeed with valid inputs, returning the pipeline definition for submitting
+        assert (
+            pipelines_logic.validate_pipeline_inputs(
+                TEST_PIPELINE_NAME, TEST_VERSION, input
+            )
+            == mock_pipeline_info
         )
 
 
@@ -268,3 +274,125 @@ def test_validate_pipeline_inputs_file(
             pipelines_logic.validate_pipeline_inputs(
                 TEST_PIPELINE_NAME, TEST_VERSION, input
             )
+
+
+def test_validate_pipeline_inputs_prevalidate_cloud(capture_logs):
+    mock_pipeline_info = mock()
+    mock_input1 = mock()
+    mock_input1.name = FILE_INPUT_KEY
+    mock_input1.type = FILE_TYPE_KEY
+    mock_input1.is_required = True
+    mock_input2 = mock()
+    mock_input2.name = "file_array_input"
+    mock_input2.type = FILE_ARRAY_TYPE_KEY
+    mock_input2.is_required = True
+    mock_pipeline_info.inputs = [mock_input1, mock_input2]
+
+    when(pipelines_logic).get_pipeline_info(
+        TEST_PIPELINE_NAME, TEST_VERSION
+    ).thenReturn(mock_pipeline_info)
+
+    mock_checker = mock()
+    when(pipelines_logic).check_cloud_objects(...).thenReturn(
+        {
+            "gs://bucket/file": 1024,
+            "gs://bucket/a": 1024,
+            "gs://bucket/missing_1": None,
+            "gs://bucket/missing_2": None,
+        }
+    )
+
+    with pytest.raises(SystemExit):
+        pipelines_logic.validate_pipeline_inputs(
+            TEST_PIPELINE_NAME,
+            TEST_VERSION,
+            {
+                FILE_INPUT_KEY: "gs://bucket/file",
+                "file_array_input": [
+                    "gs://bucket/a",
+                    "gs://bucket/missing_1",
+                    "gs://bucket/missing_2",
+                ],
+            },
+            mock_checker,
+        )
+
+    # all missing objects are reported together
+    for missing_path in ["gs://bucket/missing_1", "gs://bucket/missing_2"]:
+        assert (
+            f"Error: Could not find cloud file for input 'file_array_input': '{missing_path}'."
+            in capture_logs.text
+        )
+    assert "Found 2 cloud input files (2.0 KiB total)" in capture_logs.text
+    verify(pipelines_logic).check_cloud_objects(
+        [
+            "gs://bucket/file",
+            "gs://bucket/a",
+            "gs://bucket/missing_1",
+            "gs://bucket/missing_2",
+        ],
+        mock_checker,
+    )
+
+
+@pytest.mark.usefixtures("unstub_fixture")
+def test_validate_pipeline_inputs_checks_only_file_inputs_in_cloud():
+    mock_pipeline_info = mock()
+    mock_file_input = mock()
+    mock_file_input.name = FILE_INPUT_KEY
+    mock_file_input.type = FILE_TYPE_KEY
+    mock_file_input.is_required = True
+    mock_string_input = mock()
+    mock_string_input.name = "output_prefix"
+    mock_string_input.type = STRING_TYPE_KEY
+    mock_string_input.is_required = True
+    mock_pipeline_info.inputs = [mock_file_input, mock_string_input]
+    when(pipelines_logic).get_pipeline_info(
+        TEST_PIPELINE_NAME, TEST_VERSION
+    ).thenReturn(mock_pipeline_info)
+
+    test_context_var = contextvars.ContextVar("test_context_var")
+    test_context_var.set("caller's value")
+    checked = []
+
+    def fake_check_cloud_objects(gcs_paths, checker):
+        checked.append((gcs_paths, test_context_var.get(None)))
+        return {"gs://bucket/file": 1024}
+
+    mock_checker = mock()
+    when(pipelines_logic).check_cloud_objects(...).thenAnswer(fake_check_cloud_objects)
+
+    assert (
+        pipelines_logic.get_pipeline_input_errors(
+            TEST_PIPELINE_NAME,
+            TEST_VERSION,
+            {FILE_INPUT_KEY: "gs://bucket/file", "output_prefix": "gs://not/a/file"},
+            mock_checker,
+        )
+        == []
+    )
+
+    # the string input isn't looked up, and the check runs in the caller's context
+    assert checked == [(["gs://bucket/file"], "caller's value")]
+
+
+@pytest.mark.usefixtures("unstub_fixture")
+def test_validate_pipeline_inputs_no_cloud_check_without_pipeline():
+    when(pipelines_logic).get_pipeline_info(TEST_PIPELINE_NAME, TEST_VERSION).thenRaise(
+        ApiException(404, reason="not found")
+    )
+    checked = threading.Event()
+    when(pipelines_logic).check_cloud_objects(...).thenAnswer(
+        lambda gcs_paths, checker: checked.set()
+    )
+
+    with pytest.raises(ApiException):
+        pipelines_logic.get_pipeline_input_errors(
+            TEST_PIPELINE_NAME,
+            TEST_VERSION,
+            {FILE_INPUT_KEY: "gs://bucket/file"},
+            mock(),
+        )
+
+    # the input types aren't known, so no cloud files are looked up
+    assert not checked.wait(0.1)
@@ -0,0 +1,142 @@
+# tests/test_agent.py
+
+import os
+import socketserver
+import threading
+
+import pytest
+from mockito import when
+
+from terralab import agent, agent_server
+
+
+class ThreadingAgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves agent requests in threads, so tests don't fork the test runner"""
+
+    daemon_threads = True
+
+
+@pytest.fixture
+def agent_socket_path(tmp_path):
+    socket_path = str(tmp_path / agent.AGENT_SOCKET_FILE_NAME)
+    server = ThreadingAgentServer(socket_path, agent_server.AgentRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_agent_socket_path_env_var(monkeypatch):
+    monkeypatch.setenv(agent.AGENT_SOCKET_ENV_VAR, "/some/agent.sock")
+
+    assert agent.get_agent_socket_path() == "/some/agent.sock"
+
+
+def test_get_agent_socket_path_default(monkeypatch):
+    monkeypatch.delenv(agent.AGENT_SOCKET_ENV_VAR, raising=False)
+
+    socket_path = agent.get_agent_socket_path(
+        config_file=".test.config", package="tests"
+    )
+
+    assert socket_path.endswith(f"/.cool/{agent.AGENT_SOCKET_FILE_NAME}")
+
+
+def test_forward_to_agent_not_running(monkeypatch, tmp_path):
+    monkeypatch.setenv(agent.AGENT_SOCKET_ENV_VAR, str(tmp_path / "missing.sock"))
+    monkeypatch.delenv(agent.NO_AGENT_ENV_VAR, raising=False)
+
+    assert agent.forward_to_agent(["jobs", "list"]) is None
+
+
+def test_forward_to_agent_disabled(monkeypatch, agent_socket_path, unstub_fixture):
+    monkeypatch.setenv(agent.AGENT_SOCKET_ENV_VAR, agent_socket_path)
+    monkeypatch.setenv(agent.NO_AGENT_ENV_VAR, "1")
+    when(agent)._connect(...).thenRaise(AssertionError("should not connect"))
+
+    assert agent.forward_to_agent(["jobs", "list"]) is None
+
+
+def test_forward_to_agent_local_only_command(
+    monkeypatch, agent_socket_path, unstub_fixture
+):
+    monkeypatch.setenv(agent.AGENT_SOCKET_ENV_VAR, agent_socket_path)
+    monkeypatch.delenv(agent.NO_AGENT_ENV_VAR, raising=False)
+    when(agent)._connect(...).thenRaise(AssertionError("should not connect"))
+
+    assert agent.forward_to_agent(["agent", "stop"]) is None
+
+
+def test_forward_to_agent_version_mismatch(monkeypatch, agent_socket_path):
+    monkeypatch.setenv(agent.AGENT_SOCKET_ENV_VAR, agent_socket_path)
+    monkeypatch.delenv(agent.NO_AGENT_ENV_VAR, raising=False)
+    monkeypatch.setattr(agent_server, "__version__", "0.0.0-other")
+
+    # the agent declines to run commands for a different version, so the command runs locally
+    assert agent.forward_to_agent(["jobs", "list"]) is None
+
+
+def test_forward_to_agent_unopened_fd(monkeypatch, agent_socket_path, unstub_fixture):
+    monkeypatch.setenv(agent.AGENT_SOCKET_ENV_VAR, agent_socket_path)
+    monkeypatch.delenv(agent.NO_AGENT_ENV_VAR, raising=False)
+    when(agent)._connect(...).thenRaise(AssertionError("should not connect"))
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    os.close(write_fd)
+
+    # the path can't be forwarded, and would refer to one of the agent's own fds
+    assert (
+        agent.forward_to_agent(["submit", "pipeline", "--input", f"/dev/fd/{read_fd}"])
+        is None
+    )
+
+
+def test_get_referenced_fds():
+    argv = [
+        "submit",
+        "pipeline",
+        "--multiSampleVcf",
+        "/dev/fd/63",
+        "--other=/proc/self/fd/62",
+        "--stdin",
+        "/dev/fd/0",
+        "--again",
+        "/dev/fd/63",
+    ]
+
+    assert agent.get_referenced_fds(argv) == [62, 63]
+
+
+def test_replace_referenced_fds():
+    argv = ["--input", "/dev/fd/63", "--other=/proc/self/fd/62", "/dev/fd/0"]
+
+    assert agent.replace_referenced_fds(argv, {63: 7, 62: 8}) == [
+        "--input",
+        "/dev/fd/7",
+        "--other=/dev/fd/8",
+        "/dev/fd/0",
+    ]
+
+
+def test_send_agent_request_ping(agent_socket_path):
+    response = agent.send_agent_request(agent.PING_REQUEST, agent_socket_path)
+
+    assert isinstance(response["pid"], int)
+    assert response["version"] == agent_server.__version__
+
+
+def test_send_agent_request_not_running(tmp_path):
+    with pytest.raises(OSError):
+        agent.send_agent_request(agent.PING_REQUEST, str(tmp_path / "missing.sock"))
+
+
+def test_encode_decode_message():
+    message = {"request": agent.RUN_REQUEST, "argv": ["jobs", "list"]}
+
+    encoded = agent.encode_message(message)
+
+    assert encoded.endswith(b"\n")
+    assert agent.decode_message(encoded) == message
+    # an empty line means the connection was closed
+    assert agent.decode_message(b"") == {}
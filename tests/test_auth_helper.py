@@ -6,11 +6,13 @@ import os
 import urllib
 
 import pytest
+import jwt
 from jwt import ExpiredSignatureError
 from mockito import when, mock, verify, times
 from oauth2_cli_auth._timeout import TimeoutException
 
 from terralab import auth_helper
+from terralab.exceptions import AuthenticationError
 from tests.conftest import capture_logs
 
 LOGGER = logging.getLogger(__name__)
@@ -167,6 +169,25 @@ def test_get_or_refresh_access_token_none_found(mock_cli_config):
     )
 
 
+def test_get_or_refresh_access_token_none_found_not_interactive(mock_cli_config):
+    # mock no valid access token, no refresh token
+    when(auth_helper)._load_local_token(
+        "mock_oauth_access_token_file", validate=False
+    ).thenReturn(None)
+    when(auth_helper)._load_local_token("mock_access_token_file").thenReturn(None)
+    when(auth_helper)._load_local_token(
+        "mock_refresh_token_file", validate=False
+    ).thenReturn(None)
+    when(auth_helper).get_tokens_with_browser_open(...).thenRaise(
+        AssertionError("should not start a browser login")
+    )
+
+    with pytest.raises(AuthenticationError, match="terralab login"):
+        auth_helper.get_or_refresh_access_token(
+            mock_cli_config, interactive_login=False
+        )
+
+
 def test_get_tokens_with_custom_redirect(mock_cli_config):
     mock_code = mock()
     expected_access_token = "accesstoken"
@@ -467,16 +488,14 @@ def test_exchange_code_for_response_refresh(capture_logs):
     assert "Token refresh successful" in capture_logs.text
 
 
-def test_exchange_code_for_response_bad_grant_type(capture_logs):
+def test_exchange_code_for_response_bad_grant_type():
     unexpected_grant_type = "what is this"
-    with pytest.raises(SystemExit):
+    with pytest.raises(
+        ValueError,
+        match=f"Authentication error: Unexpected grant_type {unexpected_grant_type}",
+    ):
         auth_helper._exchange_code_for_response(mock(), mock(), unexpected_grant_type)
 
-    assert (
-        f"Authentication error: Unexpected grant_type {unexpected_grant_type}"
-        in capture_logs.text
-    )
-
 
 def test_validate_token_valid():
     access_token = "accesstoken"
@@ -597,3 +616,11 @@ def test_save_local_token(mock_builtin_open):
     auth_helper._save_local_token(mock_access_token_file, mock_token)
 
     verify(auth_helper.os).makedirs(mock_dirname, exist_ok=True)
+
+
+def test_get_token_expiry():
+    expiry = 1893456000
+    token = jwt.encode({"exp": expiry}, "a-test-secret-that-is-long-enough-for-hs256")
+
+    assert auth_helper.get_token_expiry(token) == expiry
+    assert auth_helper.get_token_expiry("not-a-jwt") is None
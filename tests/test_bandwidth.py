@@ -0,0 +1,72 @@
+# tests/test_bandwidth.py
+
+import datetime
+
+import pytest
+from mockito import when, verify
+
+from terralab import bandwidth
+
+pytestmark = pytest.mark.usefixtures("unstub_fixture")
+
+
+@pytest.fixture(autouse=True)
+def reset_bandwidth_limit():
+    yield
+    bandwidth.configure_bandwidth_limit(None)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("500", 500),
+        ("500K", 500 * 1024),
+        ("10M", 10 * 1024**2),
+        ("1.5G", 1.5 * 1024**3),
+        ("10MiB/s", 10 * 1024**2),
+        ("2 kb", 2048),
+        ("unlimited", None),
+    ],
+)
+def test_parse_bandwidth(value, expected):
+    assert bandwidth.parse_bandwidth(value) == expected
+
+
+@pytest.mark.parametrize("value", ["fast", "10T", "0", "-1M", ""])
+def test_parse_bandwidth_invalid(value):
+    with pytest.raises(ValueError, match="Invalid bandwidth"):
+        bandwidth.parse_bandwidth(value)
+
+
+def test_parse_schedule():
+    schedule = bandwidth.parse_schedule("08:00-18:00=10M, 18:00-08:00=unlimited")
+
+    assert schedule == [
+        bandwidth.ScheduleWindow(datetime.time(8), datetime.time(18), 10 * 1024**2),
+        bandwidth.ScheduleWindow(datetime.time(18), datetime.time(8), None),
+    ]
+
+
+@pytest.mark.parametrize("value", ["08:00-18:00", "8am-6pm=10M", "08:00-18:00=fast"])
+def test_parse_schedule_invalid(value):
+    with pytest.raises(ValueError, match="Invalid bandwidth schedule window"):
+        bandwidth.parse_schedule(value)
+
+
+def test_get_bytes_per_second_schedule():
+    limiter = bandwidth.BandwidthLimiter(
+        1000, bandwidth.parse_schedule("09:00-17:00=100,22:00-06:00=unlimited")
+    )
+
+    assert limiter.get_bytes_per_second(datetime.datetime(2024, 1, 1, 12)) == 100
+    assert limiter.get_bytes_per_second(datetime.datetime(2024, 1, 1, 17)) == 1000
+    assert limiter.get_bytes_per_second(datetime.datetime(2024, 1, 1, 23)) is None
+    assert limiter.get_bytes_per_second(datetime.datetime(2024, 1, 2, 5)) is None
+
+
+def test_throttle_unlimited():
+    when(bandwidth.time).sleep(...)
+
+    bandwidth.throttle(10**9)
+
+    verify(bandwidth.time, times=0).sleep(...)
@@ -1,8 +1,12 @@
 # tests/test_cli.py
 
+import json
+
+import click
 from click.testing import CliRunner
+from mockito import when
 
-from terralab import cli
+from terralab import cli, profiling, tracing
 
 
 def test_cli():
@@ -22,6 +26,81 @@ def test_cli():
         "pipelines details",
         "quota",
         "logout",
+        "agent",
     ]
     for command in expected_commands:
         assert command in result.output
+
+
+def test_cli_output_option():
+    runner = CliRunner()
+
+    result = runner.invoke(cli.cli, ["--output", "xml", "jobs"])
+
+    assert result.exit_code != 0
+    assert "Invalid value for '--output'" in result.output
+
+
+def test_cli_invalid_bandwidth():
+    runner = CliRunner()
+
+    result = runner.invoke(cli.cli, ["--max-bandwidth", "fast", "jobs"])
+
+    assert result.exit_code != 0
+    assert "Invalid bandwidth 'fast'" in result.output
+
+
+def test_cli_stats_file(unstub_fixture, tmp_path):
+    runner = CliRunner()
+    when(cli).check_version()
+    stats_path = tmp_path / "stats.json"
+
+    result = runner.invoke(
+        cli.cli, ["--stats", "--stats-file", str(stats_path), "jobs", "--help"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert set(json.loads(stats_path.read_text())) == {"uploads", "downloads", "files"}
+
+
+def test_cli_trace_file(unstub_fixture, tmp_path):
+    runner = CliRunner()
+    when(cli).check_version()
+    trace_path = tmp_path / "trace.json"
+
+    try:
+        result = runner.invoke(
+            cli.cli, ["--trace-file", str(trace_path), "jobs", "--help"]
+        )
+    finally:
+        tracing.disable_tracing()
+
+    assert result.exit_code == 0, result.output
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["terralab jobs"]
+
+
+def test_root_flag_options():
+    # profiling finds the end of the root command's options without importing the CLI
+    flag_options = {
+        option
+        for param in cli.cli.params
+        if isinstance(param, click.Option) and param.is_flag
+        for option in param.opts
+    }
+
+    assert flag_options | {"-h", "--help"} == profiling.ROOT_FLAG_OPTIONS
+
+
+def test_cli_profile(unstub_fixture, tmp_path):
+    runner = CliRunner()
+    when(cli).check_version()
+    profile_path = tmp_path / "terralab.prof"
+
+    result = runner.invoke(
+        cli.cli, ["--profile", "--profile-file", str(profile_path), "jobs", "--help"]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert profile_path.exists()
+    assert "--profile" not in runner.invoke(cli.cli, ["-h"]).output
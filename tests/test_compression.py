@@ -0,0 +1,85 @@
+# tests/test_compression.py
+
+import gzip
+import io
+import os
+import struct
+
+import pytest
+
+from terralab import compression
+
+
+def test_compress_bgzf_block():
+    data = b"chr1\t12345\t.\tA\tG\n" * 100
+
+    block = compression.compress_bgzf_block(data)
+
+    assert gzip.decompress(block) == data
+    # the BC extra subfield holds the block size minus 1
+    assert block[12:14] == b"BC"
+    assert struct.unpack("<H", block[16:18])[0] == len(block) - 1
+
+
+def test_compress_bgzf_block_empty_is_eof_marker():
+    assert compression.compress_bgzf_block(b"") == compression.BGZF_EOF
+
+
+def test_iter_bgzf_compressed_small_file():
+    data = b"chr1\t12345\t.\tA\tG\n" * 10
+    progress = []
+
+    compressed_data = b"".join(
+        compression.iter_bgzf_compressed(io.BytesIO(data), on_progress=progress.append)
+    )
+
+    assert gzip.decompress(compressed_data) == data
+    assert compressed_data.endswith(compression.BGZF_EOF)
+    assert progress == [len(data)]
+
+
+def test_iter_bgzf_compressed_empty_file():
+    assert b"".join(compression.iter_bgzf_compressed(io.BytesIO(b""))) == (
+        compression.BGZF_EOF
+    )
+
+
+def test_iter_bgzf_compressed_in_worker_processes():
+    data = os.urandom(1000) * (3 * compression.BGZF_BATCH_SIZE // 1000 + 1)
+    progress = []
+
+    compressed_data = b"".join(
+        compression.iter_bgzf_compressed(
+            io.BytesIO(data), on_progress=progress.append, max_workers=2
+        )
+    )
+
+    assert gzip.decompress(compressed_data) == data
+    assert compressed_data.endswith(compression.BGZF_EOF)
+    assert progress == [
+        compression.BGZF_BATCH_SIZE,
+        2 * compression.BGZF_BATCH_SIZE,
+        3 * compression.BGZF_BATCH_SIZE,
+        len(data),
+    ]
+
+
+@pytest.mark.parametrize(
+    "file_name, contents, file_suffix, expected",
+    [
+        ("input.vcf", b"##fileformat=VCFv4.2\n", ".vcf.gz", True),
+        ("input.vcf.gz", gzip.compress(b"##fileformat=VCFv4.2\n"), ".vcf.gz", False),
+        # named like an uncompressed file, but actually compressed
+        ("input.vcf", gzip.compress(b"##fileformat=VCFv4.2\n"), ".vcf.gz", False),
+        ("input.txt", b"some text\n", ".vcf.gz", False),
+        ("input.vcf", b"##fileformat=VCFv4.2\n", ".vcf", False),
+        ("input.vcf", b"##fileformat=VCFv4.2\n", None, False),
+    ],
+)
+def test_should_compress_input(tmp_path, file_name, contents, file_suffix, expected):
+    local_file_path = tmp_path / file_name
+    local_file_path.write_bytes(contents)
+
+    assert (
+        compression.should_compress_input(str(local_file_path), file_suffix) is expected
+    )
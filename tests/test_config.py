@@ -19,6 +19,7 @@ def test_config():
 
     assert test_config.teaspoons_api_url == "not-real"
     assert test_config.version_info_file == f"{Path.home()}/.cool/version_info.json"
+    assert test_config.upload_index_file == f"{Path.home()}/.cool/upload_index.json"
     assert test_config.access_token_file == f"{Path.home()}/.cool/access_token"
     assert test_config.refresh_token_file == f"{Path.home()}/.cool/refresh_token"
     assert (
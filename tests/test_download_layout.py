@@ -0,0 +1,102 @@
+# tests/test_download_layout.py
+
+import os
+import uuid
+
+import pytest
+
+from terralab.download_layout import (
+    find_path_collisions,
+    get_bucket_and_object_path,
+    get_download_path,
+    plan_download_paths,
+    validate_layout,
+)
+
+TEST_JOB_ID = uuid.UUID("11111111-2222-3333-4444-555555555555")
+TEST_SIGNED_URL = "https://storage.googleapis.com/fc-secure-bucket/outputs/chunk%201/imputed.vcf.gz?X-Goog-Signature=abc"
+
+
+@pytest.mark.parametrize(
+    "signed_url, expected",
+    [
+        (TEST_SIGNED_URL, ("fc-secure-bucket", "outputs/chunk 1/imputed.vcf.gz")),
+        (
+            "https://fc-secure-bucket.storage.googleapis.com/outputs/imputed.vcf.gz?sig",
+            ("fc-secure-bucket", "outputs/imputed.vcf.gz"),
+        ),
+        (
+            "http://127.0.0.1:8080/blobs/imputed.vcf.gz?sig",
+            ("", "blobs/imputed.vcf.gz"),
+        ),
+    ],
+)
+def test_get_bucket_and_object_path(signed_url, expected):
+    assert get_bucket_and_object_path(signed_url) == expected
+
+
+@pytest.mark.parametrize(
+    "layout, expected",
+    [
+        ("{file_name}", "imputed.vcf.gz"),
+        (
+            "{job_id}/{output_name}/{file_name}",
+            f"{TEST_JOB_ID}/imputedMultiSampleVcf/imputed.vcf.gz",
+        ),
+        ("{object_path}", "outputs/chunk 1/imputed.vcf.gz"),
+        (
+            "{bucket}/{output_name}.{file_name}",
+            "fc-secure-bucket/imputedMultiSampleVcf.imputed.vcf.gz",
+        ),
+    ],
+)
+def test_get_download_path(layout, expected):
+    assert get_download_path(
+        "dest", TEST_SIGNED_URL, layout, TEST_JOB_ID, "imputedMultiSampleVcf"
+    ) == os.path.join("dest", expected)
+
+
+@pytest.mark.parametrize(
+    "layout, error",
+    [
+        ("{output}/{file_name}", "unknown field"),
+        ("{job_id}/{output_name}", "must include {file_name} or {object_path}"),
+        ("{file_name", "Invalid download layout"),
+    ],
+)
+def test_validate_layout_invalid(layout, error):
+    with pytest.raises(ValueError, match=error):
+        validate_layout(layout)
+
+
+@pytest.mark.parametrize("layout", ["/{file_name}", "../{file_name}"])
+def test_get_download_path_outside_destination(layout):
+    with pytest.raises(
+        ValueError, match="isn't a file inside the download destination"
+    ):
+        get_download_path("dest", TEST_SIGNED_URL, layout)
+
+
+def test_plan_download_paths():
+    signed_urls = {
+        "vcf": "https://storage.googleapis.com/bucket/chunk1/out.vcf.gz?sig",
+        "metrics": "https://storage.googleapis.com/bucket/chunk2/out.vcf.gz?sig",
+    }
+
+    assert plan_download_paths("dest", signed_urls, "{output_name}/{file_name}") == {
+        "vcf": os.path.join("dest", "vcf", "out.vcf.gz"),
+        "metrics": os.path.join("dest", "metrics", "out.vcf.gz"),
+    }
+    # the default layout would save both outputs to dest/out.vcf.gz
+    with pytest.raises(ValueError, match="vcf and metrics: dest/out.vcf.gz"):
+        plan_download_paths("dest", signed_urls)
+
+
+def test_find_path_collisions():
+    assert find_path_collisions([("a", "dest/a.txt"), ("b", "dest/b.txt")]) == []
+    assert find_path_collisions([("a", "dest/x.txt"), ("b", "dest/./x.txt")]) == [
+        "  a and b: dest/./x.txt"
+    ]
+    assert find_path_collisions([("a", "dest/x"), ("b", "dest/x/y.txt")]) == [
+        "  b would be saved inside a: dest/x/y.txt"
+    ]
@@ -0,0 +1,358 @@
+# tests/test_fake_server.py
+
+import gzip
+import os
+import subprocess
+import threading
+import time
+import uuid
+
+import pytest
+import requests
+from teaspoons_client import ApiClient, Configuration
+
+from terralab import utils
+from terralab.client import use_api_client
+from terralab.exceptions import TransferError
+from terralab.fake_server import (
+    STREAM_BLOCK_SIZE,
+    FakeTeaspoonsServer,
+    FaultInjection,
+)
+from terralab.logic import pipeline_runs_logic, pipelines_logic, quotas_logic
+from terralab.utils import (
+    SignedUrlDownload,
+    UploadCancelledError,
+    download_with_pbar,
+    upload_file_with_signed_url,
+)
+
+
+@pytest.fixture
+def fake_server():
+    with FakeTeaspoonsServer() as server:
+        yield server
+
+
+def test_blob_upload_and_download(fake_server):
+    signed_url = fake_server.get_signed_url("file.txt")
+
+    assert requests.put(signed_url, data=b"Hello, World!").status_code == 200
+    response = requests.get(signed_url)
+
+    assert response.status_code == 200
+    assert response.content == b"Hello, World!"
+    assert fake_server.blobs["file.txt"] == b"Hello, World!"
+
+
+def test_blob_chunked_upload(fake_server):
+    signed_url = fake_server.get_signed_url("chunked.txt")
+
+    response = requests.put(signed_url, data=iter([b"Hello, ", b"World!"]))
+
+    assert response.status_code == 200
+    assert fake_server.blobs["chunked.txt"] == b"Hello, World!"
+
+
+def test_blob_not_found(fake_server):
+    response = requests.get(fake_server.get_signed_url("missing.txt"))
+
+    assert response.status_code == 404
+    assert response.json()["message"] == "No such blob"
+
+
+def test_get_pipeline_runs_pages(fake_server):
+    fake_server.add_pipeline_runs(25)
+    api_config = Configuration()
+    api_config.host = fake_server.url
+
+    with use_api_client(ApiClient(configuration=api_config)):
+        pipeline_runs = pipeline_runs_logic.get_pipeline_runs(20)
+
+    assert [run.job_id for run in pipeline_runs] == [
+        run["jobId"] for run in fake_server.pipeline_runs[:20]
+    ]
+    assert pipeline_runs[0].time_submitted > pipeline_runs[1].time_submitted
+
+
+@pytest.fixture
+def fake_api(fake_server):
+    api_config = Configuration()
+    api_config.host = fake_server.url
+    with use_api_client(ApiClient(configuration=api_config)):
+        yield fake_server
+
+
+@pytest.mark.parametrize(
+    "range_header, expected_status, expected_content, expected_content_range",
+    [
+        ("bytes=0-4", 206, b"Hello", "bytes 0-4/13"),
+        ("bytes=7-", 206, b"World!", "bytes 7-12/13"),
+        ("bytes=-6", 206, b"World!", "bytes 7-12/13"),
+        ("bytes=7-100", 206, b"World!", "bytes 7-12/13"),
+        ("bytes=13-", 416, b"", "bytes */13"),
+        ("bytes=-", 416, b"", "bytes */13"),
+    ],
+)
+def test_blob_range_requests(
+    fake_server, range_header, expected_status, expected_content, expected_content_range
+):
+    signed_url = fake_server.add_blob("file.txt", b"Hello, World!")
+
+    response = requests.get(signed_url, headers={"Range": range_header})
+
+    assert response.status_code == expected_status
+    assert response.content == expected_content
+    assert response.headers["Content-Range"] == expected_content_range
+
+
+def test_submit_and_download_outputs(fake_api, tmp_path):
+    input_file = tmp_path / "input.vcf.gz"
+    input_file.write_bytes(b"some genotypes")
+    fake_api.output_size_bytes = 100
+
+    pipeline = pipelines_logic.get_pipeline_info("array_imputation", None)
+    job_id = pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        pipeline.pipeline_name,
+        pipeline.pipeline_version,
+        {"multiSampleVcf": str(input_file), "outputBasename": "out"},
+        "my job",
+        True,
+    )
+    status = pipeline_runs_logic.get_pipeline_run_status(uuid.UUID(job_id))
+    downloaded_files = (
+        pipeline_runs_logic.get_signed_urls_and_download_pipeline_run_outputs(
+            uuid.UUID(job_id), str(tmp_path)
+        )
+    )
+
+    assert fake_api.blobs[f"{job_id}/inputs/input.vcf.gz"] == b"some genotypes"
+    assert status.job_report.status == "SUCCEEDED"
+    assert sorted(os.path.basename(path) for path in downloaded_files) == [
+        "chunksInfo.vcf.gz",
+        "imputedMultiSampleVcf.vcf.gz",
+    ]
+    assert all(os.path.getsize(path) == 100 for path in downloaded_files)
+    assert pipeline_runs_logic.get_pipeline_runs(10)[0].description == "my job"
+    assert quotas_logic.get_user_quota("array_imputation").quota_consumed == 500
+
+
+def test_job_runs_for_job_duration(fake_api):
+    fake_api.job_duration_seconds = 60
+    job_id = str(uuid.uuid4())
+    pipeline_runs_logic.prepare_pipeline_run(
+        "array_imputation",
+        job_id,
+        1,
+        {"multiSampleVcf": "gs://bucket/input.vcf.gz", "outputBasename": "out"},
+        "",
+        True,
+    )
+    pipeline_runs_logic.start_pipeline_run(job_id)
+
+    status = pipeline_runs_logic.get_pipeline_run_status(uuid.UUID(job_id))
+
+    assert status.job_report.status == "RUNNING"
+
+
+def test_injected_failures_are_retried(tmp_path):
+    faults = FaultInjection(failure_rate=0.5, seed=1)
+    with FakeTeaspoonsServer(faults=faults) as server:
+        signed_url = server.add_blob("file.txt", b"Hello, World!")
+        downloaded_file = download_with_pbar(
+            SignedUrlDownload(signed_url, str(tmp_path))
+        )
+
+    with open(downloaded_file, "rb") as f:
+        assert f.read() == b"Hello, World!"
+    assert server.request_count > 1
+
+
+def test_injected_disconnects_are_resumed(tmp_path):
+    faults = FaultInjection(disconnect_rate=0.5, seed=1)
+    data = os.urandom(3 * STREAM_BLOCK_SIZE)
+    with FakeTeaspoonsServer(faults=faults) as server:
+        signed_url = server.add_blob("file.bin", data)
+        downloaded_file = download_with_pbar(
+            SignedUrlDownload(signed_url, str(tmp_path))
+        )
+
+    with open(downloaded_file, "rb") as f:
+        assert f.read() == data
+    assert server.request_count > 1
+
+
+def test_bandwidth_limit():
+    faults = FaultInjection(bandwidth_bytes_per_second=100_000)
+    with FakeTeaspoonsServer(faults=faults) as server:
+        signed_url = server.add_blob("file.bin", os.urandom(150_000))
+        start = time.monotonic()
+        requests.get(signed_url)
+        elapsed = time.monotonic() - start
+
+    # the first second's worth is a burst
+    assert elapsed >= 0.4
+
+
+def test_upload_file_with_signed_url(fake_server, tmp_path):
+    data = os.urandom(3 * STREAM_BLOCK_SIZE + 1)
+    input_file = tmp_path / "input.bin"
+    input_file.write_bytes(data)
+
+    upload_file_with_signed_url(
+        str(input_file), fake_server.get_signed_url("input.bin")
+    )
+
+    assert fake_server.blobs["input.bin"] == data
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_file_with_signed_url_cancelled(fake_server, tmp_path, compress):
+    input_file = tmp_path / "input.vcf"
+    input_file.write_bytes(os.urandom(3 * STREAM_BLOCK_SIZE + 1))
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(UploadCancelledError):
+        upload_file_with_signed_url(
+            str(input_file),
+            fake_server.get_signed_url("input.vcf"),
+            compress=compress,
+            cancel_event=cancel_event,
+        )
+
+    assert "input.vcf" not in fake_server.blobs
+
+
+class _CancelledAfterChecks(threading.Event):
+    """An event that is set once it has been checked n_checks times, to cancel an upload partway through."""
+
+    def __init__(self, n_checks: int) -> None:
+        super().__init__()
+        self.n_checks = n_checks
+
+    def is_set(self) -> bool:
+        self.n_checks -= 1
+        return self.n_checks < 0
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_file_with_signed_url_cancelled_partway(fake_server, tmp_path, compress):
+    input_file = tmp_path / "input.vcf"
+    input_file.write_bytes(os.urandom(3 * STREAM_BLOCK_SIZE + 1))
+
+    with pytest.raises(UploadCancelledError):
+        upload_file_with_signed_url(
+            str(input_file),
+            fake_server.get_signed_url("input.vcf"),
+            compress=compress,
+            cancel_event=_CancelledAfterChecks(2),
+        )
+
+    # the server doesn't keep the part that was sent
+    assert "input.vcf" not in fake_server.blobs
+
+
+def test_submit_compresses_inputs(fake_api, tmp_path):
+    data = b"chr1\t12345\t.\tA\tG\t50\tPASS\t.\n" * 100_000
+    input_file = tmp_path / "input.vcf"
+    input_file.write_bytes(data)
+
+    job_id = pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        "array_imputation",
+        1,
+        {"multiSampleVcf": str(input_file), "outputBasename": "out"},
+        "",
+        True,
+        compress_inputs=True,
+    )
+
+    uploaded_data = fake_api.blobs[f"{job_id}/inputs/input.vcf.gz"]
+    assert gzip.decompress(uploaded_data) == data
+    assert len(uploaded_data) < len(data) / 10
+    assert fake_api.jobs[job_id]["inputs"]["multiSampleVcf"] == f"{input_file}.gz"
+
+
+def _write_to_named_pipe(pipe_path, data):
+    """Create a named pipe and start a process writing data to it, as a command like `bcftools view` would"""
+    source_path = f"{pipe_path}.source"
+    with open(source_path, "wb") as source_file:
+        source_file.write(data)
+    os.mkfifo(pipe_path)
+    return subprocess.Popen(["sh", "-c", 'cat "$0" > "$1"', source_path, pipe_path])
+
+
+def test_upload_file_with_signed_url_from_named_pipe(fake_server, tmp_path):
+    data = os.urandom(3 * STREAM_BLOCK_SIZE + 1)
+    pipe_path = str(tmp_path / "input.bin")
+    writer = _write_to_named_pipe(pipe_path, data)
+
+    upload_file_with_signed_url(pipe_path, fake_server.get_signed_url("input.bin"))
+    writer.wait()
+
+    assert fake_server.blobs["input.bin"] == data
+
+
+def test_upload_file_with_signed_url_from_named_pipe_not_retried(tmp_path):
+    pipe_path = str(tmp_path / "input.bin")
+    writer = _write_to_named_pipe(pipe_path, b"Hello, World!")
+
+    with FakeTeaspoonsServer(faults=FaultInjection(failure_rate=1.0)) as server:
+        with pytest.raises(TransferError):
+            upload_file_with_signed_url(pipe_path, server.get_signed_url("input.bin"))
+        writer.wait()
+
+        # the pipe's data was used up by the first attempt
+        assert server.request_count == 1
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_upload_file_with_signed_url_from_named_pipe_too_big(
+    fake_server, tmp_path, monkeypatch, compress
+):
+    monkeypatch.setattr(utils, "MAX_FILE_UPLOAD_SIZE_BYTES", 2 * STREAM_BLOCK_SIZE)
+    pipe_path = str(tmp_path / "input.bin")
+    # random data doesn't compress
+    writer = _write_to_named_pipe(pipe_path, os.urandom(3 * STREAM_BLOCK_SIZE))
+
+    with pytest.raises(TransferError, match="More than the maximum file size"):
+        upload_file_with_signed_url(
+            pipe_path, fake_server.get_signed_url("input.bin"), compress=compress
+        )
+    writer.wait()
+
+    assert "input.bin" not in fake_server.blobs
+
+
+def test_upload_file_with_signed_url_compressed_too_big(
+    fake_server, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(utils, "MAX_FILE_UPLOAD_SIZE_BYTES", 2 * STREAM_BLOCK_SIZE)
+    input_file = tmp_path / "input.bin"
+    input_file.write_bytes(os.urandom(3 * STREAM_BLOCK_SIZE))
+
+    with pytest.raises(TransferError, match="More than the maximum file size"):
+        upload_file_with_signed_url(
+            str(input_file), fake_server.get_signed_url("input.bin"), compress=True
+        )
+
+    assert "input.bin" not in fake_server.blobs
+
+
+def test_submit_compresses_inputs_from_named_pipe(fake_api, tmp_path):
+    data = b"chr1\t12345\t.\tA\tG\t50\tPASS\t.\n" * 100_000
+    pipe_path = str(tmp_path / "input.vcf")
+    writer = _write_to_named_pipe(pipe_path, data)
+
+    job_id = pipeline_runs_logic.prepare_upload_start_pipeline_run(
+        "array_imputation",
+        1,
+        {"multiSampleVcf": pipe_path, "outputBasename": "out"},
+        "",
+        True,
+        compress_inputs=True,
+    )
+    writer.wait()
+
+    uploaded_data = fake_api.blobs[f"{job_id}/inputs/input.vcf.gz"]
+    assert gzip.decompress(uploaded_data) == data
@@ -0,0 +1,130 @@
+# tests/test_gcs_helper.py
+
+import subprocess
+
+import pytest
+from mockito import mock, when, verify, times
+
+from terralab import gcs_helper
+
+pytestmark = pytest.mark.usefixtures("unstub_fixture")
+
+TEST_ACCESS_TOKEN = "test_access_token"
+
+
+class FakeObjectChecker(gcs_helper.CloudObjectChecker):
+    """Local stand-in for GCS that records which paths were looked up."""
+
+    def __init__(self, objects: dict[str, int]) -> None:
+        self.objects = objects
+        self.checked_paths: list[str] = []
+
+    def get_object_size(self, gcs_path: str) -> int | None:
+        self.checked_paths.append(gcs_path)
+        if gcs_path.endswith("forbidden"):
+            raise PermissionError("access denied")
+        return self.objects.get(gcs_path)
+
+
+def test_check_cloud_objects():
+    checker = FakeObjectChecker({"gs://bucket/a": 10, "gs://bucket/b": 20})
+
+    results = gcs_helper.check_cloud_objects(
+        ["gs://bucket/a", "gs://bucket/b", "gs://bucket/missing", "gs://bucket/a"],
+        checker,
+    )
+
+    assert results == {
+        "gs://bucket/a": 10,
+        "gs://bucket/b": 20,
+        "gs://bucket/missing": None,
+    }
+    # duplicate paths are only checked once
+    assert sorted(checker.checked_paths) == [
+        "gs://bucket/a",
+        "gs://bucket/b",
+        "gs://bucket/missing",
+    ]
+
+
+def test_check_cloud_objects_not_cached_between_calls():
+    checker = FakeObjectChecker({"gs://bucket/a": 10})
+    gcs_helper.check_cloud_objects(["gs://bucket/a"], checker)
+    # the object is deleted after the first check
+    checker.objects.clear()
+
+    results = gcs_helper.check_cloud_objects(["gs://bucket/a"], checker)
+
+    assert results == {"gs://bucket/a": None}
+    assert checker.checked_paths == ["gs://bucket/a", "gs://bucket/a"]
+
+
+def test_check_cloud_objects_errors():
+    checker = FakeObjectChecker({})
+
+    results = gcs_helper.check_cloud_objects(["gs://bucket/forbidden"], checker)
+
+    assert isinstance(results["gs://bucket/forbidden"], PermissionError)
+
+
+def test_check_cloud_objects_none():
+    assert gcs_helper.check_cloud_objects([], FakeObjectChecker({})) == {}
+
+
+def test_cloud_object_checker_is_abstract():
+    with pytest.raises(TypeError):
+        gcs_helper.CloudObjectChecker()
+
+
+@pytest.mark.parametrize(
+    "status_code,headers,expected",
+    [
+        (200, {"x-goog-stored-content-length": "123"}, 123),
+        (200, {"content-length": "45"}, 45),
+        (404, {}, None),
+    ],
+)
+def test_gcs_object_checker(status_code, headers, expected):
+    checker = gcs_helper.GcsObjectChecker(TEST_ACCESS_TOKEN)
+    mock_response = mock({"status_code": status_code, "headers": headers})
+    when(mock_response).raise_for_status()
+    when(checker.session).head(
+        "https://storage.googleapis.com/bucket/path/to/file%20name.txt", timeout=...
+    ).thenReturn(mock_response)
+
+    assert checker.get_object_size("gs://bucket/path/to/file name.txt") == expected
+    assert checker.session.headers["Authorization"] == f"Bearer {TEST_ACCESS_TOKEN}"
+
+
+def test_gcs_object_checker_access_denied():
+    checker = gcs_helper.GcsObjectChecker(TEST_ACCESS_TOKEN)
+    mock_response = mock({"status_code": 403, "headers": {}})
+    when(checker.session).head(...).thenReturn(mock_response)
+
+    with pytest.raises(PermissionError):
+        checker.get_object_size("gs://bucket/file")
+
+
+def test_gcs_object_checker_bucket_only_path():
+    checker = gcs_helper.GcsObjectChecker(TEST_ACCESS_TOKEN)
+    when(checker.session).head(...)
+
+    assert checker.get_object_size("gs://bucket") is None
+    verify(checker.session, times(0)).head(...)
+
+
+def test_get_gcloud_access_token():
+    when(gcs_helper.subprocess).run(...).thenReturn(
+        mock({"stdout": f"{TEST_ACCESS_TOKEN}\n"})
+    )
+
+    assert gcs_helper.get_gcloud_access_token() == TEST_ACCESS_TOKEN
+
+
+def test_get_gcloud_access_token_failure():
+    when(gcs_helper.subprocess).run(...).thenRaise(
+        subprocess.CalledProcessError(1, "gcloud")
+    )
+
+    with pytest.raises(RuntimeError, match="Could not get Google credentials"):
+        gcs_helper.get_gcloud_access_token()
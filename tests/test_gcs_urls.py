@@ -0,0 +1,24 @@
+# tests/test_gcs_urls.py
+
+import pytest
+
+from terralab import gcs_urls
+
+
+@pytest.mark.parametrize(
+    "signed_url, expected_cloud_path",
+    [
+        (
+            "https://storage.googleapis.com/fc-bucket/uploads/my%20file.vcf.gz?X-Goog-Signature=abc",
+            "gs://fc-bucket/uploads/my file.vcf.gz",
+        ),
+        (
+            "https://fc-bucket.storage.googleapis.com/uploads/file.vcf.gz?X-Goog-Signature=abc",
+            "gs://fc-bucket/uploads/file.vcf.gz",
+        ),
+        ("http://127.0.0.1:8080/blobs/file.vcf.gz?X-Goog-Signature=abc", None),
+        ("https://storage.googleapis.com/fc-bucket?X-Goog-Signature=abc", None),
+    ],
+)
+def test_get_cloud_path_from_signed_url(signed_url, expected_cloud_path):
+    assert gcs_urls.get_cloud_path_from_signed_url(signed_url) == (expected_cloud_path)
@@ -94,6 +94,85 @@ def test_format_table_with_status_line_wrapping():
     assert len(formatted_rows) == 4
 
 
+def make_job_rows(n_rows: int) -> list[list[str]]:
+    statuses = ["FAILED", "SUCCEEDED", "RUNNING", "unknown"]
+    return [["Job ID", "Status", "Description"]] + [
+        [f"job-{i}", statuses[i % len(statuses)], "description " * (i % 8)]
+        for i in range(n_rows)
+    ]
+
+
+@pytest.mark.parametrize("n_rows", [1, 5, 10])
+def test_iter_table_lines_with_status_small_table(n_rows):
+    # tables that fit in the sample are rendered exactly as format_table_with_status does
+    expected = log.format_table_with_status(make_job_rows(n_rows), max_col_size=30)
+
+    lines = list(
+        log.iter_table_lines_with_status(
+            make_job_rows(n_rows), max_col_size=30, sample_size=10
+        )
+    )
+
+    assert "\n".join(lines) == expected
+
+
+def test_iter_table_lines_with_status_large_table():
+    rows = make_job_rows(50)
+    # widths fixed from the sample match those computed from the full table when the sample contains the widest values
+    expected = log.format_table_with_status(make_job_rows(50), max_col_size=30)
+
+    lines = list(
+        log.iter_table_lines_with_status(
+            iter(rows), max_col_size=30, sample_size=10, width_hints={"Job ID": 6}
+        )
+    )
+
+    assert "\n".join(lines) == expected
+
+
+def test_iter_table_lines_with_status_wraps_late_wide_cells():
+    rows = [
+        ["Job ID", "Status"],
+        ["a", "RUNNING"],
+        ["b", "RUNNING"],
+        ["abcdefghij", "FAILED"],
+    ]
+
+    lines = list(log.iter_table_lines_with_status(rows, sample_size=1))
+
+    # the Job ID column width is fixed from the header and the sampled rows
+    assert lines[1] == "--------  --------"
+    assert lines[2] == f"a         {log.COLORFUL_STATUS['RUNNING']}"
+    assert lines[4] == f"abcdefgh  {log.COLORFUL_STATUS['FAILED']}"
+    assert lines[5] == "ij"
+
+
+def test_iter_table_lines_with_status_yields_sample_before_reading_more():
+    rows_read = 0
+
+    def iter_rows():
+        nonlocal rows_read
+        for row in make_job_rows(25):
+            rows_read += 1
+            yield row
+
+    lines = log.iter_table_lines_with_status(iter_rows(), sample_size=10)
+    for line in lines:
+        if line.startswith("job-9 "):
+            break
+
+    # the headers and the sampled rows, but no peek at the next row
+    assert rows_read == 11
+
+
+def test_iter_table_lines_with_status_no_rows():
+    assert list(log.iter_table_lines_with_status([["Job ID", "Status"]])) == []
+    assert list(log.iter_table_lines_with_status([])) == []
+
+    with pytest.raises(ValueError):
+        list(log.iter_table_lines_with_status([["Job ID"], ["a"]]))
+
+
 def test_retry_message_filter_match():
     filter_instance = RetryMessageFilter()
 
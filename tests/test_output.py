@@ -0,0 +1,107 @@
+# tests/test_output.py
+
+import json
+import uuid
+
+import pytest
+from teaspoons_client import PipelineRun
+
+from terralab import output
+
+TEST_JOB_ID = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def reset_output_format():
+    yield
+    output.configure_output(output.TEXT_FORMAT)
+
+
+def make_pipeline_run(description=None):
+    return PipelineRun(
+        jobId=str(TEST_JOB_ID),
+        pipelineName="test_pipeline",
+        pipelineVersion=1,
+        status="SUCCEEDED",
+        description=description,
+        timeSubmitted="2024-01-01T12:00:00Z",
+    )
+
+
+def test_configure_output():
+    assert not output.is_machine_readable()
+
+    output.configure_output(output.JSON_FORMAT)
+    assert output.is_machine_readable()
+
+    with pytest.raises(ValueError):
+        output.configure_output("xml")
+
+
+def test_to_serializable():
+    assert output.to_serializable(
+        {"run": make_pipeline_run(), "ids": (TEST_JOB_ID,)}
+    ) == {
+        "run": {
+            "jobId": str(TEST_JOB_ID),
+            "pipelineName": "test_pipeline",
+            "pipelineVersion": 1,
+            "status": "SUCCEEDED",
+            "timeSubmitted": "2024-01-01T12:00:00Z",
+        },
+        "ids": [str(TEST_JOB_ID)],
+    }
+
+
+def test_emit_json(capsys):
+    output.configure_output(output.JSON_FORMAT)
+
+    output.emit({"jobId": str(TEST_JOB_ID)})
+
+    assert json.loads(capsys.readouterr().out) == {"jobId": str(TEST_JOB_ID)}
+
+
+@pytest.mark.parametrize("n_rows", [0, 1, 3])
+def test_emit_rows_json(capsys, n_rows):
+    output.configure_output(output.JSON_FORMAT)
+
+    output.emit_rows({"index": i} for i in range(n_rows))
+
+    assert json.loads(capsys.readouterr().out) == [{"index": i} for i in range(n_rows)]
+
+
+def test_emit_rows_ndjson(capsys):
+    output.configure_output(output.NDJSON_FORMAT)
+
+    output.emit_rows([make_pipeline_run("first"), make_pipeline_run("second")])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["description"] for line in lines] == ["first", "second"]
+
+
+def test_emit_rows_csv(capsys):
+    output.configure_output(output.CSV_FORMAT)
+
+    # the first row has no description, but the column is still included
+    output.emit_rows([make_pipeline_run(), make_pipeline_run("a, description")])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == (
+        "jobId,pipelineName,pipelineVersion,status,description,timeSubmitted,"
+        "timeCompleted,quotaConsumed,outputExpirationDate"
+    )
+    assert (
+        lines[1] == f"{TEST_JOB_ID},test_pipeline,1,SUCCEEDED,,2024-01-01T12:00:00Z,,,"
+    )
+    assert '"a, description"' in lines[2]
+
+
+def test_emit_csv_nested_values(capsys):
+    output.configure_output(output.CSV_FORMAT)
+
+    output.emit({"name": "foo", "inputs": {"a": 1}})
+
+    assert capsys.readouterr().out.splitlines() == [
+        "name,inputs",
+        'foo,"{""a"": 1}"',
+    ]
@@ -0,0 +1,115 @@
+# tests/test_profiling.py
+
+import pstats
+import threading
+
+import pytest
+
+from terralab import profiling
+
+
+@pytest.fixture(autouse=True)
+def stop_profiling():
+    yield
+    profiling.stop_profiling()
+
+
+@pytest.mark.parametrize(
+    "args,expected",
+    [
+        (["--profile", "jobs", "list"], ["--profile=cprofile", "jobs", "list"]),
+        (["--profile", "sampling", "jobs"], ["--profile", "sampling", "jobs"]),
+        (["--profile=sampling", "jobs"], ["--profile=sampling", "jobs"]),
+        (["--profile", "--debug", "jobs"], ["--profile=cprofile", "--debug", "jobs"]),
+        (
+            ["--output", "json", "--profile", "jobs"],
+            ["--output", "json", "--profile=cprofile", "jobs"],
+        ),
+        # a subcommand's --profile (e.g. a pipeline input) is left alone
+        (["jobs", "--profile"], ["jobs", "--profile"]),
+        (
+            ["submit", "pipeline", "--profile", "x"],
+            ["submit", "pipeline", "--profile", "x"],
+        ),
+        (["jobs", "list"], ["jobs", "list"]),
+    ],
+)
+def test_normalize_profile_args(args, expected):
+    assert profiling.normalize_profile_args(args) == expected
+
+
+@pytest.mark.parametrize(
+    "args,expected",
+    [
+        (["jobs", "list"], (None, None)),
+        (["--profile", "jobs", "list"], ("cprofile", None)),
+        (["--profile", "sampling", "jobs"], ("sampling", None)),
+        (
+            ["--profile=sampling", "--profile-file", "out.txt", "jobs"],
+            ("sampling", "out.txt"),
+        ),
+        (["--profile-file=out.prof", "--profile", "jobs"], ("cprofile", "out.prof")),
+        (["submit", "--", "--profile"], (None, None)),
+        (["submit", "pipeline", "--profile", "--profile-file", "x"], (None, None)),
+        (["--output", "json", "--profile", "jobs"], ("cprofile", None)),
+    ],
+)
+def test_get_profile_options(args, expected):
+    assert profiling.get_profile_options(args) == expected
+
+
+def test_sampling_profiler_collapsed_stacks(tmp_path):
+    sampler = profiling.SamplingProfiler()
+    waiting = threading.Event()
+
+    def wait_to_be_sampled():
+        waiting.wait()
+
+    thread = threading.Thread(target=wait_to_be_sampled, name="sampled-thread")
+    thread.start()
+    try:
+        sampler.sample()
+        sampler.sample()
+    finally:
+        waiting.set()
+        thread.join()
+    profile_path = tmp_path / "profile.collapsed"
+    sampler.write(str(profile_path))
+
+    lines = profile_path.read_text().splitlines()
+    sampled_line = next(line for line in lines if line.startswith("sampled-thread;"))
+    stack, count = sampled_line.rsplit(" ", 1)
+    assert count == "2"
+    assert "wait_to_be_sampled (" in stack
+    assert stack.index("Thread.run") < stack.index("wait_to_be_sampled")
+
+
+def test_start_and_stop_cprofile(tmp_path, capture_logs):
+    profile_path = tmp_path / "terralab.prof"
+
+    assert profiling.start_profiling(profiling.CPROFILE, str(profile_path))
+    assert not profiling.start_profiling(profiling.SAMPLING)
+    sorted([3, 2, 1])
+    profiling.stop_profiling()
+
+    stats = pstats.Stats(str(profile_path))
+    assert any(
+        function == "<built-in method builtins.sorted>"
+        for _, _, function in stats.stats
+    )
+    assert "profile of" in capture_logs.text
+
+
+def test_start_and_stop_sampling(tmp_path):
+    profile_path = tmp_path / "terralab.collapsed"
+
+    assert profiling.start_profiling(profiling.SAMPLING, str(profile_path))
+    profiling.stop_profiling()
+    profiling.stop_profiling()  # no-op
+
+    assert profile_path.exists()
+
+
+def test_invalid_profiler():
+    with pytest.raises(ValueError, match="Invalid profiler 'fast'"):
+        profiling.Profiler("fast")
@@ -0,0 +1,113 @@
+# tests/test_rate_limit.py
+
+import pytest
+from mockito import when, verify
+
+from terralab import rate_limit
+
+
+@pytest.fixture
+def fake_clock(unstub_fixture):
+    clock = {"now": 1000.0}
+    when(rate_limit.time).monotonic().thenAnswer(lambda: clock["now"])
+    when(rate_limit.time).time().thenAnswer(lambda: clock["now"])
+    yield clock
+
+
+def test_token_bucket_allows_burst_then_waits(fake_clock):
+    bucket = rate_limit.TokenBucket(rate_per_second=2, burst=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # the bucket is empty; later callers wait in turn
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+
+    # after the reserved tokens have refilled, requests are allowed again
+    fake_clock["now"] += 2
+    assert bucket.reserve() == 0
+
+
+def test_token_bucket_acquire_sleeps(fake_clock):
+    when(rate_limit.time).sleep(...)
+    bucket = rate_limit.TokenBucket(rate_per_second=1)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 1.0
+
+    verify(rate_limit.time, times=1).sleep(1.0)
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        rate_limit.TokenBucket(rate_per_second=0)
+
+
+def test_shared_token_bucket(fake_clock, tmp_path):
+    state_file = str(tmp_path / "rate_limits.json")
+    # buckets in different processes share the state file
+    bucket = rate_limit.SharedTokenBucket(state_file, "read", rate_per_second=1)
+    other_bucket = rate_limit.SharedTokenBucket(state_file, "read", rate_per_second=1)
+    write_bucket = rate_limit.SharedTokenBucket(state_file, "write", rate_per_second=1)
+
+    assert bucket.reserve() == 0
+    assert other_bucket.reserve() == 1.0
+    assert write_bucket.reserve() == 0
+
+    fake_clock["now"] += 2
+    assert other_bucket.reserve() == 0
+
+
+@pytest.mark.parametrize(
+    "rate_limits,expected",
+    [
+        ("read=20,write=2", {"read": 20, "write": 2}),
+        (" *=0.5 ", {"*": 0.5}),
+        ("", {}),
+    ],
+)
+def test_parse_rate_limits(rate_limits, expected):
+    assert rate_limit.parse_rate_limits(rate_limits) == expected
+
+
+@pytest.mark.parametrize("rate_limits", ["read", "read=fast", "write=0", "read=-1"])
+def test_parse_rate_limits_invalid(rate_limits):
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        rate_limit.parse_rate_limits(rate_limits)
+
+
+def test_api_rate_limiter_endpoint_classes(fake_clock):
+    limiter = rate_limit.ApiRateLimiter({"write": 1, "*": 100})
+    when(rate_limit.time).sleep(...)
+
+    limiter.acquire("POST")
+    limiter.acquire("POST")
+    limiter.acquire("GET")  # falls back to the limit for all endpoints
+
+    verify(rate_limit.time, times=1).sleep(1.0)
+
+
+@pytest.mark.parametrize(
+    "method,path,expected",
+    [
+        ("GET", "/api/pipelineruns/v2/pipelineruns", "read"),
+        ("POST", "/api/pipelines/v1/array_imputation", "read"),
+        ("POST", "/api/pipelineruns/v3/prepare", "write"),
+        ("POST", "/api/pipelineruns/v1/start", "write"),
+        ("POST", "/api/pipelineruns/v1/result/job/output/deliver-to-cloud", "write"),
+        ("PATCH", "/api/admin/v1/pipelines/array_imputation/1", "write"),
+    ],
+)
+def test_get_endpoint_class(method, path, expected):
+    assert rate_limit.get_endpoint_class(method, path) == expected
+
+
+def test_get_api_rate_limiter_from_env(monkeypatch):
+    monkeypatch.setenv(rate_limit.RATE_LIMITS_ENV_VAR, "read=5")
+    monkeypatch.setattr(rate_limit, "_api_rate_limiter_loaded", False)
+    monkeypatch.setattr(rate_limit, "_api_rate_limiter", None)
+
+    limiter = rate_limit.get_api_rate_limiter()
+
+    assert limiter is not None
+    assert rate_limit.get_api_rate_limiter() is limiter
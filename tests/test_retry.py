@@ -0,0 +1,139 @@
+# tests/test_retry.py
+
+import email.utils
+import time
+import urllib.error
+
+import pytest
+import requests
+from mockito import mock
+from urllib3.exceptions import MaxRetryError, ProtocolError
+
+from terralab import retry
+
+
+def http_error(status_code, headers=None):
+    response = mock({"status_code": status_code, "headers": headers or {}})
+    return requests.HTTPError(f"{status_code} error", response=response)
+
+
+def test_get_backoff_seconds_full_jitter():
+    policy = retry.RetryPolicy(initial_backoff_seconds=1, max_backoff_seconds=5)
+
+    for retry_number, max_backoff in [(1, 1), (2, 2), (3, 4), (4, 5), (10, 5)]:
+        for _ in range(20):
+            assert 0 <= policy.get_backoff_seconds(retry_number) <= max_backoff
+
+
+def test_get_backoff_seconds_retry_after():
+    policy = retry.RetryPolicy()
+
+    assert policy.get_backoff_seconds(1, retry_after_seconds=7) == 7
+    assert (
+        policy.get_backoff_seconds(1, retry_after_seconds=10000)
+        == retry.MAX_RETRY_AFTER_SECONDS
+    )
+
+
+def test_parse_retry_after():
+    assert retry.parse_retry_after(None) is None
+    assert retry.parse_retry_after("12") == 12
+    assert retry.parse_retry_after("not a date") is None
+
+    retry_at = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= retry.parse_retry_after(retry_at) <= 30
+
+
+@pytest.mark.parametrize(
+    "error,expected",
+    [
+        (http_error(503, {"Retry-After": "3"}), (True, 3)),
+        (http_error(429), (True, None)),
+        (http_error(500, {"Retry-After": "3"}), (True, None)),
+        (http_error(404), (False, None)),
+        (requests.HTTPError("no response"), (False, None)),
+        (requests.ConnectionError("connection reset"), (True, None)),
+        (requests.exceptions.ChunkedEncodingError("broken"), (True, None)),
+        (urllib.error.URLError("connection refused"), (True, None)),
+        (urllib.error.HTTPError("url", 403, "Forbidden", None, None), (False, None)),
+        (ValueError("bad value"), (False, None)),
+    ],
+)
+def test_get_retry_status_and_delay(error, expected):
+    assert retry.get_retry_status_and_delay(error) == expected
+
+
+def test_call_with_retries_transient_failure(capture_logs):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise requests.ConnectionError("connection reset")
+        return "done"
+
+    assert retry.call_with_retries(flaky, "Flaky call") == "done"
+    assert len(attempts) == 3
+    assert "Flaky call failed (connection reset); retrying" in capture_logs.text
+
+
+def test_call_with_retries_non_transient_failure():
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise http_error(404)
+
+    with pytest.raises(requests.HTTPError):
+        retry.call_with_retries(failing, "Failing call")
+    assert len(attempts) == 1
+
+
+def test_call_with_retries_max_attempts():
+    retry.configure_retries(
+        retry.RetryPolicy(max_attempts=3, initial_backoff_seconds=0)
+    )
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise requests.ConnectionError("connection reset")
+
+    with pytest.raises(requests.ConnectionError):
+        retry.call_with_retries(failing, "Failing call")
+    assert len(attempts) == 3
+
+
+def test_call_with_retries_budget_exhausted():
+    retry.configure_retries(
+        retry.RetryPolicy(max_attempts=10, initial_backoff_seconds=0, retry_budget=2)
+    )
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise requests.ConnectionError("connection reset")
+
+    with pytest.raises(requests.ConnectionError):
+        retry.call_with_retries(failing, "Failing call")
+    # the budget is shared across calls in the process
+    with pytest.raises(requests.ConnectionError):
+        retry.call_with_retries(failing, "Failing call")
+    assert len(attempts) == 4
+
+
+def test_api_retries_follow_policy():
+    retry.configure_retries(
+        retry.RetryPolicy(max_attempts=4, initial_backoff_seconds=0, retry_budget=1)
+    )
+    api_retries = retry.get_api_retries()
+
+    assert api_retries.total == 3
+    assert 503 in api_retries.status_forcelist
+
+    error = ProtocolError("connection broken")
+    api_retries = api_retries.increment("GET", "/api", error=error)
+    assert api_retries.total == 2
+    # the retry budget is used up, so the next retry fails
+    with pytest.raises(MaxRetryError):
+        api_retries.increment("GET", "/api", error=error)
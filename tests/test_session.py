@@ -0,0 +1,267 @@
+# tests/test_session.py
+
+import time
+import uuid
+
+import jwt
+import pytest
+from mockito import mock, when, verify
+from teaspoons_client import ApiException
+from urllib3.exceptions import MaxRetryError
+
+import terralab
+from terralab import session as session_module
+from terralab.client import ClientWrapper
+from terralab.exceptions import (
+    ApiError,
+    AuthenticationError,
+    ConfigError,
+    InputValidationError,
+    ServiceUnavailableError,
+    TransferError,
+)
+
+pytestmark = pytest.mark.usefixtures("unstub_fixture")
+
+TEST_JOB_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def test_session():
+    config = mock({"teaspoons_api_url": "https://not-real"})
+    access_token = jwt.encode(
+        {"exp": time.time() + 3600}, "a-test-secret-that-is-long-enough-for-hs256"
+    )
+    when(session_module).get_or_refresh_access_token(
+        config, interactive_login=False
+    ).thenReturn(access_token)
+    yield session_module.Session(config)
+
+
+def test_session_exported_from_package():
+    assert terralab.Session is session_module.Session
+    assert issubclass(terralab.TransferError, terralab.TerralabError)
+
+
+def test_status_uses_session_client(test_session):
+    status = mock()
+
+    def get_status(job_id):
+        # logic functions get the session's client from ClientWrapper
+        with ClientWrapper() as api_client:
+            assert api_client is test_session._api_client
+        return status
+
+    when(session_module.pipeline_runs_logic).get_pipeline_run_status(
+        TEST_JOB_ID
+    ).thenAnswer(get_status)
+
+    assert test_session.status(str(TEST_JOB_ID)) is status
+
+
+def test_access_token_reused_until_expiry(test_session):
+    when(session_module.pipeline_runs_logic).get_pipeline_runs(...).thenReturn([])
+
+    test_session.list_jobs(5)
+    test_session.list_jobs(5)
+
+    verify(session_module, times=1).get_or_refresh_access_token(...)
+    assert test_session._api_client.configuration.access_token
+
+
+def test_status_invalid_job_id(test_session):
+    with pytest.raises(InputValidationError, match="JOB_ID must be a valid uuid"):
+        test_session.status("not-a-uuid")
+
+
+def test_status_api_error(test_session):
+    when(session_module.pipeline_runs_logic).get_pipeline_run_status(...).thenRaise(
+        ApiException(status=404, reason="Not Found", body='{"message": "no job"}')
+    )
+
+    with pytest.raises(ApiError) as exc_info:
+        test_session.status(TEST_JOB_ID)
+
+    assert exc_info.value.status == 404
+    assert str(exc_info.value) == (
+        "API call failed with status code 404 (Not Found): no job"
+    )
+
+
+def test_status_authentication_error(test_session):
+    when(session_module.pipeline_runs_logic).get_pipeline_run_status(...).thenRaise(
+        ApiException(status=401, body='{"message": "User not found"}')
+    )
+
+    with pytest.raises(AuthenticationError):
+        test_session.status(TEST_JOB_ID)
+
+
+def test_list_jobs_connection_error(test_session):
+    when(session_module.pipeline_runs_logic).get_pipeline_runs(...).thenRaise(
+        MaxRetryError(None, "https://not-real")
+    )
+
+    with pytest.raises(ServiceUnavailableError):
+        test_session.list_jobs()
+
+
+def test_submit_requires_terms(test_session):
+    with pytest.raises(InputValidationError, match="terms of service"):
+        test_session.submit("pipeline", {})
+
+
+def test_submit_invalid_inputs(test_session):
+    when(session_module.pipelines_logic).get_pipeline_info_and_input_errors(
+        "pipeline", None, {"bad": "input"}, None
+    ).thenReturn((mock(), ["Error: Unexpected input 'bad'."]))
+    when(session_module.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        ...
+    ).thenRaise(AssertionError("should not submit"))
+
+    with pytest.raises(InputValidationError) as exc_info:
+        test_session.submit("pipeline", {"bad": "input"}, agree_to_terms=True)
+
+    assert exc_info.value.errors == ["Error: Unexpected input 'bad'."]
+
+
+def test_submit(test_session):
+    test_inputs = {"input_file": "file.txt"}
+    test_pipeline_info = mock()
+    when(session_module.pipelines_logic).get_pipeline_info_and_input_errors(
+        "pipeline", 2, test_inputs, None
+    ).thenReturn((test_pipeline_info, []))
+
+    def prepare_upload_start(*args, **kwargs):
+        # logic functions get the session's client from ClientWrapper
+        with ClientWrapper() as api_client:
+            assert api_client is test_session._api_client
+        return str(TEST_JOB_ID)
+
+    when(session_module.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        "pipeline",
+        2,
+        test_inputs,
+        "my job",
+        True,
+        True,
+        cloud_object_checker=None,
+        pipeline_info=test_pipeline_info,
+    ).thenAnswer(prepare_upload_start)
+
+    job_id = test_session.submit(
+        "pipeline",
+        test_inputs,
+        version=2,
+        description="my job",
+        agree_to_terms=True,
+        compress_inputs=True,
+    )
+
+    assert job_id == str(TEST_JOB_ID)
+
+
+def test_submit_upload_error(test_session):
+    when(session_module.pipelines_logic).get_pipeline_info_and_input_errors(
+        ...
+    ).thenReturn((mock(), []))
+    when(session_module.pipeline_runs_logic).prepare_upload_start_pipeline_run(
+        ...
+    ).thenRaise(TransferError("Error uploading file: disk error"))
+
+    with pytest.raises(TransferError, match="disk error"):
+        test_session.submit("pipeline", {"input_file": "file.txt"}, agree_to_terms=True)
+
+
+def test_session_not_logged_in():
+    config = mock({"teaspoons_api_url": "https://not-real"})
+    when(session_module).get_or_refresh_access_token(
+        config, interactive_login=False
+    ).thenRaise(AuthenticationError(None, "Not logged in"))
+    test_session = session_module.Session(config)
+
+    with pytest.raises(AuthenticationError, match="Not logged in"):
+        test_session.list_jobs()
+
+
+def test_session_config_error():
+    when(session_module).load_config().thenRaise(RuntimeError("no config"))
+
+    with pytest.raises(ConfigError, match="no config"):
+        session_module.Session()
+
+
+def test_download(test_session, tmp_path):
+    # the same logic function as `terralab download`, with the same output selection and layout
+    when(session_module.pipeline_runs_logic).download_pipeline_run_outputs(
+        TEST_JOB_ID,
+        str(tmp_path),
+        ("vcf",),
+        ("*Metrics",),
+        ("*Index",),
+        "{output_name}",
+    ).thenReturn([str(tmp_path / "vcf")])
+
+    assert test_session.download(
+        str(TEST_JOB_ID),
+        str(tmp_path),
+        output_names=["vcf"],
+        include_patterns=["*Metrics"],
+        exclude_patterns=["*Index"],
+        layout="{output_name}",
+    ) == [str(tmp_path / "vcf")]
+
+
+def stub_job_outputs(output_sizes):
+    when(session_module.pipeline_runs_logic).get_pipeline_run_output_signed_urls(
+        TEST_JOB_ID
+    ).thenReturn(
+        mock(
+            {
+                "output_signed_urls": {
+                    output_name: f"https://storage.googleapis.com/bucket/{output_name}.txt?sig"
+                    for output_name in output_sizes
+                }
+            }
+        )
+    )
+    when(session_module.pipeline_runs_logic).get_pipeline_run_output_sizes(
+        TEST_JOB_ID
+    ).thenReturn(output_sizes)
+
+
+def test_download_not_enough_space(test_session, tmp_path):
+    stub_job_outputs({"vcf": 2**60})
+    when(session_module.pipeline_runs_logic).download_files_with_signed_urls(
+        ...
+    ).thenRaise(AssertionError("nothing should be downloaded"))
+
+    with pytest.raises(InputValidationError, match="Not enough disk space"):
+        test_session.download(TEST_JOB_ID, str(tmp_path))
+
+
+def test_download_unknown_output(test_session, tmp_path):
+    stub_job_outputs({"vcf": 10})
+
+    with pytest.raises(InputValidationError, match="Unknown output"):
+        test_session.download(TEST_JOB_ID, str(tmp_path), output_names=["bam"])
+
+
+def test_download_transfer_error(test_session, tmp_path):
+    stub_job_outputs({"vcf": 10})
+    when(session_module.pipeline_runs_logic).download_files_with_signed_urls(
+        ...
+    ).thenRaise(TransferError("Error downloading files: disk full"))
+
+    with pytest.raises(TransferError, match="disk full"):
+        test_session.download(TEST_JOB_ID, str(tmp_path))
+
+
+def test_download_invalid_destination(test_session, tmp_path):
+    with pytest.raises(InputValidationError, match="is not a directory"):
+        test_session.download(TEST_JOB_ID, str(tmp_path / "missing"))
+
+
+def test_deliver_invalid_destination(test_session):
+    with pytest.raises(InputValidationError, match="not a valid GCS path"):
+        test_session.deliver(TEST_JOB_ID, "s3://bucket")
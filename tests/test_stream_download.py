@@ -0,0 +1,132 @@
+# tests/test_stream_download.py
+
+import io
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from mockito import when
+
+from terralab import stream_download
+from terralab.fake_server import FakeTeaspoonsServer, FaultInjection
+from terralab.stream_download import (
+    RangesNotSupportedError,
+    open_named_pipe,
+    stream_signed_url,
+)
+from terralab.transfer_stats import get_transfer_stats
+
+
+@pytest.fixture
+def fake_server():
+    with FakeTeaspoonsServer() as server:
+        yield server
+
+
+@pytest.mark.parametrize("size_bytes", [0, 1, 999, 1000, 10_500])
+def test_stream_signed_url(fake_server, size_bytes):
+    data = os.urandom(size_bytes)
+    signed_url = fake_server.add_blob("output.vcf.gz", data)
+    out_file = io.BytesIO()
+
+    bytes_written = stream_signed_url(
+        signed_url, out_file, chunk_size=1000, read_ahead=3
+    )
+
+    assert bytes_written == size_bytes
+    assert out_file.getvalue() == data
+
+
+def test_stream_signed_url_retries_dropped_chunks():
+    data = os.urandom(20_000)
+    # every chunk is dropped twice before it's sent in full
+    with FakeTeaspoonsServer(faults=FaultInjection(disconnect_first=2)) as server:
+        signed_url = server.add_blob("output.vcf.gz", data)
+        out_file = io.BytesIO()
+
+        stream_signed_url(signed_url, out_file, chunk_size=1000)
+
+    assert out_file.getvalue() == data
+    assert get_transfer_stats().records[-1].retries == 40
+
+
+def test_stream_signed_url_without_range_support(fake_server, unstub):
+    data = os.urandom(5000)
+    signed_url = fake_server.add_blob("output.vcf.gz", data)
+    when(stream_download)._get_chunk(signed_url, 0, 1000).thenRaise(
+        RangesNotSupportedError("Expected a partial response, got 200")
+    )
+    out_file = io.BytesIO()
+
+    assert stream_signed_url(signed_url, out_file, chunk_size=1000) == 5000
+    assert out_file.getvalue() == data
+
+
+def test_stream_signed_url_reader_closed_pipe(fake_server):
+    signed_url = fake_server.add_blob("output.vcf.gz", os.urandom(10_000))
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+
+    with pytest.raises(BrokenPipeError):
+        with os.fdopen(write_fd, "wb", buffering=0) as out_file:
+            stream_signed_url(signed_url, out_file, chunk_size=1000)
+
+
+def test_open_named_pipe(tmp_path):
+    pipe_path = str(tmp_path / "output.pipe")
+    received = []
+
+    def read_pipe():
+        # wait for the pipe to be created, then read it as a downstream tool would
+        while not os.path.exists(pipe_path):
+            pass
+        with open(pipe_path, "rb") as pipe:
+            received.append(pipe.read())
+
+    reader = threading.Thread(target=read_pipe)
+    reader.start()
+    with open_named_pipe(pipe_path) as pipe:
+        pipe.write(b"Hello, World!")
+    reader.join()
+
+    assert received == [b"Hello, World!"]
+    # the pipe was created for the download, so it's removed
+    assert not os.path.exists(pipe_path)
+
+
+def test_open_named_pipe_not_a_pipe(tmp_path):
+    file_path = tmp_path / "output.txt"
+    file_path.write_text("not a pipe")
+
+    with pytest.raises(OSError, match="isn't a named pipe"):
+        with open_named_pipe(str(file_path)):
+            pass
+
+
+def test_import_without_fcntl():
+    # fcntl isn't available on Windows; importing the CLI mustn't need it
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; sys.modules['fcntl'] = None; "
+            "import terralab.stream_download, terralab.cli",
+        ],
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_enlarge_pipe_buffer_without_fcntl(monkeypatch):
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    read_fd, write_fd = os.pipe()
+    try:
+        # does nothing, rather than failing
+        stream_download.enlarge_pipe_buffer(write_fd)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
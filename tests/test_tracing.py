@@ -0,0 +1,117 @@
+# tests/test_tracing.py
+
+import asyncio
+import json
+
+import pytest
+
+from terralab import tracing
+
+
+@pytest.fixture
+def tracer():
+    yield tracing.enable_tracing()
+    tracing.disable_tracing()
+
+
+def test_span_disabled():
+    with tracing.span("not recorded") as span:
+        assert span is None
+    assert tracing.get_tracer() is None
+
+
+def test_spans_nest(tracer):
+    with tracing.span("outer", attempt=1) as outer:
+        with tracing.span("inner") as inner:
+            pass
+
+    assert [span.name for span in tracer.spans] == ["inner", "outer"]
+    assert inner.parent_span_id == outer.span_id
+    assert outer.parent_span_id is None
+    assert outer.attributes == {"attempt": 1}
+    assert outer.start_time_ns <= inner.start_time_ns
+    assert inner.end_time_ns <= outer.end_time_ns
+
+
+def test_span_records_error(tracer):
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("bad input")
+    with pytest.raises(SystemExit):
+        with tracing.span("exiting"):
+            exit(1)
+    with pytest.raises(SystemExit):
+        with tracing.span("succeeding"):
+            exit(0)
+
+    assert [span.error for span in tracer.spans] == [
+        "ValueError: bad input",
+        "exit(1)",
+        None,
+    ]
+
+
+@tracing.traced()
+def traced_function(value):
+    return value * 2
+
+
+@tracing.traced("custom name")
+async def traced_coroutine(value):
+    return await asyncio.to_thread(traced_function, value)
+
+
+def test_traced(tracer):
+    assert traced_function(2) == 4
+    assert asyncio.run(traced_coroutine(3)) == 6
+
+    names = [span.name for span in tracer.spans]
+    assert names[0].endswith("test_tracing.traced_function")
+    assert names[1:] == [names[0], "custom name"]
+    # the span context follows the coroutine into its thread
+    assert tracer.spans[1].parent_span_id == tracer.spans[2].span_id
+
+
+def test_traced_disabled():
+    assert traced_function(5) == 10
+
+
+def test_write_chrome_trace(tracer, tmp_path):
+    with tracing.span("step", http_status_code=200):
+        pass
+    trace_path = tmp_path / "trace.json"
+
+    tracer.write(str(trace_path), tracing.CHROME_FORMAT)
+
+    event = json.loads(trace_path.read_text())["traceEvents"][0]
+    assert event["name"] == "step"
+    assert event["ph"] == "X"
+    assert event["dur"] >= 0
+    assert event["args"] == {"http_status_code": 200}
+
+
+def test_write_otlp_trace(tracer, tmp_path):
+    with tracing.span("outer"):
+        with pytest.raises(RuntimeError):
+            with tracing.span("inner", retries=2, path="/api"):
+                raise RuntimeError("oops")
+    trace_path = tmp_path / "trace.json"
+
+    tracer.write(str(trace_path), tracing.OTLP_FORMAT)
+
+    resource_spans = json.loads(trace_path.read_text())["resourceSpans"][0]
+    assert {
+        "key": "service.name",
+        "value": {"stringValue": "terralab"},
+    } in resource_spans["resource"]["attributes"]
+    inner, outer = resource_spans["scopeSpans"][0]["spans"]
+    assert inner["traceId"] == outer["traceId"] == tracer.trace_id
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert "parentSpanId" not in outer
+    assert inner["attributes"] == [
+        {"key": "retries", "value": {"intValue": "2"}},
+        {"key": "path", "value": {"stringValue": "/api"}},
+    ]
+    assert inner["status"] == {"code": 2, "message": "RuntimeError: oops"}
+    assert outer["status"] == {"code": 0}
+    assert int(outer["startTimeUnixNano"]) <= int(inner["startTimeUnixNano"])
@@ -0,0 +1,106 @@
+# tests/test_transfer_session.py
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from terralab import utils
+from terralab.fake_server import FakeTeaspoonsServer, FaultInjection
+from terralab.transfer_session import (
+    DEFAULT_WARM_CONNECTIONS,
+    WARM_CONNECTIONS_ENV_VAR,
+    WARM_UP_TIMEOUT_SECONDS,
+    get_transfer_session,
+    get_warm_connection_count,
+    warm_up_connections,
+)
+
+
+def test_get_transfer_session_is_shared():
+    assert get_transfer_session() is get_transfer_session()
+
+
+def test_downloads_reuse_connections(tmp_path):
+    with FakeTeaspoonsServer() as server:
+        signed_urls = [
+            server.add_blob(f"output{i}.txt", os.urandom(100)) for i in range(10)
+        ]
+
+        asyncio.run(
+            utils.download_files_with_signed_urls_async(
+                str(tmp_path), signed_urls, max_concurrent_transfers=1
+            )
+        )
+
+        assert server.connection_count == 1
+
+
+def test_warm_up_connections(tmp_path):
+    with FakeTeaspoonsServer(faults=FaultInjection(latency_seconds=0.2)) as server:
+        signed_urls = [
+            server.add_blob(f"output{i}.txt", os.urandom(100)) for i in range(3)
+        ]
+
+        assert warm_up_connections(server.url, count=3) == 3
+        assert server.connection_count == 3
+
+        # the downloads use the connections that were opened ahead
+        asyncio.run(
+            utils.download_files_with_signed_urls_async(
+                str(tmp_path), signed_urls, max_concurrent_transfers=3
+            )
+        )
+        assert server.connection_count == 3
+
+
+def test_warm_up_connections_unreachable_host():
+    with FakeTeaspoonsServer() as server:
+        url = server.url
+    # the server is stopped, so connections are refused
+
+    assert warm_up_connections(url, count=2) == 0
+
+
+def test_warm_up_in_background_does_not_delay_exit():
+    # a host that accepts connections but never responds
+    with socket.create_server(("127.0.0.1", 0)) as listening_socket:
+        port = listening_socket.getsockname()[1]
+        start_time = time.monotonic()
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from terralab.transfer_session import warm_up_connections_in_background; "
+                f"warm_up_connections_in_background('http://127.0.0.1:{port}/', 2)",
+            ],
+            capture_output=True,
+            text=True,
+        )
+
+    assert result.returncode == 0, result.stderr
+    # the process exits without waiting for the warm-up requests to time out
+    assert time.monotonic() - start_time < WARM_UP_TIMEOUT_SECONDS / 2
+
+
+@pytest.mark.parametrize(
+    "warm_connections, expected",
+    [
+        (None, DEFAULT_WARM_CONNECTIONS),
+        ("8", 8),
+        ("0", 0),
+        ("-1", 0),
+        ("lots", DEFAULT_WARM_CONNECTIONS),
+    ],
+)
+def test_get_warm_connection_count(monkeypatch, warm_connections, expected):
+    if warm_connections is None:
+        monkeypatch.delenv(WARM_CONNECTIONS_ENV_VAR)
+    else:
+        monkeypatch.setenv(WARM_CONNECTIONS_ENV_VAR, warm_connections)
+
+    assert get_warm_connection_count() == expected
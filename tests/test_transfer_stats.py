@@ -0,0 +1,123 @@
+# tests/test_transfer_stats.py
+
+import json
+import os
+import tempfile
+
+import pytest
+from mockito import when
+
+from terralab import transfer_stats
+from terralab.transfer_stats import (
+    DOWNLOAD,
+    UPLOAD,
+    TransferRecord,
+    TransferStats,
+    percentile,
+)
+
+pytestmark = pytest.mark.usefixtures("unstub_fixture")
+
+
+def test_transfer_record_metrics():
+    when(transfer_stats.time).monotonic().thenReturn(100.5)
+    record = TransferRecord(UPLOAD, "file.txt", size_bytes=2048, started_at=100.0)
+
+    record.add_bytes(1024)
+    record.add_bytes(1024)
+    record.add_retry()
+    record.finished_at = 102.0
+
+    assert record.bytes_transferred == 2048
+    assert record.retries == 1
+    assert record.wall_seconds == 2.0
+    assert record.time_to_first_byte_seconds == 0.5
+    assert record.throughput_bytes_per_second == 1024.0
+
+
+def test_transfer_record_no_bytes():
+    record = TransferRecord(DOWNLOAD, "file.txt")
+    record.add_bytes(0)
+
+    assert record.time_to_first_byte_seconds is None
+    assert record.to_dict()["timeToFirstByteSeconds"] is None
+
+
+@pytest.mark.parametrize(
+    "values,percent,expected",
+    [
+        ([], 50, None),
+        ([3.0], 99, 3.0),
+        ([1.0, 2.0, 3.0, 4.0], 50, 2.0),
+        ([4.0, 1.0, 3.0, 2.0], 90, 4.0),
+        ([float(i) for i in range(1, 101)], 99, 99.0),
+    ],
+)
+def test_percentile(values, percent, expected):
+    assert percentile(values, percent) == expected
+
+
+def test_transfer_stats_summarize():
+    stats = TransferStats()
+    first = stats.start_transfer(UPLOAD, "a.txt", size_bytes=100)
+    second = stats.start_transfer(UPLOAD, "b.txt", size_bytes=300)
+    first.add_bytes(100)
+    second.add_bytes(300)
+    second.add_retry()
+    stats.finish_transfer(first, succeeded=True)
+    stats.finish_transfer(second, succeeded=False)
+    third = stats.start_transfer(UPLOAD, "c.txt")
+    stats.finish_transfer(third, succeeded=True)
+
+    summary = stats.summarize(UPLOAD)
+
+    assert summary["files"] == 3
+    assert summary["failedFiles"] == 1
+    assert summary["bytesTransferred"] == 400
+    assert summary["retries"] == 1
+    assert summary["peakConcurrency"] == 2
+    assert third.concurrency == 1
+    assert set(summary["fileThroughputBytesPerSecond"]) == {"p50", "p90", "p99"}
+    assert stats.summarize(DOWNLOAD) is None
+
+
+def test_transfer_stats_finish_twice_counts_once():
+    stats = TransferStats()
+    record = stats.start_transfer(DOWNLOAD, "a.txt")
+    stats.finish_transfer(record, succeeded=False)
+    stats.finish_transfer(record, succeeded=False)
+
+    assert stats.start_transfer(DOWNLOAD, "b.txt").concurrency == 1
+
+
+def test_transfer_stats_write_json():
+    stats = TransferStats()
+    record = stats.start_transfer(DOWNLOAD, "a.txt", size_bytes=10)
+    record.add_bytes(10)
+    stats.finish_transfer(record, succeeded=True)
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        stats_path = os.path.join(tmpdirname, "stats.json")
+        stats.write_json(stats_path)
+        with open(stats_path) as stats_file:
+            written = json.load(stats_file)
+
+    assert written["uploads"] is None
+    assert written["downloads"]["files"] == 1
+    assert written["files"][0]["fileName"] == "a.txt"
+    assert written["files"][0]["bytesTransferred"] == 10
+    assert written["files"][0]["succeeded"] is True
+
+
+def test_transfer_stats_format_summary_lines():
+    stats = TransferStats()
+    assert stats.format_summary_lines() == ["No files were transferred"]
+
+    record = stats.start_transfer(UPLOAD, "a.txt")
+    record.add_bytes(2048)
+    stats.finish_transfer(record, succeeded=False)
+
+    lines = stats.format_summary_lines()
+    assert lines[0].startswith("Uploaded 1 file, 1 failed: 2.0 KiB in ")
+    assert lines[1].startswith("  Per-file throughput: p50 ")
+    assert lines[3] == "  Retries: 0, peak concurrency: 1"
@@ -0,0 +1,161 @@
+# tests/test_upload_index.py
+
+import json
+import os
+import time
+
+import pytest
+from mockito import when
+
+from terralab import upload_index
+from terralab.upload_index import FileFingerprint, UploadIndex
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    local_file_path = tmp_path / "reference.vcf.gz"
+    local_file_path.write_bytes(b"some reference data")
+    return str(local_file_path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return UploadIndex(str(tmp_path / "storage" / "upload_index.json"))
+
+
+def test_record_and_find(index, local_file):
+    index.record(local_file, "gs://bucket/job/reference.vcf.gz")
+
+    assert index.find(local_file) == "gs://bucket/job/reference.vcf.gz"
+    # the index is saved, so other processes find the upload too
+    assert (
+        UploadIndex(index.index_file).find(local_file)
+        == "gs://bucket/job/reference.vcf.gz"
+    )
+
+
+def test_find_not_uploaded(index, local_file):
+    assert index.find(local_file) is None
+
+
+def test_find_modified_file(index, local_file):
+    index.record(local_file, "gs://bucket/job/reference.vcf.gz")
+
+    with open(local_file, "ab") as f:
+        f.write(b" and more")
+
+    assert index.find(local_file) is None
+
+
+def test_find_modified_file_with_same_size_and_mtime(index, local_file):
+    index.record(local_file, "gs://bucket/job/reference.vcf.gz")
+    stat = os.stat(local_file)
+
+    with open(local_file, "r+b") as f:
+        f.write(b"SOME")
+    os.utime(local_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    # the file's identity matches, but its fingerprint doesn't
+    assert index.find(local_file) is None
+
+
+def test_record_with_file_fingerprint(index, local_file, unstub):
+    file_fingerprint = FileFingerprint.from_path(local_file)
+    when(upload_index).fingerprint_file(...).thenRaise(
+        AssertionError("the file shouldn't be fingerprinted again")
+    )
+
+    index.record(
+        local_file,
+        "gs://bucket/job/reference.vcf.gz",
+        file_fingerprint=file_fingerprint,
+    )
+
+    unstub()
+    assert index.find(local_file) == "gs://bucket/job/reference.vcf.gz"
+
+
+def test_record_with_outdated_file_fingerprint(index, local_file):
+    file_fingerprint = FileFingerprint.from_path(local_file)
+    with open(local_file, "ab") as f:
+        f.write(b" and more")
+
+    index.record(
+        local_file,
+        "gs://bucket/job/reference.vcf.gz",
+        file_fingerprint=file_fingerprint,
+    )
+
+    # the file changed after it was fingerprinted, so its current contents are recorded
+    assert index.find(local_file) == "gs://bucket/job/reference.vcf.gz"
+
+
+def test_uploads_are_scoped(tmp_path, local_file):
+    index_file = str(tmp_path / "upload_index.json")
+    UploadIndex(index_file, "alice@example.com https://teaspoons").record(
+        local_file, "gs://bucket/job/reference.vcf.gz"
+    )
+
+    # another user, or another Teaspoons environment, doesn't see the upload
+    assert (
+        UploadIndex(index_file, "bob@example.com https://teaspoons").find(local_file)
+        is None
+    )
+    assert (
+        UploadIndex(index_file, "alice@example.com https://teaspoons-dev").find(
+            local_file
+        )
+        is None
+    )
+    assert (
+        UploadIndex(index_file, "alice@example.com https://teaspoons").find(local_file)
+        == "gs://bucket/job/reference.vcf.gz"
+    )
+
+
+def test_expired_uploads(tmp_path, local_file, unstub):
+    index = UploadIndex(str(tmp_path / "upload_index.json"), max_age_seconds=60)
+    index.record(local_file, "gs://bucket/job/reference.vcf.gz")
+    a_minute_later = time.time() + 61
+    when(upload_index.time).time().thenReturn(a_minute_later)
+
+    assert index.find(local_file) is None
+
+    # expired entries are dropped when the index is next saved
+    other_file = tmp_path / "other.vcf.gz"
+    other_file.write_bytes(b"other data")
+    index.record(str(other_file), "gs://bucket/job/other.vcf.gz")
+    with open(index.index_file) as f:
+        assert len(json.load(f)["entries"]) == 1
+
+
+def test_variants_are_indexed_separately(index, local_file):
+    index.record(local_file, "gs://bucket/job/reference.vcf.gz", variant="bgzf")
+
+    assert index.find(local_file) is None
+    assert index.find(local_file, variant="bgzf") == "gs://bucket/job/reference.vcf.gz"
+
+
+def test_unreadable_index_is_ignored(index, local_file):
+    os.makedirs(os.path.dirname(index.index_file))
+    with open(index.index_file, "w") as f:
+        f.write("not json")
+
+    assert index.find(local_file) is None
+    index.record(local_file, "gs://bucket/job/reference.vcf.gz")
+
+    with open(index.index_file) as f:
+        assert json.load(f)["version"] == upload_index.UPLOAD_INDEX_VERSION
+
+
+def test_fingerprint_file_samples_large_files(tmp_path):
+    local_file_path = tmp_path / "large.bin"
+    data = bytearray(os.urandom(4 * upload_index.FINGERPRINT_SAMPLE_SIZE))
+    local_file_path.write_bytes(data)
+    fingerprint = upload_index.fingerprint_file(str(local_file_path))
+
+    # a change in the middle of the file
+    data[len(data) // 2] ^= 0xFF
+    local_file_path.write_bytes(data)
+
+    assert upload_index.fingerprint_file(str(local_file_path)) != fingerprint
@@ -1,5 +1,7 @@
 # tests/test_utils
 
+import errno
+import io
 import os
 import tempfile
 import uuid
@@ -7,10 +9,14 @@ import zoneinfo
 from unittest.mock import patch
 
 import pytest
+import requests
 from mockito import mock, when
 from requests.exceptions import HTTPError
 from urllib3.exceptions import MaxRetryError
 from terralab import utils
+from terralab.exceptions import TransferError
+from terralab.transfer_session import get_transfer_session
+from terralab.transfer_stats import TransferRecord, get_transfer_stats
 from terralab.utils import handle_api_exceptions
 from tests.conftest import capture_logs
 
@@ -40,6 +46,14 @@ process_inputs_testdata = [
         ("--foo", "--bar"),
         {"foo": None, "bar": None},
     ),  # missing input values are parsed as None
+    (
+        ("--foo=@@foo_value", "--bar", "@@-"),
+        {"foo": "@foo_value", "bar": "@-"},
+    ),  # a doubled '@' is a literal '@', not a values file
+    (
+        ("--array_input", "@@v1,v2"),
+        {"array_input": ["@v1", "v2"]},
+    ),
     # failures:
     (("foo"), None),  # missing input key
     (("3"), None),  # missing input key, note integers get processed to strings
@@ -63,6 +77,52 @@ def test_process_inputs_to_dict(input, expected_output):
         assert utils.process_inputs_to_dict(input) == expected_output
 
 
+def test_process_inputs_to_dict_values_file():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        values_file_path = os.path.join(tmpdirname, "values.txt")
+        with open(values_file_path, "w") as values_file:
+            values_file.write("gs://bucket/v1\n\n  gs://bucket/v2  \ngs://bucket/v3\n")
+
+        assert utils.process_inputs_to_dict(
+            (f"--array_input=@{values_file_path}", "--bar", "bar_value")
+        ) == {
+            "array_input": ["gs://bucket/v1", "gs://bucket/v2", "gs://bucket/v3"],
+            "bar": "bar_value",
+        }
+        # space-separated format is also supported
+        assert utils.process_inputs_to_dict(
+            ("--array_input", f"@{values_file_path}")
+        ) == {"array_input": ["gs://bucket/v1", "gs://bucket/v2", "gs://bucket/v3"]}
+
+
+def test_process_inputs_to_dict_values_file_errors():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        # missing file
+        with pytest.raises(ValueError, match="Could not read input values"):
+            utils.process_inputs_to_dict(
+                (f"--array_input=@{os.path.join(tmpdirname, 'missing.txt')}",)
+            )
+
+        # file with no values
+        empty_file_path = os.path.join(tmpdirname, "empty.txt")
+        with open(empty_file_path, "w") as empty_file:
+            empty_file.write("\n\n")
+        with pytest.raises(ValueError, match="No input values found"):
+            utils.process_inputs_to_dict((f"--array_input=@{empty_file_path}",))
+
+
+def test_process_inputs_to_dict_values_from_stdin():
+    with patch("sys.stdin", io.StringIO("v1\nv2\n")):
+        assert utils.process_inputs_to_dict(("--array_input=@-",)) == {
+            "array_input": ["v1", "v2"]
+        }
+
+    # stdin can only be used for one input
+    with patch("sys.stdin", io.StringIO("v1\nv2\n")):
+        with pytest.raises(ValueError, match="Only one input can be read from stdin"):
+            utils.process_inputs_to_dict(("--foo=@-", "--bar", "@-"))
+
+
 def test_is_valid_local_file():
     # existing file returns True
     with tempfile.TemporaryDirectory() as tmpdirname:
@@ -151,7 +211,7 @@ def test_upload_file_with_signed_url_success(capture_logs):
         mock_response = mock()
         when(mock_response).raise_for_status()  # do nothing
 
-        when(utils.requests).request(...).thenReturn(mock_response)
+        when(get_transfer_session()).request(...).thenReturn(mock_response)
 
         utils.upload_file_with_signed_url(test_local_file_path, test_signed_url)
 
@@ -174,13 +234,11 @@ def test_upload_file_with_signed_url_failed(capture_logs):
             HTTPError("some message")
         )  # raise an error
 
-        when(utils.requests).request(...).thenReturn(mock_response)
+        when(get_transfer_session()).request(...).thenReturn(mock_response)
 
-        with pytest.raises(SystemExit):
+        with pytest.raises(TransferError, match="Error uploading file: some message"):
             utils.upload_file_with_signed_url(test_local_file_path, test_signed_url)
 
-        assert "Error uploading file: some message" in capture_logs.text
-
 
 def test_download_files_with_signed_urls_success(capture_logs):
     test_file_name = "filename.ext"
@@ -193,7 +251,9 @@ def test_download_files_with_signed_urls_success(capture_logs):
     when(mock_response).iter_content(...).thenReturn([b"chunk1", b"chunk2"])
 
     with tempfile.TemporaryDirectory() as test_download_dest_dir:
-        when(utils.requests).get(test_signed_url, stream=True).thenReturn(mock_response)
+        when(get_transfer_session()).get(test_signed_url, stream=True).thenReturn(
+            mock_response
+        )
 
         local_file_paths = utils.download_files_with_signed_urls(
             test_download_dest_dir, [test_signed_url]
@@ -206,7 +266,7 @@ def test_download_files_with_signed_urls_success(capture_logs):
     assert f"Downloading {test_file_name}: complete" in capture_logs.text
 
 
-def test_download_files_with_signed_urls_failed(capture_logs):
+def test_download_files_with_signed_urls_failed():
     test_file_name = "filename.ext"
     test_signed_url = f"signed_url/{test_file_name}?headers"
 
@@ -218,15 +278,17 @@ def test_download_files_with_signed_urls_failed(capture_logs):
     )  # raise an error
 
     with tempfile.TemporaryDirectory() as test_download_dest_dir:
-        when(utils.requests).get(test_signed_url, stream=True).thenReturn(mock_response)
+        when(get_transfer_session()).get(test_signed_url, stream=True).thenReturn(
+            mock_response
+        )
 
-        with pytest.raises(SystemExit):
+        with pytest.raises(
+            TransferError, match="Error downloading files: some message"
+        ):
             utils.download_files_with_signed_urls(
                 test_download_dest_dir, [test_signed_url]
             )
 
-    assert "Error downloading files: some message" in capture_logs.text
-
 
 def test_validate_uuid(capture_logs):
     # valid
@@ -331,3 +393,200 @@ def test_format_timestamp(timestamp, local_timezone, expected, unstub):
     assert formatted == expected
 
     unstub()
+
+
+def test_download_files_with_signed_urls_resumes_after_connection_error(capture_logs):
+    test_file_name = "filename.ext"
+    test_signed_url = f"signed_url/{test_file_name}?headers"
+
+    def interrupted_content(block_size):
+        yield b"chunk1"
+        raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+    mock_response = mock({"headers": {"content-length": 12}})
+    when(mock_response).raise_for_status()  # do nothing
+    when(mock_response).iter_content(...).thenAnswer(interrupted_content)
+
+    mock_resumed_response = mock({"headers": {}, "status_code": 206})
+    when(mock_resumed_response).raise_for_status()  # do nothing
+    when(mock_resumed_response).iter_content(...).thenReturn([b"chunk2"])
+
+    with tempfile.TemporaryDirectory() as test_download_dest_dir:
+        when(get_transfer_session()).get(test_signed_url, stream=True).thenReturn(
+            mock_response
+        )
+        when(get_transfer_session()).get(
+            test_signed_url, stream=True, headers={"Range": "bytes=6-"}
+        ).thenReturn(mock_resumed_response)
+
+        local_file_paths = utils.download_files_with_signed_urls(
+            test_download_dest_dir, [test_signed_url]
+        )
+
+        with open(local_file_paths[0], "rb") as downloaded_file:
+            assert downloaded_file.read() == b"chunk1chunk2"
+
+    assert "All downloads complete" in capture_logs.text
+
+
+def test_upload_file_with_signed_url_progress_bar(tmp_path):
+    test_local_file_path = tmp_path / "temp_file"
+    test_local_file_path.write_text("Hello, World!")
+    mock_response = mock()
+    when(mock_response).raise_for_status()  # do nothing
+    when(get_transfer_session()).request(...).thenReturn(mock_response)
+
+    with patch.object(utils, "tqdm", wraps=utils.tqdm) as tqdm_spy:
+        utils.upload_file_with_signed_url(
+            str(test_local_file_path), "signed_url", progress_position=2
+        )
+
+    # concurrent uploads each get their own named progress bar line
+    assert tqdm_spy.call_args.kwargs["desc"] == "Uploading temp_file"
+    assert tqdm_spy.call_args.kwargs["position"] == 2
+
+
+def test_upload_file_with_signed_url_records_transfer_stats():
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        test_local_file_path = os.path.join(tmpdirname, "temp_file")
+        with open(file=test_local_file_path, mode="w") as blob_file:
+            blob_file.write("Hello, World!")
+
+        mock_response = mock()
+        when(mock_response).raise_for_status()  # do nothing
+        when(get_transfer_session()).request(...).thenReturn(mock_response)
+
+        utils.upload_file_with_signed_url(test_local_file_path, "signed_url")
+
+    record = get_transfer_stats().records[-1]
+    assert record.direction == "upload"
+    assert record.file_name == "temp_file"
+    assert record.size_bytes == 13
+    assert record.succeeded is True
+
+
+def test_file_upload_body_sends_file_in_blocks(tmp_path):
+    data = os.urandom(2 * utils.UPLOAD_BLOCK_SIZE + 10)
+    test_local_file_path = tmp_path / "temp_file"
+    test_local_file_path.write_bytes(data)
+    offsets = []
+
+    with open(test_local_file_path, "rb") as in_file:
+        upload_body = utils.FileUploadBody(in_file, len(data), offsets.append)
+        blocks = [bytes(block) for block in upload_body]
+
+    assert len(upload_body) == len(data)
+    assert b"".join(blocks) == data
+    assert [len(block) for block in blocks] == [
+        utils.UPLOAD_BLOCK_SIZE,
+        utils.UPLOAD_BLOCK_SIZE,
+        10,
+    ]
+    assert offsets == [
+        0,
+        utils.UPLOAD_BLOCK_SIZE,
+        2 * utils.UPLOAD_BLOCK_SIZE,
+        len(data),
+    ]
+
+
+def test_file_upload_body_empty_file(tmp_path):
+    test_local_file_path = tmp_path / "empty_file"
+    test_local_file_path.write_bytes(b"")
+    offsets = []
+
+    with open(test_local_file_path, "rb") as in_file:
+        assert list(utils.FileUploadBody(in_file, 0, offsets.append)) == []
+
+    assert offsets == [0]
+
+
+def test_get_disk_space_error(tmp_path):
+    assert utils.get_disk_space_error(str(tmp_path), 0) is None
+    assert utils.get_disk_space_error(str(tmp_path), 1) is None
+    assert "Not enough disk space to download" in utils.get_disk_space_error(
+        str(tmp_path), 2**60
+    )
+
+
+def test_preallocate_file(tmp_path):
+    with open(tmp_path / "file.bin", "wb") as f:
+        utils.preallocate_file(f, 1000, "file.bin")
+
+    if hasattr(os, "posix_fallocate"):
+        assert os.path.getsize(tmp_path / "file.bin") == 1000
+
+
+def test_preallocate_file_not_enough_space(tmp_path):
+    if not hasattr(os, "posix_fallocate"):
+        pytest.skip("preallocation not supported")
+    when(utils.os).posix_fallocate(...).thenRaise(OSError(errno.ENOSPC, "full"))
+
+    with open(tmp_path / "file.bin", "wb") as f:
+        with pytest.raises(OSError, match="Not enough disk space for file.bin"):
+            utils.preallocate_file(f, 1000, "file.bin")
+
+
+def test_download_with_pbar_removes_file_when_out_of_space(tmp_path, unstub_fixture):
+    signed_url = "https://storage.googleapis.com/bucket/filename.ext?signature"
+    mock_response = mock(
+        {"headers": {"content-length": "12"}, "status_code": 200},
+        spec=requests.Response,
+    )
+    when(mock_response).raise_for_status()
+    when(get_transfer_session()).get(signed_url, stream=True).thenReturn(mock_response)
+    when(utils).preallocate_file(...).thenRaise(OSError(errno.ENOSPC, "full"))
+    download = utils.SignedUrlDownload(signed_url, str(tmp_path))
+
+    with pytest.raises(OSError):
+        utils.download_with_pbar(download)
+
+    assert not os.path.exists(download.local_file_path)
+
+
+def test_download_files_with_signed_urls_collision(tmp_path):
+    with pytest.raises(
+        TransferError, match="Some files would be downloaded to the same place"
+    ):
+        utils.download_files_with_signed_urls(
+            str(tmp_path), ["signed_url/a/out.txt?sig", "signed_url/b/out.txt?sig"]
+        )
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_is_stream_file(tmp_path):
+    regular_file = tmp_path / "input.vcf"
+    regular_file.write_text("data")
+    pipe_path = str(tmp_path / "input.pipe")
+    os.mkfifo(pipe_path)
+
+    assert not utils.is_stream_file(str(regular_file))
+    assert utils.is_stream_file(pipe_path)
+
+
+def test_iter_stream_upload_exceeds_max_size(monkeypatch):
+    monkeypatch.setattr(utils, "MAX_FILE_UPLOAD_SIZE_BYTES", 10)
+    progress_bar = mock({"update": lambda n: None})
+    transfer_record = TransferRecord("upload", "input.vcf")
+
+    with pytest.raises(TransferError, match="More than the maximum file size"):
+        list(
+            utils._iter_stream_upload(
+                io.BytesIO(b"x" * 11), progress_bar, transfer_record
+            )
+        )
+
+
+def test_iter_compressed_upload_exceeds_max_size(monkeypatch):
+    monkeypatch.setattr(utils, "MAX_FILE_UPLOAD_SIZE_BYTES", 10)
+    progress_bar = mock({"n": 0, "update": lambda n: None})
+    transfer_record = TransferRecord("upload", "input.vcf")
+
+    # the compressed bytes are counted, so an empty file's BGZF end-of-file block (28 bytes) is too big
+    with pytest.raises(TransferError, match="More than the maximum file size"):
+        list(
+            utils._iter_compressed_upload(
+                io.BytesIO(b""), progress_bar, transfer_record
+            )
+        )
+    assert transfer_record.bytes_transferred == 0